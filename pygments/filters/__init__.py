@@ -17,7 +17,8 @@ from pygments.token import String, Comment, Keyword, Name, Error, Whitespace, \
 from pygments.filter import Filter
 from pygments.util import get_list_opt, get_int_opt, get_bool_opt, \
      get_choice_opt, ClassNotFound, OptionError, text_type, string_types
-from pygments.plugin import find_plugin_filters
+from pygments.plugin import find_plugin_filters, get_plugins, \
+    FILTER_ENTRY_POINT
 
 
 def find_filter_class(filtername):
@@ -47,8 +48,8 @@ def get_all_filters():
     """Return a generator of all filter names."""
     for name in FILTERS:
         yield name
-    for name, _ in find_plugin_filters():
-        yield name
+    for plugin in get_plugins(FILTER_ENTRY_POINT):
+        yield plugin.name
 
 
 def _replace_special(ttype, value, regex, specialttype,
@@ -10,11 +10,12 @@
 """
 
 import codecs
+from itertools import islice
 
-from pygments.util import get_bool_opt, string_types
+from pygments.util import get_bool_opt, get_int_opt, string_types
 from pygments.styles import get_style_by_name
 
-__all__ = ['Formatter']
+__all__ = ['Formatter', 'OutputBuffer']
 
 
 def _lookup_style(style):
@@ -23,6 +24,80 @@ def _lookup_style(style):
     return style
 
 
+class OutputBuffer(object):
+    """
+    Wraps the file-like object `outfile` for a formatter: the strings written
+    to it are collected and written to `outfile` joined, and encoded with
+    `encoding` if given, whenever at least `size` characters have come
+    together, and on `flush()` and `finish()`.  Other attributes are those
+    of `outfile`.
+
+    .. versionadded:: 2.1
+    """
+
+    def __init__(self, outfile, encoding=None, size=65536):
+        self.outfile = outfile
+        self.size = size
+        self._pieces = []
+        self._length = 0
+        if encoding:
+            self._encoder = codecs.getincrementalencoder(encoding)()
+        else:
+            self._encoder = None
+
+    def __getattr__(self, name):
+        return getattr(self.outfile, name)
+
+    def write(self, text):
+        self._pieces.append(text)
+        self._length += len(text)
+        if self._length >= self.size:
+            self._write_pieces()
+
+    def writelines(self, lines):
+        """Write the strings from the iterable `lines`, in batches."""
+        lines = iter(lines)
+        pieces = self._pieces
+        while True:
+            start = len(pieces)
+            pieces.extend(islice(lines, 1024))
+            if len(pieces) == start:
+                break
+            self._length += sum(map(len, islice(pieces, start, None)))
+            if self._length >= self.size:
+                self._write_pieces()
+
+    def _write_pieces(self, final=False):
+        pieces = self._pieces
+        if pieces:
+            text = pieces[0][:0].join(pieces)
+            del pieces[:]
+            self._length = 0
+        else:
+            text = u''
+        if self._encoder is not None:
+            text = self._encoder.encode(text, final)
+        if text:
+            self.outfile.write(text)
+
+    def flush(self):
+        """
+        Write everything that was collected to `outfile`, and flush it if
+        it has a ``flush()`` method.
+        """
+        self._write_pieces()
+        flush = getattr(self.outfile, 'flush', None)
+        if flush is not None:
+            flush()
+
+    def finish(self):
+        """
+        Write everything that was collected to `outfile` and end the
+        encoding; `outfile` itself is not flushed.
+        """
+        self._write_pieces(True)
+
+
 class Formatter(object):
     """
     Converts a token stream to text.
@@ -48,6 +123,11 @@ class Formatter(object):
         support (default: None).
     ``outencoding``
         Overrides ``encoding`` if given.
+    ``buffersize``
+        The output is collected and written (and encoded) in blocks of at
+        least this many characters (default: 65536).
+
+        .. versionadded:: 2.1
     """
 
     #: Name of the formatter
@@ -72,6 +152,7 @@ class Formatter(object):
             # can happen for e.g. pygmentize -O encoding=guess
             self.encoding = 'utf-8'
         self.encoding = options.get('outencoding') or self.encoding
+        self.buffersize = get_int_opt(options, 'buffersize', 65536)
         self.options = options
 
     def get_style_defs(self, arg=''):
@@ -89,7 +170,9 @@ class Formatter(object):
         Format ``tokensource``, an iterable of ``(tokentype, tokenstring)``
         tuples and write it into ``outfile``.
         """
-        if self.encoding:
-            # wrap the outfile in a StreamWriter
-            outfile = codecs.lookup(self.encoding)[3](outfile)
-        return self.format_unencoded(tokensource, outfile)
+        outfile = OutputBuffer(outfile, self.encoding, self.buffersize)
+        try:
+            return self.format_unencoded(tokensource, outfile)
+        finally:
+            # also write what was formatted before an error
+            outfile.finish()
@@ -11,6 +11,7 @@
 
 
 from pygments.formatter import Formatter
+from pygments.token import TokenTypeTable
 from pygments.util import get_bool_opt
 
 __all__ = ['BBCodeFormatter']
@@ -56,6 +57,8 @@ class BBCodeFormatter(Formatter):
 
         self.styles = {}
         self._make_styles()
+        # the nearest type with a style, for every token type
+        self._styled = TokenTypeTable(dict((t, t) for t in self.styles))
 
     def _make_styles(self):
         for ttype, ndef in self.style:
@@ -85,9 +88,12 @@ class BBCodeFormatter(Formatter):
         lastval = ''
         lasttype = None
 
+        styled = self._styled.values
         for ttype, value in tokensource:
-            while ttype not in self.styles:
-                ttype = ttype.parent
+            try:
+                ttype = styled[ttype.id]
+            except IndexError:
+                ttype = self._styled[ttype]
             if ttype == lasttype:
                 lastval += value
             else:
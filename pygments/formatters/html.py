@@ -259,6 +259,14 @@ class HtmlFormatter(Formatter):
         CSS property (you get the default line spacing with ``line-height:
         125%``).
 
+        Both kinds of line numbers depend on the number of lines: the table
+        starts with them, and inline numbers are padded to the width of the
+        largest one.  If the tokens come from `Lexer.get_tokens()` (without
+        filters) or a `TokenArray`, they tell the formatter the number of
+        lines, and the output is streamed (table line numbers only if a
+        subclass does not override `wrap`); otherwise the whole code is
+        formatted before it is output.
+
     `hl_lines`
         Specify a list of lines to be highlighted.
 
@@ -428,7 +436,27 @@ class HtmlFormatter(Formatter):
             return self.classprefix + ttypeclass
         return ''
 
+    def _get_span(self, ttype):
+        """Return the opening and closing tag of the span for tokens of this
+        type, or two empty strings if they need none."""
+        if self.noclasses:
+            getcls = self.ttype2class.get
+            cclass = getcls(ttype)
+            while cclass is None:
+                ttype = ttype.parent
+                cclass = getcls(ttype)
+            if cclass:
+                return ('<span style="%s">' % self.class2style[cclass][0],
+                        '</span>')
+        else:
+            cls = self._get_css_class(ttype)
+            if cls:
+                return '<span class="%s">' % cls, '</span>'
+        return '', ''
+
     def _create_stylesheet(self):
+        # the spans of the token types met so far, see _get_span()
+        self._spans = {}
         t2c = self.ttype2class = {Token: ''}
         c2s = self.class2style = {}
         for ttype, ndef in self.style:
@@ -541,75 +569,95 @@ class HtmlFormatter(Formatter):
             yield t, line
         yield 0, DOC_FOOTER
 
-    def _wrap_tablelinenos(self, inner):
-        dummyoutfile = StringIO()
-        lncount = 0
+    def _known_line_count(self, tokensource, methods):
+        """
+        Return the number of lines the code will be formatted into, if it is
+        known in advance, i.e. if `tokensource` comes from
+        `Lexer.get_tokens()` or is a `TokenArray`, and none of the `methods`
+        that produce the lines is overridden (e.g. `wrap` may add lines).
+        Otherwise return ``None``.
+        """
+        lncount = getattr(tokensource, 'line_count', None)
+        if lncount is None:
+            return None
+        for name in methods:
+            for base in type(self).__mro__:
+                if name in base.__dict__:
+                    if base is not HtmlFormatter:
+                        return None
+                    break
+        return lncount
+
+    def _wrap_tablelinenos(self, inner, lncount=None):
+        """
+        Put the line numbers and the code into two table cells.  The line
+        numbers come first, so without the number of lines `lncount` the
+        whole code has to be collected before anything is output.
+        """
+        if lncount is None:
+            dummyoutfile = StringIO()
+            lncount = 0
+            for t, line in inner:
+                if t:
+                    lncount += 1
+                dummyoutfile.write(line)
+            inner = [(0, dummyoutfile.getvalue())]
+
+        # in case you wonder about the seemingly redundant <div> here: since the
+        # content in the other cell also is wrapped in a div, some browsers in
+        # some configurations seem to mess up the formatting...
+        if self.noclasses:
+            yield 0, ('<table class="%stable">' % self.cssclass +
+                      '<tr><td><div class="linenodiv" '
+                      'style="background-color: #f0f0f0; padding-right: 10px">'
+                      '<pre style="line-height: 125%">')
+        else:
+            yield 0, ('<table class="%stable">' % self.cssclass +
+                      '<tr><td class="linenos"><div class="linenodiv"><pre>')
+        sep = ''
+        for lineno in self._table_linenos(lncount):
+            yield 0, sep + lineno
+            sep = '\n'
+        yield 0, '</pre></div></td><td class="code">'
         for t, line in inner:
-            if t:
-                lncount += 1
-            dummyoutfile.write(line)
+            yield 0, line
+        yield 0, '</td></tr></table>'
 
+    def _table_linenos(self, lncount):
+        """Yield the entries of the line number cell for `lncount` lines."""
         fl = self.linenostart
         mw = len(str(lncount + fl - 1))
         sp = self.linenospecial
         st = self.linenostep
         la = self.lineanchors
         aln = self.anchorlinenos
-        nocls = self.noclasses
-        if sp:
-            lines = []
-
-            for i in range(fl, fl+lncount):
-                if i % st == 0:
-                    if i % sp == 0:
-                        if aln:
-                            lines.append('<a href="#%s-%d" class="special">%*d</a>' %
-                                         (la, i, mw, i))
-                        else:
-                            lines.append('<span class="special">%*d</span>' % (mw, i))
-                    else:
-                        if aln:
-                            lines.append('<a href="#%s-%d">%*d</a>' % (la, i, mw, i))
-                        else:
-                            lines.append('%*d' % (mw, i))
-                else:
-                    lines.append('')
-            ls = '\n'.join(lines)
-        else:
-            lines = []
-            for i in range(fl, fl+lncount):
-                if i % st == 0:
+        for i in range(fl, fl+lncount):
+            if i % st == 0:
+                if sp and i % sp == 0:
                     if aln:
-                        lines.append('<a href="#%s-%d">%*d</a>' % (la, i, mw, i))
+                        yield '<a href="#%s-%d" class="special">%*d</a>' % \
+                            (la, i, mw, i)
                     else:
-                        lines.append('%*d' % (mw, i))
+                        yield '<span class="special">%*d</span>' % (mw, i)
+                elif aln:
+                    yield '<a href="#%s-%d">%*d</a>' % (la, i, mw, i)
                 else:
-                    lines.append('')
-            ls = '\n'.join(lines)
-
-        # in case you wonder about the seemingly redundant <div> here: since the
-        # content in the other cell also is wrapped in a div, some browsers in
-        # some configurations seem to mess up the formatting...
-        if nocls:
-            yield 0, ('<table class="%stable">' % self.cssclass +
-                      '<tr><td><div class="linenodiv" '
-                      'style="background-color: #f0f0f0; padding-right: 10px">'
-                      '<pre style="line-height: 125%">' +
-                      ls + '</pre></div></td><td class="code">')
+                    yield '%*d' % (mw, i)
+            else:
+                yield ''
+
+    def _wrap_inlinelinenos(self, inner, lncount=None):
+        # the width of the numbers depends on the number of lines, so
+        # without `lncount` all lines have to be collected first
+        if lncount is None:
+            lines = list(inner)
+            lncount = len(lines)
         else:
-            yield 0, ('<table class="%stable">' % self.cssclass +
-                      '<tr><td class="linenos"><div class="linenodiv"><pre>' +
-                      ls + '</pre></div></td><td class="code">')
-        yield 0, dummyoutfile.getvalue()
-        yield 0, '</td></tr></table>'
-
-    def _wrap_inlinelinenos(self, inner):
-        # need a list of lines since we need the width of a single number :(
-        lines = list(inner)
+            lines = inner
         sp = self.linenospecial
         st = self.linenostep
         num = self.linenostart
-        mw = len(str(len(lines) + num - 1))
+        mw = len(str(lncount + num - 1))
 
         if self.noclasses:
             if sp:
@@ -693,26 +741,19 @@ class HtmlFormatter(Formatter):
         Just format the tokens, without any wrapping tags.
         Yield individual lines.
         """
-        nocls = self.noclasses
         lsep = self.lineseparator
-        # for <span style=""> lookup only
-        getcls = self.ttype2class.get
-        c2s = self.class2style
+        spans = self._spans
+        getspan = self._get_span
         escape_table = _escape_html_table
         tagsfile = self.tagsfile
 
-        lspan = ''
+        lspan = lend = ''
         line = ''
         for ttype, value in tokensource:
-            if nocls:
-                cclass = getcls(ttype)
-                while cclass is None:
-                    ttype = ttype.parent
-                    cclass = getcls(ttype)
-                cspan = cclass and '<span style="%s">' % c2s[cclass][0] or ''
-            else:
-                cls = self._get_css_class(ttype)
-                cspan = cls and '<span class="%s">' % cls or ''
+            try:
+                cspan, cend = spans[ttype]
+            except KeyError:
+                cspan, cend = spans[ttype] = getspan(ttype)
 
             parts = value.translate(escape_table).split('\n')
 
@@ -733,30 +774,29 @@ class HtmlFormatter(Formatter):
             for part in parts[:-1]:
                 if line:
                     if lspan != cspan:
-                        line += (lspan and '</span>') + cspan + part + \
-                                (cspan and '</span>') + lsep
+                        line += lend + cspan + part + cend + lsep
                     else: # both are the same
-                        line += part + (lspan and '</span>') + lsep
+                        line += part + lend + lsep
                     yield 1, line
                     line = ''
                 elif part:
-                    yield 1, cspan + part + (cspan and '</span>') + lsep
+                    yield 1, cspan + part + cend + lsep
                 else:
                     yield 1, lsep
             # for the last line
             if line and parts[-1]:
                 if lspan != cspan:
-                    line += (lspan and '</span>') + cspan + parts[-1]
-                    lspan = cspan
+                    line += lend + cspan + parts[-1]
+                    lspan, lend = cspan, cend
                 else:
                     line += parts[-1]
             elif parts[-1]:
                 line = cspan + parts[-1]
-                lspan = cspan
+                lspan, lend = cspan, cend
             # else we neither have to open a new span nor set lspan
 
         if line:
-            yield 1, line + (lspan and '</span>') + lsep
+            yield 1, line + lend + lsep
 
     def _lookup_ctag(self, token):
         entry = ctags.TagEntry()
@@ -814,14 +854,21 @@ class HtmlFormatter(Formatter):
             source = self._highlight_lines(source)
         if not self.nowrap:
             if self.linenos == 2:
-                source = self._wrap_inlinelinenos(source)
+                source = self._wrap_inlinelinenos(
+                    source, self._known_line_count(
+                        tokensource, ('_format_lines', '_highlight_lines')))
             if self.lineanchors:
                 source = self._wrap_lineanchors(source)
             if self.linespans:
                 source = self._wrap_linespans(source)
             source = self.wrap(source, outfile)
             if self.linenos == 1:
-                source = self._wrap_tablelinenos(source)
+                source = self._wrap_tablelinenos(
+                    source, self._known_line_count(
+                        tokensource, ('_format_lines', '_highlight_lines',
+                                      '_wrap_inlinelinenos',
+                                      '_wrap_lineanchors', '_wrap_linespans',
+                                      'wrap')))
             if self.full:
                 source = self._wrap_full(source, outfile)
 
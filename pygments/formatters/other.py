@@ -9,7 +9,7 @@
     :license: BSD, see LICENSE for details.
 """
 
-from pygments.formatter import Formatter
+from pygments.formatter import Formatter, OutputBuffer
 from pygments.util import OptionError, get_choice_opt
 from pygments.token import Token
 from pygments.console import colorize
@@ -25,13 +25,8 @@ class NullFormatter(Formatter):
     aliases = ['text', 'null']
     filenames = ['*.txt']
 
-    def format(self, tokensource, outfile):
-        enc = self.encoding
-        for ttype, value in tokensource:
-            if enc:
-                outfile.write(value.encode(enc))
-            else:
-                outfile.write(value)
+    def format_unencoded(self, tokensource, outfile):
+        outfile.writelines(value for ttype, value in tokensource)
 
 
 class RawTokenFormatter(Formatter):
@@ -87,33 +82,44 @@ class RawTokenFormatter(Formatter):
         if self.compress == 'gz':
             import gzip
             outfile = gzip.GzipFile('', 'wb', 9, outfile)
-            def write(text):
-                outfile.write(text.encode())
-            flush = outfile.flush
         elif self.compress == 'bz2':
             import bz2
-            compressor = bz2.BZ2Compressor(9)
-            def write(text):
-                outfile.write(compressor.compress(text.encode()))
-            def flush():
-                outfile.write(compressor.flush())
-                outfile.flush()
-        else:
-            def write(text):
-                outfile.write(text.encode())
-            flush = outfile.flush
-
-        if self.error_color:
-            for ttype, value in tokensource:
-                line = "%s\t%r\n" % (ttype, value)
-                if ttype is Token.Error:
-                    write(colorize(self.error_color, line))
-                else:
-                    write(line)
-        else:
-            for ttype, value in tokensource:
-                write("%s\t%r\n" % (ttype, value))
-        flush()
+            outfile = _CompressedFile(outfile, bz2.BZ2Compressor(9))
+        outfile = OutputBuffer(outfile, 'utf-8', self.buffersize)
+        write = outfile.write
+
+        try:
+            if self.error_color:
+                for ttype, value in tokensource:
+                    line = "%s\t%r\n" % (ttype, value)
+                    if ttype is Token.Error:
+                        write(colorize(self.error_color, line))
+                    else:
+                        write(line)
+            else:
+                for ttype, value in tokensource:
+                    write("%s\t%r\n" % (ttype, value))
+        finally:
+            outfile.flush()
+
+
+class _CompressedFile(object):
+    """
+    Writes the data written to it to `outfile`, compressed with
+    `compressor`.  Flushing it ends the compressed stream.
+    """
+
+    def __init__(self, outfile, compressor):
+        self.outfile = outfile
+        self.compressor = compressor
+
+    def write(self, data):
+        self.outfile.write(self.compressor.compress(data))
+
+    def flush(self):
+        self.outfile.write(self.compressor.flush())
+        self.outfile.flush()
+
 
 TESTCASE_BEFORE = u'''\
     def testNeedsName(self):
@@ -140,7 +146,7 @@ class TestcaseFormatter(Formatter):
         if self.encoding is not None and self.encoding != 'utf-8':
             raise ValueError("Only None and utf-8 are allowed encodings.")
 
-    def format(self, tokensource, outfile):
+    def format_unencoded(self, tokensource, outfile):
         indentation = ' ' * 12
         rawbuf = []
         outbuf = []
@@ -151,10 +157,5 @@ class TestcaseFormatter(Formatter):
         before = TESTCASE_BEFORE % (u''.join(rawbuf),)
         during = u''.join(outbuf)
         after = TESTCASE_AFTER
-        if self.encoding is None:
-            outfile.write(before + during + after)
-        else:
-            outfile.write(before.encode('utf-8'))
-            outfile.write(during.encode('utf-8'))
-            outfile.write(after.encode('utf-8'))
+        outfile.write(before + during + after)
         outfile.flush()
@@ -13,7 +13,7 @@ import sys
 
 from pygments.formatter import Formatter
 from pygments.token import Keyword, Name, Comment, String, Error, \
-    Number, Operator, Generic, Token, Whitespace
+    Number, Operator, Generic, Token, Whitespace, TokenTypeTable
 from pygments.console import ansiformat
 from pygments.util import get_choice_opt
 
@@ -89,6 +89,7 @@ class TerminalFormatter(Formatter):
         self.colorscheme = options.get('colorscheme', None) or TERMINAL_COLORS
         self.linenos = options.get('linenos', False)
         self._lineno = 0
+        self._colors = TokenTypeTable(self.colorscheme)
 
     def format(self, tokensource, outfile):
         # hack: if the output is a terminal and has an encoding set,
@@ -106,14 +107,15 @@ class TerminalFormatter(Formatter):
     def _format_unencoded_with_lineno(self, tokensource, outfile):
         self._write_lineno(outfile)
 
+        colors = self._colors.values
         for ttype, value in tokensource:
             if value.endswith("\n"):
                 self._write_lineno(outfile)
                 value = value[:-1]
-            color = self.colorscheme.get(ttype)
-            while color is None:
-                ttype = ttype[:-1]
-                color = self.colorscheme.get(ttype)
+            try:
+                color = colors[ttype.id]
+            except IndexError:
+                color = self._colors[ttype]
             if color:
                 color = color[self.darkbg]
                 spl = value.split('\n')
@@ -133,11 +135,12 @@ class TerminalFormatter(Formatter):
             self._format_unencoded_with_lineno(tokensource, outfile)
             return
 
+        colors = self._colors.values
         for ttype, value in tokensource:
-            color = self.colorscheme.get(ttype)
-            while color is None:
-                ttype = ttype[:-1]
-                color = self.colorscheme.get(ttype)
+            try:
+                color = colors[ttype.id]
+            except IndexError:
+                color = self._colors[ttype]
             if color:
                 color = color[self.darkbg]
                 spl = value.split('\n')
@@ -27,11 +27,40 @@
 import sys
 
 from pygments.formatter import Formatter
+from pygments.token import TokenTypeTable
 
 
 __all__ = ['Terminal256Formatter']
 
 
+# the levels of the red, green and blue components in the 6x6x6 color cube
+_CUBE_LEVELS = (0x00, 0x5f, 0x87, 0xaf, 0xd7, 0xff)
+
+
+def _nearest_levels():
+    # the index of the nearest cube level for each component value (the
+    # lower one on ties, like the search over the whole table)
+    nearest = []
+    for v in range(256):
+        dists = [(v - level) ** 2 for level in _CUBE_LEVELS]
+        nearest.append(dists.index(min(dists)))
+    return nearest
+
+
+def _nearest_grays():
+    # the index (1..21) of the nearest grayscale color for each sum of the
+    # components: the distance to gray v is r*r + g*g + b*b - 2*v*s + 3*v*v
+    nearest = []
+    for s in range(3 * 255 + 1):
+        dists = [3 * v * v - 2 * v * s for v in range(18, 219, 10)]
+        nearest.append(dists.index(min(dists)) + 1)
+    return nearest
+
+
+_NEAREST_LEVEL = _nearest_levels()
+_NEAREST_GRAY = _nearest_grays()
+
+
 class EscapeSequence:
     def __init__(self, fg=None, bg=None, bold=False, underline=False):
         self.fg = fg
@@ -124,7 +153,7 @@ class Terminal256Formatter(Formatter):
 
         # colors 16..232: the 6x6x6 color cube
 
-        valuerange = (0x00, 0x5f, 0x87, 0xaf, 0xd7, 0xff)
+        valuerange = _CUBE_LEVELS
 
         for i in range(217):
             r = valuerange[(i // 36) % 6]
@@ -139,10 +168,18 @@ class Terminal256Formatter(Formatter):
             self.xterm_colors.append((v, v, v))
 
     def _closest_color(self, r, g, b):
+        # the nearest colors in the cube and in the grayscale are looked up,
+        # only the 16 basic colors are searched; candidates are checked in
+        # the order of their index, so ties go to the lower one
+        ri, gi, bi = _NEAREST_LEVEL[r], _NEAREST_LEVEL[g], _NEAREST_LEVEL[b]
+        candidates = list(range(16))
+        candidates.append(16 + ri * 36 + gi * 6 + bi)
+        candidates.append(232 + _NEAREST_GRAY[r + g + b])
+
         distance = 257*257*3  # "infinity" (>distance from #000000 to #ffffff)
         match = 0
 
-        for i in range(0, 254):
+        for i in candidates:
             values = self.xterm_colors[i]
 
             rd = r - values[0]
@@ -171,6 +208,7 @@ class Terminal256Formatter(Formatter):
         return index
 
     def _setup_styles(self):
+        escapes = {}
         for ttype, ndef in self.style:
             escape = EscapeSequence()
             if ndef['color']:
@@ -181,8 +219,10 @@ class Terminal256Formatter(Formatter):
                 escape.bold = True
             if self.useunderline and ndef['underline']:
                 escape.underline = True
-            self.style_string[str(ttype)] = (escape.color_string(),
-                                             escape.reset_string())
+            self.style_string[str(ttype)] = escapes[ttype] = \
+                (escape.color_string(), escape.reset_string())
+        # the escape sequences of the nearest styled type, for every type
+        self._escapes = TokenTypeTable(escapes, ('', ''))
 
     def format(self, tokensource, outfile):
         # hack: if the output is a terminal and has an encoding set,
@@ -194,30 +234,22 @@ class Terminal256Formatter(Formatter):
         return Formatter.format(self, tokensource, outfile)
 
     def format_unencoded(self, tokensource, outfile):
+        escapes = self._escapes.values
         for ttype, value in tokensource:
-            not_found = True
-            while ttype and not_found:
-                try:
-                    # outfile.write( "<" + str(ttype) + ">" )
-                    on, off = self.style_string[str(ttype)]
-
-                    # Like TerminalFormatter, add "reset colors" escape sequence
-                    # on newline.
-                    spl = value.split('\n')
-                    for line in spl[:-1]:
-                        if line:
-                            outfile.write(on + line + off)
-                        outfile.write('\n')
-                    if spl[-1]:
-                        outfile.write(on + spl[-1] + off)
-
-                    not_found = False
-                    # outfile.write( '#' + str(ttype) + '#' )
-
-                except KeyError:
-                    # ottype = ttype
-                    ttype = ttype[:-1]
-                    # outfile.write( '!' + str(ottype) + '->' + str(ttype) + '!' )
-
-            if not_found:
+            try:
+                on, off = escapes[ttype.id]
+            except IndexError:
+                on, off = self._escapes[ttype]
+            if not on:
                 outfile.write(value)
+                continue
+
+            # Like TerminalFormatter, add "reset colors" escape sequence
+            # on newline.
+            spl = value.split('\n')
+            for line in spl[:-1]:
+                if line:
+                    outfile.write(on + line + off)
+                outfile.write('\n')
+            if spl[-1]:
+                outfile.write(on + spl[-1] + off)
@@ -11,21 +11,34 @@
 
 from __future__ import print_function
 
+import os
 import re
 import sys
+import codecs
 import time
+import pickle
+import hashlib
+import threading
 import itertools
+import weakref
+from bisect import bisect_left
+
+try:
+    from re import _parser as sre_parse
+except ImportError:  # Python < 3.11
+    import sre_parse
 
 from pygments.filter import apply_filters, Filter
 from pygments.filters import get_filter_by_name
-from pygments.token import Error, Text, Other, _TokenType
+from pygments.token import Error, Text, Other, _TokenType, TokenArray
 from pygments.util import get_bool_opt, get_int_opt, get_list_opt, \
-    make_analysator, text_type, add_metaclass, iteritems, Future, guess_decode
+    make_analysator, text_type, string_types, add_metaclass, iteritems, \
+    Future, guess_decode, unichr, count_lines, write_file_atomically
 from pygments.regexopt import regex_opt
 
 __all__ = ['Lexer', 'RegexLexer', 'ExtendedRegexLexer', 'DelegatingLexer',
            'LexerContext', 'include', 'inherit', 'bygroups', 'using', 'this',
-           'default', 'words']
+           'default', 'words', 'wordset']
 
 
 _encoding_map = [(b'\xef\xbb\xbf', 'utf-8'),
@@ -37,6 +50,33 @@ _encoding_map = [(b'\xef\xbb\xbf', 'utf-8'),
 _default_analyse = staticmethod(lambda x: 0.0)
 
 
+class _GuessingDecoder(object):
+    """
+    Incremental decoder for ``encoding='guess'``: decodes strictly with the
+    first of `encodings`, and switches to the next one as soon as some input
+    cannot be decoded.  The last encoding should be one that never fails.
+    """
+
+    def __init__(self, encodings):
+        self.encodings = list(encodings)
+        self.encoding = self.encodings.pop(0)
+        self.decoder = codecs.getincrementaldecoder(self.encoding)()
+
+    def decode(self, data, final=False):
+        while True:
+            # the bytes of an incomplete character at the end of the last
+            # input, which have not been decoded yet
+            pending = self.decoder.getstate()[0]
+            try:
+                return self.decoder.decode(data, final)
+            except UnicodeDecodeError:
+                if not self.encodings:
+                    raise
+                self.encoding = self.encodings.pop(0)
+                self.decoder = codecs.getincrementaldecoder(self.encoding)()
+                data = pending + data
+
+
 class LexerMeta(type):
     """
     This metaclass automagically converts ``analyse_text`` methods into
@@ -49,6 +89,26 @@ class LexerMeta(type):
         return type.__new__(cls, name, bases, d)
 
 
+class _TokenStream(object):
+    """
+    The iterable of ``(tokentype, value)`` pairs returned by
+    `Lexer.get_tokens`, whose values add up to a text of ``line_count``
+    lines.  Iterating over it gives the generator `tokens` itself.
+    """
+
+    def __init__(self, tokens, line_count):
+        self.tokens = tokens
+        self.line_count = line_count
+
+    def __iter__(self):
+        return self.tokens
+
+    def __next__(self):
+        return next(self.tokens)
+
+    next = __next__
+
+
 @add_metaclass(LexerMeta)
 class Lexer(object):
     """
@@ -96,6 +156,13 @@ class Lexer(object):
     #: Priority, should multiple lexers match and no content is provided
     priority = 0
 
+    #: If false, an instance must not lex several texts at the same time,
+    #: e.g. in different threads, because lexing keeps state on the lexer
+    #: instance or class.  A `LexerPool` never shares such lexers.
+    #:
+    #: .. versionadded:: 2.1
+    reentrant = True
+
     def __init__(self, **options):
         self.options = options
         self.stripnl = get_bool_opt(options, 'stripnl', True)
@@ -145,6 +212,14 @@ class Lexer(object):
 
         Also preprocess the text, i.e. expand tabs and strip it if
         wanted and applies registered filters.
+
+        If no filters are applied, the result has a ``line_count`` attribute
+        with the number of lines of the preprocessed text (as given by
+        `pygments.util.count_lines`), which formatters can use to output
+        line numbers before the lines themselves.
+
+        .. versionchanged:: 2.1
+           Added the ``line_count`` attribute.
         """
         if not isinstance(text, text_type):
             if self.encoding == 'guess':
@@ -192,19 +267,131 @@ class Lexer(object):
             for i, t, v in self.get_tokens_unprocessed(text):
                 yield t, v
         stream = streamer()
-        if not unfiltered:
-            stream = apply_filters(stream, self.filters, self)
-        return stream
+        if not unfiltered and self.filters:
+            # filters may change the text
+            return apply_filters(stream, self.filters, self)
+        return _TokenStream(stream, count_lines(text))
 
-    def get_tokens_unprocessed(self, text):
+    def get_tokens_stream(self, fileobj, unfiltered=False, chunksize=65536,
+                          lookahead=8192):
         """
-        Return an iterable of (index, tokentype, value) pairs where "index"
-        is the starting position of the token within the input text.
+        Like `get_tokens`, but read the text from the file-like object
+        `fileobj`, which can return byte or unicode strings.
 
-        In subclasses, implement this method as a generator to
-        maximize effectiveness.
+        Lexers derived from `RegexLexer` read, decode and lex the input in
+        chunks of `chunksize` characters, so that only a window of the text
+        is kept in memory (see `RegexLexer.get_tokens_stream`).  Other lexers
+        read the whole input at once.
+
+        .. versionadded:: 2.1
+        """
+        return self.get_tokens(fileobj.read(), unfiltered)
+
+    def get_token_array(self, text, unfiltered=False):
         """
-        raise NotImplementedError
+        Like `get_tokens`, but return the tokens as a `TokenArray`, which
+        needs much less memory than a list of tuples when the tokens are
+        kept around.
+
+        .. versionadded:: 2.1
+        """
+        return TokenArray(self.get_tokens(text, unfiltered))
+
+    def _get_decoder(self, head):
+        """
+        Return an incremental decoder for an input that starts with the
+        bytes `head`, according to the ``encoding`` option.
+        """
+        if self.encoding not in ('guess', 'chardet'):
+            return codecs.getincrementaldecoder(self.encoding)()
+        if self.encoding == 'chardet':
+            for bom, encoding in _encoding_map:
+                if head.startswith(bom):
+                    return codecs.getincrementaldecoder(encoding)('replace')
+            try:
+                import chardet
+            except ImportError:
+                raise ImportError('To enable chardet encoding guessing, '
+                                  'please install the chardet library '
+                                  'from http://chardet.feedparser.org/')
+            enc = chardet.detect(head[:1024])
+            return codecs.getincrementaldecoder(
+                enc.get('encoding') or 'utf-8')('replace')
+        # like guess_decode(), but the encoding has to be chosen before all
+        # of the input is known; a byte order mark is not looked for either
+        import locale
+        encodings = []
+        for encoding in ('utf-8', locale.getpreferredencoding(), 'latin1'):
+            try:
+                encoding = codecs.lookup(encoding).name
+            except LookupError:
+                continue
+            if encoding not in encodings:
+                encodings.append(encoding)
+        return _GuessingDecoder(encodings)
+
+    def _read_text(self, fileobj, chunksize):
+        """
+        Read `fileobj` in chunks of `chunksize`, and yield the preprocessed
+        text in pieces that add up to the text that `get_tokens` would lex.
+        """
+        if self.stripall:
+            chars = None
+        elif self.stripnl:
+            chars = u'\n'
+        else:
+            chars = u''
+        decoder = None
+        head = b''
+        bom = start = True
+        # a trailing '\r' of the last chunk, the incomplete last line, and
+        # whitespace that is only output if more text follows
+        carry = partial = held = last = u''
+        while True:
+            data = fileobj.read(chunksize)
+            eof = not data
+            if not isinstance(data, text_type):
+                if decoder is None:
+                    # collect enough bytes to recognize a byte order mark
+                    head += data
+                    if len(head) < 4 and not eof:
+                        continue
+                    decoder = self._get_decoder(head)
+                    # get_tokens() keeps a BOM decoded by guessing
+                    bom = self.encoding != 'guess'
+                    data = head
+                data = decoder.decode(data, eof)
+            if bom and data:
+                if data.startswith(u'\ufeff'):
+                    data = data[len(u'\ufeff'):]
+                bom = False
+            text = carry + data
+            carry = u''
+            if text.endswith(u'\r') and not eof:
+                text, carry = text[:-1], u'\r'
+            text = text.replace(u'\r\n', u'\n').replace(u'\r', u'\n')
+            if start:
+                text = text.lstrip(chars)
+                start = not text
+            text = partial + text
+            if eof:
+                partial = u''
+            else:
+                cut = text.rfind(u'\n') + 1
+                text, partial = text[:cut], text[cut:]
+            if self.tabsize > 0:
+                text = text.expandtabs(self.tabsize)
+            stripped = text.rstrip(chars)
+            if stripped:
+                yield held + stripped
+                held = text[len(stripped):]
+                last = stripped[-1]
+            else:
+                held += text
+            if eof:
+                break
+        if self.ensurenl and last != u'\n':
+            yield u'\n'
 
 
 class DelegatingLexer(Lexer):
@@ -337,6 +524,26 @@ class _This(object):
 this = _This()
 
 
+def _get_sublexer(sublexers, lexer, cls, kwargs):
+    """
+    Return an instance of `cls` for a `using` callback called by `lexer`,
+    with the options in `kwargs` and those of `lexer`.  The instance is
+    kept in `sublexers` and reused as long as the options stay the same.
+    """
+    options = kwargs.copy()
+    options.update(lexer.options)
+    try:
+        cached_options, lx = sublexers[lexer]
+    except KeyError:
+        pass
+    else:
+        if cached_options == options:
+            return lx
+    lx = cls(**options)
+    sublexers[lexer] = options, lx
+    return lx
+
+
 def using(_other, **kwargs):
     """
     Callback that processes the match with a different lexer.
@@ -349,6 +556,9 @@ def using(_other, **kwargs):
     string which is assumed to be on top of the root state.
 
     Note: For that to work, `_other` must not be an `ExtendedRegexLexer`.
+
+    The lexer instance made for a calling lexer is reused for later matches,
+    as long as the options of the calling lexer do not change.
     """
     gt_kwargs = {}
     if 'state' in kwargs:
@@ -358,14 +568,15 @@ def using(_other, **kwargs):
         else:
             gt_kwargs['stack'] = ('root', s)
 
+    # sublexers made for each calling lexer instance, see _get_sublexer()
+    sublexers = weakref.WeakKeyDictionary()
+
     if _other is this:
         def callback(lexer, match, ctx=None):
             # if keyword arguments are given the callback
             # function has to create a new lexer instance
             if kwargs:
-                # XXX: cache that somehow
-                kwargs.update(lexer.options)
-                lx = lexer.__class__(**kwargs)
+                lx = _get_sublexer(sublexers, lexer, lexer.__class__, kwargs)
             else:
                 lx = lexer
             s = match.start()
@@ -375,9 +586,7 @@ def using(_other, **kwargs):
                 ctx.pos = match.end()
     else:
         def callback(lexer, match, ctx=None):
-            # XXX: cache that somehow
-            kwargs.update(lexer.options)
-            lx = _other(**kwargs)
+            lx = _get_sublexer(sublexers, lexer, _other, kwargs)
 
             s = match.start()
             for i, t, v in lx.get_tokens_unprocessed(match.group(), **gt_kwargs):
@@ -415,6 +624,399 @@ class words(Future):
         return regex_opt(self.words, prefix=self.prefix, suffix=self.suffix)
 
 
+if hasattr(str, 'casefold'):
+    def _casefold(s):
+        return s.casefold()
+else:
+    def _casefold(s):
+        return s.lower()
+
+
+class wordset(object):
+    """
+    Like `words`, but for long lists: instead of building one big regex that
+    matches any of the words, match the generic regex `pattern` (wrapped in
+    `prefix` and `suffix`) and look the matched text up in a set of the words.
+    If it is not one of them, the rule does not match and the next rule is
+    tried.
+
+    Every word has to be a full match of `pattern`, and a word followed by
+    the rest of the text must only match `pattern` as a whole if the
+    `words` regex would match it, which holds if `pattern` matches as much
+    as it can (like ``\\w+``) and `suffix` does not match in front of
+    another character of a word (like ``\\b``).  If `ignorecase` is true,
+    the words are compared case-insensitively.
+
+    .. versionadded:: 2.1
+    """
+    def __init__(self, words, pattern=r'\w+', prefix='', suffix='',
+                 ignorecase=False):
+        self.words = words
+        self.pattern = pattern
+        self.prefix = prefix
+        self.suffix = suffix
+        self.ignorecase = ignorecase
+
+    def get(self, flags=0):
+        """Return a callable that can be used as the rule's ``match``."""
+        if self.ignorecase:
+            flags |= re.IGNORECASE
+        regex = re.compile('%s(?P<_wordset>%s)%s' %
+                           (self.prefix, self.pattern, self.suffix), flags)
+        wordmatch = re.compile('(?:%s)$' % self.pattern, flags).match
+        for word in self.words:
+            if not wordmatch(word):
+                raise ValueError('word %r does not match %r' %
+                                 (word, self.pattern))
+        if self.ignorecase:
+            words = frozenset(_casefold(word) for word in self.words)
+        else:
+            words = frozenset(self.words)
+        return _WordSetMatcher(regex, words, self.ignorecase)
+
+
+class _WordSetMatcher(object):
+    """
+    The ``match`` of a processed `wordset` rule.  ``regex`` is the compiled
+    generic regex.
+    """
+
+    def __init__(self, regex, words, ignorecase):
+        self.regex = regex
+        self.words = words
+        self.ignorecase = ignorecase
+
+    def __call__(self, text, pos=0, endpos=sys.maxsize):
+        m = self.regex.match(text, pos, endpos)
+        if m is not None:
+            word = m.group('_wordset')
+            if self.ignorecase:
+                word = _casefold(word)
+            if word in self.words:
+                return m
+        return None
+
+
+class _FusedRules(object):
+    """
+    Stands in for the action of a rule that is the combination of several
+    consecutive rules of a state.  ``rules`` maps the ``lastindex`` of a match
+    of the combined regex to the original ``(rexmatch, action, new_state)``.
+    """
+
+    def __init__(self, rules):
+        self.rules = rules
+
+
+# anything that would change meaning when a regex is embedded in a larger one
+_unfusable_re = re.compile(r'\\[1-9]|\(\?P=|\(\?\(')
+
+# older Python versions do not support more than 100 groups in one regex
+_fuse_max_groups = 99
+
+
+_category_escapes = {
+    sre_parse.CATEGORY_DIGIT: r'\d',
+    sre_parse.CATEGORY_NOT_DIGIT: r'\D',
+    sre_parse.CATEGORY_SPACE: r'\s',
+    sre_parse.CATEGORY_NOT_SPACE: r'\S',
+    sre_parse.CATEGORY_WORD: r'\w',
+    sre_parse.CATEGORY_NOT_WORD: r'\W',
+}
+
+
+def _first_char_regexes(items):
+    """
+    Return a list of regexes matching one character each that together match
+    every character a match of the parsed regex `items` can start with, and
+    whether the regex can also match the empty string.  Return ``None`` if
+    the regex can start with any character.
+    """
+    result = []
+    for op, av in items:
+        if op == sre_parse.LITERAL:
+            result.append(re.escape(unichr(av)))
+            return result, False
+        elif op == sre_parse.NOT_LITERAL:
+            result.append('[^%s]' % re.escape(unichr(av)))
+            return result, False
+        elif op == sre_parse.IN:
+            parts = []
+            for iop, iav in av:
+                if iop == sre_parse.NEGATE:
+                    parts.append('^')
+                elif iop == sre_parse.LITERAL:
+                    parts.append(re.escape(unichr(iav)))
+                elif iop == sre_parse.RANGE:
+                    parts.append('%s-%s' % (re.escape(unichr(iav[0])),
+                                            re.escape(unichr(iav[1]))))
+                elif iop == sre_parse.CATEGORY and iav in _category_escapes:
+                    parts.append(_category_escapes[iav])
+                else:
+                    return None
+            result.append('[%s]' % ''.join(parts))
+            return result, False
+        elif op in (sre_parse.AT, sre_parse.ASSERT, sre_parse.ASSERT_NOT):
+            # zero-width, so ignoring it can only add characters
+            continue
+        elif op == sre_parse.SUBPATTERN:
+            if len(av) == 4 and (av[1] or av[2]):
+                # scoped inline flags
+                return None
+            sub = _first_char_regexes(av[-1])
+        elif op == sre_parse.BRANCH:
+            nullable = False
+            for branch in av[1]:
+                sub = _first_char_regexes(branch)
+                if sub is None:
+                    return None
+                result.extend(sub[0])
+                nullable = nullable or sub[1]
+            if not nullable:
+                return result, False
+            continue
+        elif op in (sre_parse.MAX_REPEAT, sre_parse.MIN_REPEAT):
+            sub = _first_char_regexes(av[2])
+            if sub is not None and av[0] == 0:
+                sub = sub[0], True
+        else:
+            return None
+        if sub is None:
+            return None
+        result.extend(sub[0])
+        if not sub[1]:
+            return result, False
+    return result, True
+
+
+def _first_char_regex(rexmatch):
+    """
+    Return the pattern and flags of a regex that matches the characters a
+    match of the regex whose bound ``match`` method is `rexmatch` can start
+    with, or ``None`` if it can start with anything (including the end of
+    the text).
+    """
+    if isinstance(rexmatch, _WordSetMatcher):
+        compiled = rexmatch.regex
+    else:
+        compiled = getattr(rexmatch, '__self__', None)
+    if not isinstance(getattr(compiled, 'pattern', None), string_types):
+        return None
+    try:
+        first = _first_char_regexes(sre_parse.parse(compiled.pattern,
+                                                    compiled.flags))
+        if first is None or first[1]:
+            return None
+        pattern = '|'.join(first[0])
+        flags = compiled.flags & ~re.VERBOSE
+        re.compile(pattern, flags)
+        return pattern, flags
+    except Exception:
+        return None
+
+
+class _FirstCharTable(dict):
+    """
+    Maps a character to the rules of a state that can match at a position
+    where the text continues with that character, in order.  The empty string
+    stands for the end of the text.  Entries are computed on first use.
+
+    ``regexes`` holds the result of `_first_char_regex` for each rule, if it
+    is already known.
+    """
+
+    def __init__(self, rules, regexes=None):
+        dict.__init__(self)
+        self.rules = rules
+        self.regexes = regexes
+        self.matchers = None
+
+    def __missing__(self, char):
+        if self.matchers is None:
+            if self.regexes is None:
+                self.regexes = [_first_char_regex(rule[0])
+                                for rule in self.rules]
+            self.matchers = [regex and re.compile(*regex).match
+                             for regex in self.regexes]
+        self[char] = candidates = [
+            rule for (rule, matcher) in zip(self.rules, self.matchers)
+            if matcher is None or (char and matcher(char))]
+        return candidates
+
+
+class _StateRules(list):
+    """
+    The processed rules of a state.  ``by_first_char`` is a
+    `_FirstCharTable` that lets the lexing loop skip rules which cannot match
+    at the current position.
+    """
+
+    def __init__(self, rules, first_char_regexes=None):
+        list.__init__(self, rules)
+        self.by_first_char = _FirstCharTable(self, first_char_regexes)
+
+
+class _LazyTokendefs(dict):
+    """
+    The processed token definitions of a lexer class with `lazy_states` set.
+    A state is processed when it is looked up for the first time.
+    """
+
+    def __init__(self, cls, unprocessed):
+        dict.__init__(self)
+        self.cls = cls
+        self.unprocessed = unprocessed
+        # preprocessed rules, before _finish_state(); they are only used with
+        # the lock held, since lists in them may still be filled
+        self.rules = {}
+        self.lock = threading.RLock()
+
+    def __missing__(self, state):
+        with self.lock:
+            # another thread may have processed the state meanwhile
+            if dict.__contains__(self, state):
+                return dict.__getitem__(self, state)
+            if state not in self.rules:
+                if state not in self.unprocessed:
+                    raise KeyError(state)
+                self.cls._process_state(self.unprocessed, self.rules, state)
+            # only complete rules are published
+            rules = self.cls._finish_state(self.rules[state])
+            self[state] = rules
+            return rules
+
+    def __contains__(self, state):
+        if dict.__contains__(self, state) or state in self.unprocessed:
+            return True
+        with self.lock:
+            return state in self.rules
+
+
+_processing_digests = []
+
+
+def _processing_digest():
+    """
+    Return a digest of the source of the modules that process token
+    definitions, so that cached rules are not used after a change to them
+    (e.g. in a development version).
+    """
+    if not _processing_digests:
+        from pygments import regexopt
+        digest = hashlib.sha1()
+        for filename in __file__, regexopt.__file__:
+            if filename.endswith(('.pyc', '.pyo')):
+                filename = filename[:-1]
+            try:
+                with open(filename, 'rb') as fp:
+                    digest.update(fp.read())
+            except (IOError, OSError):
+                # only the version can tell then
+                pass
+        _processing_digests.append(digest.hexdigest())
+    return _processing_digests[0]
+
+
+def _describe_new_state(new_state):
+    """Return a representation of an unprocessed state transition."""
+    if isinstance(new_state, combined):
+        return ('combined',) + tuple(new_state)
+    return new_state
+
+
+def _tokendef_fingerprint(tokendefs):
+    """
+    Return a digest of everything in the unprocessed token definitions
+    `tokendefs` that the processed rules depend on, apart from the actions,
+    or ``None`` if they contain regexes that cannot be described.
+    """
+    desc = []
+    for state in sorted(tokendefs):
+        desc.append(state)
+        for tdef in tokendefs[state]:
+            if isinstance(tdef, include):
+                desc.append(('include', str(tdef)))
+            elif isinstance(tdef, _inherit):
+                desc.append('inherit')
+            elif isinstance(tdef, default):
+                desc.append(('default', _describe_new_state(tdef.state)))
+            else:
+                regex = tdef[0]
+                if isinstance(regex, words):
+                    regex = ('words', tuple(sorted(regex.words)),
+                             regex.prefix, regex.suffix)
+                elif isinstance(regex, wordset):
+                    regex = ('wordset', tuple(sorted(regex.words)),
+                             regex.pattern, regex.prefix, regex.suffix,
+                             regex.ignorecase)
+                elif not isinstance(regex, string_types):
+                    return None
+                desc.append((regex, len(tdef) > 2 and
+                             _describe_new_state(tdef[2])))
+    return hashlib.sha1(repr(desc).encode('utf-8')).hexdigest()
+
+
+def _rule_origins(tokendefs, processed):
+    """
+    Return a dict that maps each state in `processed` to a list of
+    ``(state, index)`` pairs, giving for each processed rule the definition in
+    `tokendefs` it comes from.  Return ``None`` if that cannot be determined
+    reliably.
+    """
+    origins = {}
+
+    def flatten(state):
+        # like _process_state(), including the handling of circular includes
+        if state in origins:
+            return origins[state]
+        result = origins[state] = []
+        for i, tdef in enumerate(tokendefs[state]):
+            if isinstance(tdef, include):
+                result.extend(flatten(str(tdef)))
+            elif not isinstance(tdef, _inherit):
+                result.append((state, i))
+        return result
+
+    for state in tokendefs:
+        flatten(state)
+    # find the anonymous states made by combined()
+    for state in tokendefs:
+        for rule, (ostate, i) in zip(processed[state], origins[state]):
+            tdef = tokendefs[ostate][i]
+            if isinstance(tdef, default):
+                new_state = tdef.state
+            else:
+                new_state = len(tdef) > 2 and tdef[2]
+            if isinstance(new_state, combined):
+                origins[rule[2][0]] = [origin for istate in new_state
+                                       for origin in flatten(istate)]
+    # check that the rules really belong together
+    for state, rules in iteritems(processed):
+        if len(origins.get(state, ())) != len(rules):
+            return None
+        for rule, (ostate, i) in zip(rules, origins[state]):
+            tdef = tokendefs[ostate][i]
+            if isinstance(tdef, default):
+                if rule[1] is not None:
+                    return None
+            elif rule[1] is not tdef[1] or (
+                    isinstance(tdef[0], string_types) and
+                    rule[0].__self__.pattern != tdef[0]) or (
+                    isinstance(tdef[0], wordset) !=
+                    isinstance(rule[0], _WordSetMatcher)):
+                return None
+    return origins
+
+
+def _add_checkpoint(checkpoints, pos, stack):
+    """
+    Record that the lexing loop arrived at `pos` with the state `stack`,
+    unless it had already been there.
+    """
+    if not checkpoints or checkpoints[-1][0] != pos:
+        checkpoints.append((pos, tuple(stack)))
+
+
 class RegexLexerMeta(LexerMeta):
     """
     Metaclass for RegexLexer, creates the self._tokens attribute from
@@ -423,6 +1025,8 @@ class RegexLexerMeta(LexerMeta):
 
     def _process_regex(cls, regex, rflags, state):
         """Preprocess the regular expression component of a token definition."""
+        if isinstance(regex, wordset):
+            return regex.get(rflags)
         if isinstance(regex, Future):
             regex = regex.get()
         return re.compile(regex, rflags).match
@@ -512,12 +1116,178 @@ class RegexLexerMeta(LexerMeta):
             tokens.append((rex, token, new_state))
         return tokens
 
+    def _fuse_rules(cls, rules, rflags):
+        """
+        Combine runs of consecutive rules of a state into single regexes.
+
+        Every rule's regex is wrapped in a numbered group and the rules are
+        joined into one alternation, so that one ``match()`` call finds the
+        first matching rule, whose wrapper group is the match's ``lastindex``.
+        Rules whose regex cannot be embedded in a larger one (backreferences,
+        named groups or global inline flags) are kept as they are.
+        """
+        baseflags = re.compile('', rflags).flags
+        fused = []
+        run = []
+
+        def flush():
+            if len(run) > 1:
+                parts = []
+                dispatch = [None]
+                for compiled, rule in run:
+                    dispatch.append(rule)
+                    dispatch.extend([None] * compiled.groups)
+                    if rflags & re.VERBOSE:
+                        parts.append('(%s\n)' % compiled.pattern)
+                    else:
+                        parts.append('(%s)' % compiled.pattern)
+                try:
+                    rex = re.compile('|'.join(parts), rflags)
+                except Exception:
+                    fused.extend(rule for compiled, rule in run)
+                else:
+                    fused.append((rex.match, _FusedRules(dispatch), None))
+            elif run:
+                fused.append(run[0][1])
+            del run[:]
+
+        ngroups = 0
+        for rule in rules:
+            compiled = getattr(rule[0], '__self__', None)
+            if not isinstance(getattr(compiled, 'pattern', None),
+                              string_types) or compiled.groupindex or \
+                    (compiled.pattern and compiled.flags != baseflags) or \
+                    _unfusable_re.search(compiled.pattern):
+                flush()
+                fused.append(rule)
+                continue
+            if ngroups + compiled.groups + 1 > _fuse_max_groups:
+                flush()
+                ngroups = 0
+            run.append((compiled, rule))
+            ngroups += compiled.groups + 1
+        flush()
+        return fused
+
+    def _finish_state(cls, rules, first_char_regexes=None):
+        """
+        Turn the list of preprocessed rules of a state into `_StateRules`.
+        `first_char_regexes` gives the `_first_char_regex` of each rule, if it
+        is already known.
+        """
+        if cls.fuse_rules:
+            rules = cls._fuse_rules(rules, cls.flags)
+            first_char_regexes = None
+        return _StateRules(rules, first_char_regexes)
+
+    def _cache_file(cls, name):
+        """Return the name of the file `cache_dir` holds for `name`."""
+        filename = '%s.%s' % (cls.__module__, cls.__name__)
+        if name:
+            filename += '-' + name
+        return os.path.join(cls.cache_dir, filename + '.pickle')
+
+    def _cache_key(cls, tokendefs):
+        """
+        Return the key under which the processed `tokendefs` are cached, or
+        ``None`` if they cannot be cached.
+        """
+        if type(cls) is not RegexLexerMeta:
+            # _process_regex() and friends may do something else
+            return None
+        fingerprint = _tokendef_fingerprint(tokendefs)
+        if fingerprint is None:
+            return None
+        import pygments
+        return (pygments.__version__, _processing_digest(),
+                sys.version_info[:2], cls.flags, fingerprint)
+
+    def _load_cached(cls, name, tokendefs, key):
+        """
+        Return the processed rules and their first character regexes from the
+        cache file, as a dict of ``(rules, first_char_regexes)`` pairs, or
+        ``None`` if the file does not exist or is out of date.
+        """
+        try:
+            with open(cls._cache_file(name), 'rb') as fp:
+                cached_key, states = pickle.load(fp)
+        except Exception:
+            return None
+        if cached_key != key:
+            return None
+        result = {}
+        empty = re.compile('').match
+        for state, entries in iteritems(states):
+            rules = []
+            first_char_regexes = []
+            for ostate, i, pattern, new_state, first_char in entries:
+                if pattern is None:
+                    # from default()
+                    rules.append((empty, None, new_state))
+                else:
+                    tdef = tokendefs[ostate][i]
+                    if isinstance(tdef[0], wordset):
+                        rex = tdef[0].get(cls.flags)
+                    else:
+                        rex = re.compile(pattern, cls.flags).match
+                    rules.append((rex, cls._process_token(tdef[1]),
+                                  new_state))
+                first_char_regexes.append(first_char)
+            result[state] = rules, first_char_regexes
+        return result
+
+    def _store_cached(cls, name, tokendefs, key, processed):
+        """
+        Write the processed rules to the cache file, and return a dict of
+        their first character regexes.  Return ``None`` if the rules cannot
+        be cached.
+        """
+        origins = _rule_origins(tokendefs, processed)
+        if origins is None:
+            return None
+        states = {}
+        regexes = {}
+        for state, rules in iteritems(processed):
+            entries = states[state] = []
+            regexes[state] = []
+            for (rex, action, new_state), (ostate, i) in \
+                    zip(rules, origins[state]):
+                first_char = _first_char_regex(rex)
+                regexes[state].append(first_char)
+                if action is None:
+                    pattern = None
+                elif isinstance(rex, _WordSetMatcher):
+                    pattern = rex.regex.pattern
+                else:
+                    pattern = rex.__self__.pattern
+                entries.append((ostate, i, pattern, new_state, first_char))
+        try:
+            write_file_atomically(cls._cache_file(name),
+                                  pickle.dumps((key, states), 2))
+        except (IOError, OSError):
+            pass
+        return regexes
+
     def process_tokendef(cls, name, tokendefs=None):
         """Preprocess a dictionary of token definitions."""
-        processed = cls._all_tokens[name] = {}
         tokendefs = tokendefs or cls.tokens[name]
+        if cls.lazy_states:
+            processed = cls._all_tokens[name] = _LazyTokendefs(cls, tokendefs)
+            return processed
+        processed = cls._all_tokens[name] = {}
+        key = cls.cache_dir and cls._cache_key(tokendefs)
+        cached = key and cls._load_cached(name, tokendefs, key)
+        if cached:
+            for state, (rules, first_char_regexes) in iteritems(cached):
+                processed[state] = cls._finish_state(rules,
+                                                     first_char_regexes)
+            return processed
         for state in list(tokendefs):
             cls._process_state(tokendefs, processed, state)
+        regexes = key and cls._store_cached(name, tokendefs, key, processed)
+        for state, rules in list(iteritems(processed)):
+            processed[state] = cls._finish_state(
+                rules, regexes and regexes[state])
         return processed
 
     def get_tokendefs(cls):
@@ -595,6 +1365,53 @@ class RegexLexer(Lexer):
     #: Defaults to MULTILINE.
     flags = re.MULTILINE
 
+    #: If true, consecutive rules of each state are combined into one regex
+    #: when the token definitions are processed, so that finding the matching
+    #: rule at a position takes a single ``match()`` call.  The result is the
+    #: same as trying the rules one by one.  Must be set before the first
+    #: instantiation of the lexer class (it can also be set on `RegexLexer`
+    #: itself to apply to all lexers).
+    #:
+    #: .. versionadded:: 2.1
+    fuse_rules = False
+
+    #: If true, the rules of each state are only processed and compiled when
+    #: the lexer enters the state for the first time, instead of all at the
+    #: first instantiation of the lexer class.  This makes the first use of a
+    #: lexer faster, but errors in the token definitions are only found when
+    #: the affected state is used.  Like `fuse_rules`, this must be set before
+    #: the first instantiation.
+    #:
+    #: .. versionadded:: 2.1
+    lazy_states = False
+
+    #: If set to the name of a directory, the processed token definitions of
+    #: each lexer class (with includes resolved and `words()` expanded) are
+    #: stored in a file in that directory when the class is first
+    #: instantiated, and are loaded from there in later processes.  The file
+    #: is updated when the token definitions, the Pygments version or the
+    #: source of the modules that process the definitions change.
+    #: Not used together with `lazy_states`.
+    #:
+    #: .. versionadded:: 2.1
+    cache_dir = None
+
+    #: If false, `update_tokens` always lexes the whole new text.  Lexers
+    #: whose callbacks keep state outside of the state stack (for example on
+    #: the lexer itself) must set this, since lexing cannot be resumed from a
+    #: checkpoint for them.
+    #:
+    #: .. versionadded:: 2.1
+    resumable = True
+
+    #: If false, `get_tokens_stream` reads the whole input before lexing.
+    #: Lexers whose callbacks look at the text after their match (e.g. at
+    #: ``ctx.text``) must set this, since that text may not have been read
+    #: yet.
+    #:
+    #: .. versionadded:: 2.1
+    streamable = True
+
     #: Dict of ``{'state': [(regex, tokentype, new_state), ...], ...}``
     #:
     #: The initial state is 'root'.
@@ -620,14 +1437,200 @@ class RegexLexer(Lexer):
 
         ``stack`` is the inital stack (default: ``['root']``)
         """
-        pos = 0
+        return self._lex(text, 0, stack, None)
+
+    def get_tokens_with_checkpoints(self, text):
+        """
+        Return a list of the ``(index, tokentype, value)`` tuples that
+        `get_tokens_unprocessed` yields for `text`, and a list of checkpoints,
+        i.e. ``(index, stack, count)`` tuples that give the state stack at the
+        start of each line and the number of tokens before it.  Both can be
+        given to `update_tokens` after an edit.
+
+        Lexers that override `get_tokens_unprocessed` or that are not
+        `resumable` return no checkpoints.
+
+        .. versionadded:: 2.1
+        """
+        checkpoints = []
+        if self._resumable():
+            tokens = list(self._lex_counted(text, 0, ('root',), checkpoints))
+        else:
+            tokens = list(self.get_tokens_unprocessed(text))
+        return tokens, checkpoints
+
+    def update_tokens(self, text, tokens, checkpoints, start, end, replacement):
+        """
+        Replace ``text[start:end]`` with `replacement`, and return a tuple of
+        the new text and its tokens and checkpoints.  `tokens` and
+        `checkpoints` must belong to `text`, as returned by
+        `get_tokens_with_checkpoints` or a previous call of this method.
+
+        Lexing restarts at the last checkpoint before the edit, and stops at
+        the first line start after the edit where the state stack is the same
+        as in the old run.  From there on, the old tokens and checkpoints are
+        reused (with their indices shifted).  Lexers whose rules look more
+        than a line back or ahead can get different results than from lexing
+        the new text from scratch.
+
+        Tokens are found by the counts in the checkpoints, not by their
+        indices, since callbacks may yield indices out of order (e.g. those
+        of the tokens of another lexer, relative to the part of the text it
+        lexes).
+
+        .. versionadded:: 2.1
+        """
+        newtext = text[:start] + replacement + text[end:]
+        if not self._resumable():
+            return (newtext,) + self.get_tokens_with_checkpoints(newtext)
+        delta = len(replacement) - (end - start)
+        editend = start + len(replacement)
+
+        # restart at the last line start before the edit; no match goes
+        # across a checkpoint, so the ones before it ended before the edit
+        ncheck = bisect_left(checkpoints, (start,))
+        if ncheck:
+            pos, stack, count = checkpoints[ncheck - 1]
+        else:
+            pos, stack, count = 0, ('root',), 0
+        newtokens = tokens[:count]
+        newcheckpoints = checkpoints[:ncheck]
+        seen = len(newcheckpoints)
+        for token in self._lex_counted(newtext, pos, stack, newcheckpoints,
+                                       count):
+            # checkpoints recorded since the last token all lie before this one
+            while seen < len(newcheckpoints):
+                pos, stack, count = newcheckpoints[seen]
+                seen += 1
+                if pos > editend:
+                    oldpos = pos - delta
+                    ncheck = bisect_left(checkpoints, (oldpos,), ncheck)
+                    if ncheck < len(checkpoints) and \
+                       checkpoints[ncheck][:2] == (oldpos, stack):
+                        # back in sync with the old run
+                        oldcount = checkpoints[ncheck][2]
+                        newtokens.extend(
+                            (i + delta, t, v) for (i, t, v) in
+                            tokens[oldcount:])
+                        shift = count - oldcount
+                        newcheckpoints.extend(
+                            (p + delta, s, c + shift) for (p, s, c) in
+                            checkpoints[ncheck + 1:])
+                        return newtext, newtokens, newcheckpoints
+            newtokens.append(token)
+        return newtext, newtokens, newcheckpoints
+
+    def get_tokens_stream(self, fileobj, unfiltered=False, chunksize=65536,
+                          lookahead=8192):
+        """
+        Like `get_tokens`, but read the text from the file-like object
+        `fileobj`, which can return byte or unicode strings, in chunks of
+        `chunksize` characters.  Byte strings are decoded incrementally
+        according to the ``encoding`` option.  With ``'guess'``, the input
+        is decoded as UTF-8, the locale's encoding or Latin-1, switching to
+        the next one when a chunk cannot be decoded; the text before that
+        stays as it was decoded, so the result differs from that of
+        `get_tokens` if it was not plain ASCII.  As with `get_tokens`, a byte
+        order mark at the start is removed, except with ``'guess'``.
+
+        Tokens are produced up to the last line start that lies at least
+        `lookahead` characters before the end of the text read so far; the
+        rest is lexed again together with the next chunk, starting with the
+        state stack reached at that line start (see
+        `get_tokens_with_checkpoints`).  So only about ``chunksize +
+        lookahead`` characters are held in memory, and the tokens are the
+        same as from `get_tokens` unless a rule needs to look further ahead
+        than `lookahead`.  Lexers that are not `resumable` or `streamable`
+        or that override `get_tokens_unprocessed` read the whole input at
+        once.
+
+        .. versionadded:: 2.1
+        """
+        if not (self.streamable and self._resumable()):
+            return Lexer.get_tokens_stream(self, fileobj, unfiltered)
+
+        def streamer():
+            buf = u''
+            # the line start in buf where lexing continues
+            pos = 0
+            stack = ('root',)
+            for piece in self._read_text(fileobj, chunksize):
+                buf += piece
+                limit = len(buf) - lookahead
+                if limit <= pos:
+                    continue
+                checkpoints = []
+                tokens = []
+                for token in self._lex_counted(buf, pos, stack, checkpoints):
+                    tokens.append(token)
+                    if token[0] >= limit:
+                        break
+                while checkpoints and checkpoints[-1][0] > limit:
+                    checkpoints.pop()
+                if not checkpoints or checkpoints[-1][0] <= pos:
+                    # no line start to continue from, read more
+                    continue
+                newpos, stack, count = checkpoints[-1]
+                for i, t, v in tokens[:count]:
+                    yield t, v
+                # keep the newline, so that lookbehinds and anchors at the
+                # new position behave as in the whole text
+                buf = buf[newpos - 1:]
+                pos = 1
+            for i, t, v in self._lex(buf, pos, stack, None):
+                yield t, v
+        stream = streamer()
+        if not unfiltered:
+            stream = apply_filters(stream, self.filters, self)
+        return stream
+
+    def _resumable(self):
+        """
+        Return whether the tokens of this lexer are exactly those produced by
+        the `_lex` loop, so that lexing can be resumed at a checkpoint.
+        """
+        if not self.resumable:
+            return False
+        for cls in type(self).__mro__:
+            if 'get_tokens_unprocessed' in cls.__dict__:
+                return cls in (RegexLexer, ExtendedRegexLexer)
+
+    def _lex_counted(self, text, pos, stack, checkpoints, count=0):
+        """
+        Like `_lex`, but append the checkpoints to `checkpoints` together with
+        the number of tokens before them, starting with `count`.
+        """
+        found = []
+        for token in self._lex(text, pos, stack, found):
+            if found:
+                for pos, stack in found:
+                    if not checkpoints or checkpoints[-1][0] != pos:
+                        checkpoints.append((pos, stack, count))
+                del found[:]
+            count += 1
+            yield token
+        for pos, stack in found:
+            if not checkpoints or checkpoints[-1][0] != pos:
+                checkpoints.append((pos, stack, count))
+
+    def _lex(self, text, pos, stack, checkpoints):
+        """
+        Lex `text` from `pos` on, starting with the state `stack`.  If
+        `checkpoints` is a list, ``(index, stack)`` checkpoints are appended
+        to it.
+        """
         tokendefs = self._tokens
         statestack = list(stack)
-        statetokens = tokendefs[statestack[-1]]
+        statetokens = tokendefs[statestack[-1]].by_first_char
         while 1:
-            for rexmatch, action, new_state in statetokens:
+            for rexmatch, action, new_state in statetokens[text[pos:pos + 1]]:
                 m = rexmatch(text, pos)
                 if m:
+                    if type(action) is _FusedRules:
+                        rexmatch, action, new_state = action.rules[m.lastindex]
+                        if action is not None and type(action) is not _TokenType:
+                            # callbacks expect the groups of their own regex
+                            m = rexmatch(text, pos)
                     if action is not None:
                         if type(action) is _TokenType:
                             yield pos, action, m.group()
@@ -652,16 +1655,20 @@ class RegexLexer(Lexer):
                             statestack.append(statestack[-1])
                         else:
                             assert False, "wrong state def: %r" % new_state
-                        statetokens = tokendefs[statestack[-1]]
+                        statetokens = tokendefs[statestack[-1]].by_first_char
+                    if checkpoints is not None and text[pos - 1:pos] == '\n':
+                        _add_checkpoint(checkpoints, pos, statestack)
                     break
             else:
                 try:
                     if text[pos] == '\n':
                         # at EOL, reset state to "root"
                         statestack = ['root']
-                        statetokens = tokendefs['root']
+                        statetokens = tokendefs['root'].by_first_char
                         yield pos, Text, u'\n'
                         pos += 1
+                        if checkpoints is not None:
+                            _add_checkpoint(checkpoints, pos, statestack)
                         continue
                     yield pos, Error, text[pos]
                     pos += 1
@@ -679,6 +1686,17 @@ class LexerContext(object):
         self.pos = pos
         self.end = end or len(text)  # end=0 not supported ;-)
         self.stack = stack or ['root']
+        self.checkpoints = None
+
+    def checkpoint(self):
+        """
+        Append the position and state stack to ``self.checkpoints``, if that
+        is all the state there is, i.e. when not lexing a part of the text and
+        no callback has stored other data in the context.
+        """
+        # text, pos, end, stack and checkpoints
+        if len(self.__dict__) == 5 and self.end == len(self.text):
+            _add_checkpoint(self.checkpoints, self.pos, self.stack)
 
     def __repr__(self):
         return 'LexerContext(%r, %r, %r)' % (
@@ -690,6 +1708,11 @@ class ExtendedRegexLexer(RegexLexer):
     A RegexLexer that uses a context object to store its state.
     """
 
+    def _lex(self, text, pos, stack, checkpoints):
+        ctx = LexerContext(text, pos, list(stack))
+        ctx.checkpoints = checkpoints
+        return self.get_tokens_unprocessed(context=ctx)
+
     def get_tokens_unprocessed(self, text=None, context=None):
         """
         Split ``text`` into (tokentype, text) pairs.
@@ -698,15 +1721,21 @@ class ExtendedRegexLexer(RegexLexer):
         tokendefs = self._tokens
         if not context:
             ctx = LexerContext(text, 0)
-            statetokens = tokendefs['root']
+            statetokens = tokendefs['root'].by_first_char
         else:
             ctx = context
-            statetokens = tokendefs[ctx.stack[-1]]
+            statetokens = tokendefs[ctx.stack[-1]].by_first_char
             text = ctx.text
         while 1:
-            for rexmatch, action, new_state in statetokens:
+            char = text[ctx.pos:min(ctx.pos + 1, ctx.end)]
+            for rexmatch, action, new_state in statetokens[char]:
                 m = rexmatch(text, ctx.pos, ctx.end)
                 if m:
+                    if type(action) is _FusedRules:
+                        rexmatch, action, new_state = action.rules[m.lastindex]
+                        if action is not None and type(action) is not _TokenType:
+                            # callbacks expect the groups of their own regex
+                            m = rexmatch(text, ctx.pos, ctx.end)
                     if action is not None:
                         if type(action) is _TokenType:
                             yield ctx.pos, action, m.group()
@@ -716,7 +1745,8 @@ class ExtendedRegexLexer(RegexLexer):
                                 yield item
                             if not new_state:
                                 # altered the state stack?
-                                statetokens = tokendefs[ctx.stack[-1]]
+                                statetokens = \
+                                    tokendefs[ctx.stack[-1]].by_first_char
                     # CAUTION: callback must set ctx.pos!
                     if new_state is not None:
                         # state transition
@@ -735,7 +1765,10 @@ class ExtendedRegexLexer(RegexLexer):
                             ctx.stack.append(ctx.stack[-1])
                         else:
                             assert False, "wrong state def: %r" % new_state
-                        statetokens = tokendefs[ctx.stack[-1]]
+                        statetokens = tokendefs[ctx.stack[-1]].by_first_char
+                    if ctx.checkpoints is not None and \
+                       text[ctx.pos - 1:ctx.pos] == '\n':
+                        ctx.checkpoint()
                     break
             else:
                 try:
@@ -744,9 +1777,11 @@ class ExtendedRegexLexer(RegexLexer):
                     if text[ctx.pos] == '\n':
                         # at EOL, reset state to "root"
                         ctx.stack = ['root']
-                        statetokens = tokendefs['root']
+                        statetokens = tokendefs['root'].by_first_char
                         yield ctx.pos, Text, u'\n'
                         ctx.pos += 1
+                        if ctx.checkpoints is not None:
+                            ctx.checkpoint()
                         continue
                     yield ctx.pos, Error, text[ctx.pos]
                     ctx.pos += 1
@@ -821,17 +1856,21 @@ class ProfilingRegexLexerMeta(RegexLexerMeta):
     """Metaclass for ProfilingRegexLexer, collects regex timing info."""
 
     def _process_regex(cls, regex, rflags, state):
-        if isinstance(regex, words):
-            rex = regex_opt(regex.words, prefix=regex.prefix,
-                            suffix=regex.suffix)
+        if isinstance(regex, wordset):
+            compiled = regex.get(rflags)
+            rex = compiled.regex.pattern
         else:
-            rex = regex
-        compiled = re.compile(rex, rflags)
+            if isinstance(regex, words):
+                rex = regex_opt(regex.words, prefix=regex.prefix,
+                                suffix=regex.suffix)
+            else:
+                rex = regex
+            compiled = re.compile(rex, rflags).match
 
         def match_func(text, pos, endpos=sys.maxsize):
             info = cls._prof_data[-1].setdefault((state, rex), [0, 0.0])
             t0 = time.time()
-            res = compiled.match(text, pos, endpos)
+            res = compiled(text, pos, endpos)
             t1 = time.time()
             info[0] += 1
             info[1] += t1 - t0
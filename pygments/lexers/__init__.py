@@ -9,16 +9,23 @@
     :license: BSD, see LICENSE for details.
 """
 
+import os
 import re
 import sys
 import types
 import fnmatch
+import hashlib
+import threading
+from itertools import chain
 from os.path import basename
 
-from pygments.lexers._mapping import LEXERS
+from pygments.lexers._mapping import LEXERS, ANALYSERS
 from pygments.modeline import get_filetype_from_buffer
-from pygments.plugin import find_plugin_lexers
-from pygments.util import ClassNotFound, itervalues, guess_decode
+from pygments.plugin import find_plugin_lexers, get_plugins, \
+    LEXER_ENTRY_POINT
+from pygments.util import ClassNotFound, itervalues, iteritems, guess_decode, \
+    shebang_matches, doctype_matches, looks_like_xml, text_type, \
+    write_file_atomically
 
 
 __all__ = ['get_lexer_by_name', 'get_lexer_for_filename', 'find_lexer_class',
@@ -44,6 +51,368 @@ def _load_lexers(module_name):
         _lexer_cache[cls.name] = cls
 
 
+def _get_lexer_class(target):
+    """Return the lexer class for an entry of a `_LexerIndex`: plugin
+    entries are the class itself, builtin entries the key in `LEXERS`."""
+    if not isinstance(target, str):
+        return target
+    module_name, name = LEXERS[target][:2]
+    if name not in _lexer_cache:
+        _load_lexers(module_name)
+    return _lexer_cache[name]
+
+
+def _priority(target):
+    """Return the priority of the lexer for an entry of a `_LexerIndex`."""
+    if not isinstance(target, str):
+        return target.priority
+    from pygments.lexers._analysers import PRIORITIES
+    return PRIORITIES.get(target, 0)
+
+
+def _class_name(target):
+    """Return the class name of the lexer for an entry of a `_LexerIndex`."""
+    if not isinstance(target, str):
+        return target.__name__
+    return target
+
+
+def _analyse_text(target, text):
+    """Return the ``analyse_text()`` result of the lexer for an entry of a
+    `_LexerIndex`, without importing builtin lexers."""
+    if not isinstance(target, str):
+        return target.analyse_text(text)
+    from pygments.lexers._analysers import ANALYSE_TEXT
+    if target in ANALYSE_TEXT:
+        return ANALYSE_TEXT[target](text)
+    return 0.0
+
+
+class _LexerIndex(object):
+    """Lookup tables for the names, aliases, filename patterns and mimetypes
+    of a list of lexers, given as ``(target, name, aliases, filenames,
+    mimetypes)`` tuples.  The tables map to the targets, and the first lexer
+    wins for duplicate keys.
+    """
+
+    def __init__(self, entries):
+        self.names = {}
+        self.aliases = {}
+        self.mimetypes = {}
+        self.globs = []       # (target, glob) in lookup order
+        self.exact = {}       # filename -> indices into globs
+        self.extensions = {}  # ".ext" for "*.ext" -> indices into globs
+        self.patterns = []    # indices of all other patterns
+        for target, name, aliases, filenames, mimetypes in entries:
+            self.names.setdefault(name, target)
+            for alias in aliases:
+                self.aliases.setdefault(alias, target)
+            for mimetype in mimetypes:
+                self.mimetypes.setdefault(mimetype, target)
+            for glob in filenames:
+                i = len(self.globs)
+                self.globs.append((target, glob))
+                if not _wildcard_re.search(glob):
+                    self.exact.setdefault(glob, []).append(i)
+                elif glob.startswith('*.') and \
+                        not _wildcard_re.search(glob, 1):
+                    self.extensions.setdefault(glob[1:], []).append(i)
+                else:
+                    self.patterns.append(i)
+        self.pattern_re = None
+        if self.patterns:
+            # one regex to rule out all other patterns at once
+            regexes = []
+            for i in self.patterns:
+                regex = fnmatch.translate(self.globs[i][1])
+                if regex.endswith('(?ms)'):
+                    regex = regex[:-5]
+                regexes.append('(?:%s)' % regex)
+            self.pattern_re = re.compile('|'.join(regexes), re.S | re.M)
+
+    def match_filename(self, fn):
+        """Return the ``(target, glob)`` entries with a pattern that
+        matches the file name `fn`, in lookup order."""
+        found = list(self.exact.get(fn, ()))
+        pos = fn.find('.')
+        while pos != -1:
+            found.extend(self.extensions.get(fn[pos:], ()))
+            pos = fn.find('.', pos + 1)
+        if self.pattern_re is not None and self.pattern_re.match(fn):
+            found.extend(i for i in self.patterns
+                         if _fn_matches(fn, self.globs[i][1]))
+        found.sort()
+        return [self.globs[i] for i in found]
+
+
+_wildcard_re = re.compile(r'[*?[]')
+_indexes = {}
+
+
+def _get_index(plugins=False):
+    """Return the `_LexerIndex` of the builtin or of the plugin lexers,
+    building it on first use."""
+    if plugins:
+        # a new list after pygments.plugin.refresh_plugins()
+        source = get_plugins(LEXER_ENTRY_POINT)
+    else:
+        source = LEXERS
+    try:
+        index_source, index = _indexes[plugins]
+    except KeyError:
+        pass
+    else:
+        if index_source is source:
+            return index
+    if plugins:
+        entries = [(cls, cls.name, cls.aliases, cls.filenames, cls.mimetypes)
+                   for cls in find_plugin_lexers()]
+    else:
+        entries = [(key,) + info[1:] for key, info in iteritems(LEXERS)]
+    index = _LexerIndex(entries)
+    _indexes[plugins] = source, index
+    return index
+
+
+def _qualified_name(target):
+    """Return the name of the lexer for an entry of a `_LexerIndex`, with
+    the module for plugins to tell them from builtin lexers."""
+    if not isinstance(target, str):
+        return '%s.%s' % (target.__module__, target.__name__)
+    return target
+
+
+def _find_target(qualified_name):
+    """Return the `_LexerIndex` entry for the lexer with the given
+    `_qualified_name()`, or None if there is no such lexer (any more)."""
+    if qualified_name in LEXERS:
+        return qualified_name
+    for cls in find_plugin_lexers():
+        if _qualified_name(cls) == qualified_name:
+            return cls
+
+
+class GuessCache(object):
+    """
+    Remembers the lexers chosen by `guess_lexer()`,
+    `guess_lexer_for_filename()` and `get_lexer_for_filename()` with `code`,
+    keyed by the file name and a digest of the text.  Install it with
+    `set_guess_cache()`.
+
+    At most `maxsize` results are kept in memory, dropping the least recently
+    used ones.  If `directory` is given, the results are also stored there,
+    in one small file each, for use by other processes.
+
+    `hits` and `misses` count the lookups; `clear()` forgets all results,
+    which is needed after installing or updating lexer plugins.
+    """
+
+    def __init__(self, maxsize=1024, directory=None):
+        self.maxsize = maxsize
+        self.directory = directory
+        self.hits = 0
+        self.misses = 0
+        # guards the entries, their list and the counters, since the cache
+        # may be used by several threads
+        self._lock = threading.Lock()
+        self._reset()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @staticmethod
+    def make_key(kind, fn, text):
+        """Return the key for the result of the guess named `kind`."""
+        if isinstance(text, text_type):
+            data = text.encode('utf-8', _encode_errors)
+        elif isinstance(text, bytes):
+            data = text
+        else:
+            raise TypeError('guessed code must be a string, not %r' %
+                            type(text).__name__)
+        return (kind, fn, isinstance(text, text_type),
+                hashlib.sha1(data).hexdigest())
+
+    def _filename(self, key):
+        import pygments
+        digest = hashlib.sha1(repr((pygments.__version__,) + key)
+                              .encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, digest + '.guess')
+
+    def __getitem__(self, key):
+        """Return the class name stored for `key` (``None`` if no lexer was
+        found), or raise `KeyError`."""
+        with self._lock:
+            link = self._entries.get(key)
+            if link is not None:
+                # move it to the most recently used end
+                link[0][1] = link[1]
+                link[1][0] = link[0]
+                root = self._root
+                link[0] = root[0]
+                link[1] = root
+                root[0][1] = root[0] = link
+                self.hits += 1
+                return link[3]
+        if self.directory:
+            try:
+                with open(self._filename(key), 'rb') as fp:
+                    value = str(fp.read().decode('utf-8')) or None
+            except (IOError, OSError, UnicodeError):
+                pass
+            else:
+                with self._lock:
+                    self._add(key, value)
+                    self.hits += 1
+                return value
+        with self._lock:
+            self.misses += 1
+        raise KeyError(key)
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._add(key, value)
+        if self.directory:
+            try:
+                write_file_atomically(self._filename(key),
+                                      (value or u'').encode('utf-8'))
+            except (IOError, OSError):
+                pass
+
+    def _add(self, key, value):
+        # called with the lock held
+        link = self._entries.pop(key, None)
+        if link is not None:
+            link[0][1] = link[1]
+            link[1][0] = link[0]
+        if self.maxsize <= 0:
+            return
+        while len(self._entries) >= self.maxsize:
+            oldest = self._root[1]
+            oldest[1][0] = self._root
+            self._root[1] = oldest[1]
+            del self._entries[oldest[2]]
+        root = self._root
+        link = [root[0], root, key, value]
+        root[0][1] = root[0] = self._entries[key] = link
+
+    def _reset(self):
+        self._entries = {}
+        # a doubly linked list of [prev, next, key, value] in order of use
+        self._root = root = []
+        root[:] = [root, root, None, None]
+
+    def clear(self):
+        """Forget all results, including those in `directory`."""
+        with self._lock:
+            self._reset()
+        if self.directory and os.path.isdir(self.directory):
+            for filename in os.listdir(self.directory):
+                if filename.endswith('.guess'):
+                    try:
+                        os.remove(os.path.join(self.directory, filename))
+                    except OSError:
+                        pass
+
+
+if sys.version_info < (3,):
+    _encode_errors = 'strict'
+else:
+    _encode_errors = 'surrogatepass'
+
+_guess_cache = None
+
+
+def set_guess_cache(cache):
+    """Make the lexer guessing functions use `cache`, a `GuessCache`, or no
+    cache if it is ``None``.  Return the previous cache."""
+    global _guess_cache
+    old, _guess_cache = _guess_cache, cache
+    return old
+
+
+def get_guess_cache():
+    """Return the `GuessCache` set with `set_guess_cache()`, or ``None``."""
+    return _guess_cache
+
+
+def _cached_guess(kind, fn, text, guess):
+    """Return the `_LexerIndex` entry for the lexer chosen for `text`, or
+    ``None``, from the guess cache or by calling `guess`."""
+    cache = _guess_cache
+    if cache is None:
+        return guess()
+    key = cache.make_key(kind, fn, text)
+    try:
+        name = cache[key]
+    except KeyError:
+        pass
+    else:
+        if name is None:
+            return None
+        target = _find_target(name)
+        if target is not None:
+            return target
+    target = guess()
+    cache[key] = target is not None and _qualified_name(target) or None
+    return target
+
+
+_guess_executor = None
+_guess_min_length = 0
+
+# number of batches the analysers are split into for an executor
+_GUESS_BATCHES = 8
+
+
+def set_guess_executor(executor, min_length=0):
+    """Make the lexer guessing functions run the analysers of the lexers in
+    batches on `executor`, a `concurrent.futures` executor, for texts with
+    at least `min_length` characters.  If `executor` is ``None``, they run
+    in the calling thread.  Return the previous executor."""
+    global _guess_executor, _guess_min_length
+    old = _guess_executor
+    _guess_executor, _guess_min_length = executor, min_length
+    return old
+
+
+def _score_targets(targets, text):
+    """Return the ``analyse_text()`` results for a list of `_LexerIndex`
+    entries, up to the first ``1.0``."""
+    scores = []
+    for target in targets:
+        rv = _analyse_text(target, text)
+        scores.append(rv)
+        if rv == 1.0:
+            break
+    return scores
+
+
+def _iter_scores(targets, text):
+    """Yield ``(score, target)`` for `targets` in order, up to the first
+    score of ``1.0``, using the executor set with `set_guess_executor()`."""
+    targets = list(targets)
+    executor = _guess_executor
+    if executor is None or len(text) < _guess_min_length or \
+            len(targets) < 2:
+        for target in targets:
+            yield _analyse_text(target, text), target
+        return
+    size = -(-len(targets) // _GUESS_BATCHES)
+    batches = [targets[i:i + size] for i in range(0, len(targets), size)]
+    futures = [executor.submit(_score_targets, batch, text)
+               for batch in batches]
+    try:
+        # in order, so that the result is the same as without executor
+        for batch, future in zip(batches, futures):
+            for item in zip(future.result(), batch):
+                yield item
+    finally:
+        # when the caller stopped at a 1.0
+        for future in futures:
+            future.cancel()
+
+
 def get_all_lexers():
     """Return a generator of tuples in the form ``(name, aliases,
     filenames, mimetypes)`` of all know lexers.
@@ -61,15 +430,11 @@ def find_lexer_class(name):
     """
     if name in _lexer_cache:
         return _lexer_cache[name]
-    # lookup builtin lexers
-    for module_name, lname, aliases, _, _ in itervalues(LEXERS):
-        if name == lname:
-            _load_lexers(module_name)
-            return _lexer_cache[name]
-    # continue with lexers from setuptools entrypoints
-    for cls in find_plugin_lexers():
-        if cls.name == name:
-            return cls
+    # lookup builtin lexers, then lexers from setuptools entrypoints
+    for plugins in (False, True):
+        target = _get_index(plugins).names.get(name)
+        if target:
+            return _get_lexer_class(target)
 
 
 def get_lexer_by_name(_alias, **options):
@@ -77,20 +442,22 @@ def get_lexer_by_name(_alias, **options):
 
     Raises ClassNotFound if not found.
     """
-    if not _alias:
-        raise ClassNotFound('no lexer for alias %r found' % _alias)
+    return _get_lexer_class_by_name(_alias)(**options)
+
+
+def _get_lexer_class_by_name(alias):
+    """Return the lexer class for an alias, or raise ClassNotFound."""
+    if not alias:
+        raise ClassNotFound('no lexer for alias %r found' % alias)
 
     # lookup builtin lexers
-    for module_name, name, aliases, _, _ in itervalues(LEXERS):
-        if _alias.lower() in aliases:
-            if name not in _lexer_cache:
-                _load_lexers(module_name)
-            return _lexer_cache[name](**options)
+    target = _get_index().aliases.get(alias.lower())
     # continue with lexers from setuptools entrypoints
-    for cls in find_plugin_lexers():
-        if _alias in cls.aliases:
-            return cls(**options)
-    raise ClassNotFound('no lexer for alias %r found' % _alias)
+    if not target:
+        target = _get_index(plugins=True).aliases.get(alias)
+    if target:
+        return _get_lexer_class(target)
+    raise ClassNotFound('no lexer for alias %r found' % alias)
 
 
 def find_lexer_class_for_filename(_fn, code=None):
@@ -103,23 +470,15 @@ def find_lexer_class_for_filename(_fn, code=None):
     """
     matches = []
     fn = basename(_fn)
-    for modname, name, _, filenames, _ in itervalues(LEXERS):
-        for filename in filenames:
-            if _fn_matches(fn, filename):
-                if name not in _lexer_cache:
-                    _load_lexers(modname)
-                matches.append((_lexer_cache[name], filename))
-    for cls in find_plugin_lexers():
-        for filename in cls.filenames:
-            if _fn_matches(fn, filename):
-                matches.append((cls, filename))
+    for plugins in (False, True):
+        matches.extend(_get_index(plugins).match_filename(fn))
 
     if sys.version_info > (3,) and isinstance(code, bytes):
         # decode it, since all analyse_text functions expect unicode
-        code = guess_decode(code)
+        code = guess_decode(code)[0]
 
     def get_rating(info):
-        cls, filename = info
+        target, filename = info
         # explicit patterns get a bonus
         bonus = '*' not in filename and 0.5 or 0
         # The class _always_ defines analyse_text because it's included in
@@ -127,14 +486,20 @@ def find_lexer_class_for_filename(_fn, code=None):
         # gets turned into 0.0.  Run scripts/detect_missing_analyse_text.py
         # to find lexers which need it overridden.
         if code:
-            return cls.analyse_text(code) + bonus
-        return cls.priority + bonus
+            return _analyse_text(target, code) + bonus
+        return _priority(target) + bonus
 
-    if matches:
+    def best_match():
         matches.sort(key=get_rating)
         # print "Possible lexers, after sort:", matches
         return matches[-1][0]
 
+    if len(matches) > 1 and code:
+        return _get_lexer_class(_cached_guess('filename', fn, code,
+                                              best_match))
+    if matches:
+        return _get_lexer_class(best_match())
+
 
 def get_lexer_for_filename(_fn, code=None, **options):
     """Get a lexer for a filename.
@@ -155,17 +520,85 @@ def get_lexer_for_mimetype(_mime, **options):
 
     Raises ClassNotFound if not found.
     """
-    for modname, name, _, _, mimetypes in itervalues(LEXERS):
-        if _mime in mimetypes:
-            if name not in _lexer_cache:
-                _load_lexers(modname)
-            return _lexer_cache[name](**options)
-    for cls in find_plugin_lexers():
-        if _mime in cls.mimetypes:
-            return cls(**options)
+    return _get_lexer_class_for_mimetype(_mime)(**options)
+
+
+def _get_lexer_class_for_mimetype(_mime):
+    """Return the lexer class for a mimetype, or raise ClassNotFound."""
+    for plugins in (False, True):
+        target = _get_index(plugins).mimetypes.get(_mime)
+        if target:
+            return _get_lexer_class(target)
     raise ClassNotFound('no lexer for mimetype %r found' % _mime)
 
 
+def _freeze(value):
+    """Return a hashable copy of an option value, or raise `TypeError`."""
+    if isinstance(value, dict):
+        return dict, frozenset((key, _freeze(item))
+                               for key, item in iteritems(value))
+    if isinstance(value, (list, tuple)):
+        return type(value), tuple(_freeze(item) for item in value)
+    if isinstance(value, (set, frozenset)):
+        return frozenset, frozenset(_freeze(item) for item in value)
+    hash(value)
+    return value
+
+
+class LexerPool(object):
+    """
+    Hands out shared lexer instances: lexers made with the same class and
+    options are only instantiated once, which saves the cost of lexers that
+    set up tables in ``__init__()``.
+
+    The shared instances can be used from several threads at once, since
+    lexing doesn't change the lexer, but they must not be modified (e.g.
+    with ``add_filter()``).  Lexers whose `reentrant` attribute is false,
+    and lexers with options that can't be hashed, are instantiated for each
+    call instead.
+    """
+
+    def __init__(self):
+        self._lexers = {}
+
+    def __len__(self):
+        return len(self._lexers)
+
+    def get_lexer(self, cls, **options):
+        """Return an instance of the lexer class `cls` with `options`."""
+        if not cls.reentrant:
+            return cls(**options)
+        try:
+            key = cls, _freeze(options)
+        except TypeError:
+            return cls(**options)
+        lexer = self._lexers.get(key)
+        if lexer is None:
+            # another thread may store the same lexer, which does no harm
+            lexer = self._lexers[key] = cls(**options)
+        return lexer
+
+    def get_lexer_by_name(self, _alias, **options):
+        """Like `get_lexer_by_name()`, with a shared instance."""
+        return self.get_lexer(_get_lexer_class_by_name(_alias), **options)
+
+    def get_lexer_for_filename(self, _fn, code=None, **options):
+        """Like `get_lexer_for_filename()`, with a shared instance."""
+        res = find_lexer_class_for_filename(_fn, code)
+        if not res:
+            raise ClassNotFound('no lexer for filename %r found' % _fn)
+        return self.get_lexer(res, **options)
+
+    def get_lexer_for_mimetype(self, _mime, **options):
+        """Like `get_lexer_for_mimetype()`, with a shared instance."""
+        return self.get_lexer(_get_lexer_class_for_mimetype(_mime),
+                              **options)
+
+    def clear(self):
+        """Drop all shared instances."""
+        self._lexers.clear()
+
+
 def _iter_lexerclasses(plugins=True):
     """Return an iterator over all lexer classes."""
     for key in sorted(LEXERS):
@@ -194,39 +627,86 @@ def guess_lexer_for_filename(_fn, _text, **options):
         >>> guess_lexer_for_filename('style.css', 'a { color: <?= $link ?> }')
         <pygments.lexers.templates.CssPhpLexer object at 0xb7ba518c>
     """
+    from pygments.lexers._analysers import ALIAS_FILENAMES
     fn = basename(_fn)
+    # map the matching lexers to whether the match is primary
     primary = {}
-    matching_lexers = set()
-    for lexer in _iter_lexerclasses():
-        for filename in lexer.filenames:
-            if _fn_matches(fn, filename):
-                matching_lexers.add(lexer)
-                primary[lexer] = True
-        for filename in lexer.alias_filenames:
+    for plugins in (False, True):
+        for target, _ in _get_index(plugins).match_filename(fn):
+            primary[target] = True
+    alias_filenames = list(iteritems(ALIAS_FILENAMES)) + \
+        [(cls, cls.alias_filenames) for cls in find_plugin_lexers()]
+    for target, filenames in alias_filenames:
+        for filename in filenames:
             if _fn_matches(fn, filename):
-                matching_lexers.add(lexer)
-                primary[lexer] = False
-    if not matching_lexers:
+                primary[target] = False
+    if not primary:
         raise ClassNotFound('no lexer for filename %r found' % fn)
-    if len(matching_lexers) == 1:
-        return matching_lexers.pop()(**options)
-    result = []
-    for lexer in matching_lexers:
-        rv = lexer.analyse_text(_text)
+    if len(primary) == 1:
+        return _get_lexer_class(list(primary)[0])(**options)
+
+    def best_match():
+        result = []
+        for rv, target in _iter_scores(sorted(primary, key=_class_name),
+                                       _text):
+            if rv == 1.0:
+                return target
+            result.append((rv, target))
+
+        def type_sort(t):
+            # sort by:
+            # - analyse score
+            # - is primary filename pattern?
+            # - priority
+            # - last resort: class name
+            return (t[0], primary[t[1]], _priority(t[1]), _class_name(t[1]))
+        result.sort(key=type_sort)
+        return result[-1][1]
+
+    target = _cached_guess('guess_filename', fn, _text, best_match)
+    return _get_lexer_class(target)(**options)
+
+
+def _guess_candidates(text):
+    """Return the names of the builtin lexers whose ``analyse_text()`` has a
+    hint, such as a shebang or doctype it checks for, that matches `text`.
+    """
+    hint_matches = {
+        'shebang': lambda regex: shebang_matches(text, regex),
+        'doctype': lambda regex: doctype_matches(text, regex),
+        'prefix': text.startswith,
+        'xml': lambda _: looks_like_xml(text),
+    }
+    if text[:2].lower() != '#!':
+        del hint_matches['shebang']
+    found = set()
+    for name, hints in iteritems(ANALYSERS):
+        for kind, arg in hints:
+            if kind in hint_matches and hint_matches[kind](arg):
+                found.add(name)
+                break
+    return found
+
+
+def _guess_target(text):
+    """Return the `_LexerIndex` entry for the lexer whose analyser rates
+    `text` best, or None."""
+    # try the lexers that look for a hint found in the text first, which
+    # avoids running all analysers if one of them is sure
+    for key in sorted(_guess_candidates(text)):
+        if _analyse_text(key, text) == 1.0:
+            return key
+
+    # the builtin analysers run without importing the lexer modules
+    from pygments.lexers._analysers import ANALYSE_TEXT
+    best_lexer = [0.0, None]
+    for rv, target in _iter_scores(chain(sorted(ANALYSE_TEXT),
+                                         find_plugin_lexers()), text):
         if rv == 1.0:
-            return lexer(**options)
-        result.append((rv, lexer))
-
-    def type_sort(t):
-        # sort by:
-        # - analyse score
-        # - is primary filename pattern?
-        # - priority
-        # - last resort: class name
-        return (t[0], primary[t[1]], t[1].priority, t[1].__name__)
-    result.sort(key=type_sort)
-
-    return result[-1][1](**options)
+            return target
+        if rv > best_lexer[0]:
+            best_lexer[:] = (rv, target)
+    return best_lexer[1]
 
 
 def guess_lexer(_text, **options):
@@ -241,16 +721,10 @@ def guess_lexer(_text, **options):
         except ClassNotFound:
             pass
 
-    best_lexer = [0.0, None]
-    for lexer in _iter_lexerclasses():
-        rv = lexer.analyse_text(_text)
-        if rv == 1.0:
-            return lexer(**options)
-        if rv > best_lexer[0]:
-            best_lexer[:] = (rv, lexer)
-    if not best_lexer[0] or best_lexer[1] is None:
+    target = _cached_guess('guess', None, _text, lambda: _guess_target(_text))
+    if target is None:
         raise ClassNotFound('no lexer matching the text found')
-    return best_lexer[1](**options)
+    return _get_lexer_class(target)(**options)
 
 
 class _automodule(types.ModuleType):
@@ -0,0 +1,1374 @@
+# -*- coding: utf-8 -*-
+"""
+    pygments.lexers._analysers
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Copies of the ``analyse_text()`` methods of the builtin lexers, and of
+    the other class attributes used for guessing, so that lexers can be
+    guessed without importing their modules.  This file is generated by
+    ``_mapping.py``; do not edit it by hand.
+
+    :copyright: Copyright 2006-2014 by the Pygments team, see AUTHORS.
+    :license: BSD, see LICENSE for details.
+"""
+
+import re
+
+from pygments.util import float_analyser, html_doctype_matches, \
+    looks_like_xml, shebang_matches
+
+
+def _create(factory):
+    """Return the analyser created by `factory`, returning floats."""
+    return float_analyser(factory())
+
+
+def _analyser(name):
+    """Return a function calling the analyser of the lexer `name`."""
+    return lambda text: ANALYSE_TEXT[name](text) \
+        if name in ANALYSE_TEXT else 0.0
+
+
+@_create
+def _ActionScript3Lexer():
+    def analyse_text(text):
+        if re.match(r'\w+\s*:\s*\w', text):
+            return 0.3
+        return 0
+    return analyse_text
+
+
+@_create
+def _AntlrActionScriptLexer():
+    class AntlrLexer(object):
+        analyse_text = staticmethod(_analyser('AntlrLexer'))
+
+    def analyse_text(text):
+        return AntlrLexer.analyse_text(text) and \
+            re.search(r'^\s*language\s*=\s*ActionScript\s*;', text, re.M)
+    return analyse_text
+
+
+@_create
+def _AntlrCSharpLexer():
+    class AntlrLexer(object):
+        analyse_text = staticmethod(_analyser('AntlrLexer'))
+
+    def analyse_text(text):
+        return AntlrLexer.analyse_text(text) and \
+            re.search(r'^\s*language\s*=\s*CSharp2\s*;', text, re.M)
+    return analyse_text
+
+
+@_create
+def _AntlrCppLexer():
+    class AntlrLexer(object):
+        analyse_text = staticmethod(_analyser('AntlrLexer'))
+
+    def analyse_text(text):
+        return AntlrLexer.analyse_text(text) and \
+            re.search(r'^\s*language\s*=\s*C\s*;', text, re.M)
+    return analyse_text
+
+
+@_create
+def _AntlrJavaLexer():
+    class AntlrLexer(object):
+        analyse_text = staticmethod(_analyser('AntlrLexer'))
+
+    def analyse_text(text):
+        # Antlr language is Java by default
+        return AntlrLexer.analyse_text(text) and 0.9
+    return analyse_text
+
+
+@_create
+def _AntlrLexer():
+    def analyse_text(text):
+        return re.search(r'^\s*grammar\s+[a-zA-Z0-9]+\s*;', text, re.M)
+    return analyse_text
+
+
+@_create
+def _AntlrObjectiveCLexer():
+    class AntlrLexer(object):
+        analyse_text = staticmethod(_analyser('AntlrLexer'))
+
+    def analyse_text(text):
+        return AntlrLexer.analyse_text(text) and \
+            re.search(r'^\s*language\s*=\s*ObjC\s*;', text)
+    return analyse_text
+
+
+@_create
+def _AntlrPerlLexer():
+    class AntlrLexer(object):
+        analyse_text = staticmethod(_analyser('AntlrLexer'))
+
+    def analyse_text(text):
+        return AntlrLexer.analyse_text(text) and \
+            re.search(r'^\s*language\s*=\s*Perl5\s*;', text, re.M)
+    return analyse_text
+
+
+@_create
+def _AntlrPythonLexer():
+    class AntlrLexer(object):
+        analyse_text = staticmethod(_analyser('AntlrLexer'))
+
+    def analyse_text(text):
+        return AntlrLexer.analyse_text(text) and \
+            re.search(r'^\s*language\s*=\s*Python\s*;', text, re.M)
+    return analyse_text
+
+
+@_create
+def _AntlrRubyLexer():
+    class AntlrLexer(object):
+        analyse_text = staticmethod(_analyser('AntlrLexer'))
+
+    def analyse_text(text):
+        return AntlrLexer.analyse_text(text) and \
+            re.search(r'^\s*language\s*=\s*Ruby\s*;', text, re.M)
+    return analyse_text
+
+
+@_create
+def _BashLexer():
+    def analyse_text(text):
+        if shebang_matches(text, r'(ba|z|)sh'):
+            return 1
+        if text.startswith('$ '):
+            return 0.2
+    return analyse_text
+
+
+@_create
+def _BugsLexer():
+    def analyse_text(text):
+        if re.search(r"^\s*model\s*{", text, re.M):
+            return 0.7
+        else:
+            return 0.0
+    return analyse_text
+
+
+@_create
+def _CLexer():
+    def analyse_text(text):
+        if re.search('^\s*#include [<"]', text, re.MULTILINE):
+            return 0.1
+        if re.search('^\s*#ifdef ', text, re.MULTILINE):
+            return 0.1
+    return analyse_text
+
+
+@_create
+def _CMakeLexer():
+    def analyse_text(text):
+        exp = r'^ *CMAKE_MINIMUM_REQUIRED *\( *VERSION *\d(\.\d)* *( FATAL_ERROR)? *\) *$'
+        if re.search(exp, text, flags=re.MULTILINE | re.IGNORECASE):
+            return 0.8
+        return 0.0
+    return analyse_text
+
+
+@_create
+def _CSharpAspxLexer():
+    def analyse_text(text):
+        if re.search(r'Page\s*Language="C#"', text, re.I) is not None:
+            return 0.2
+        elif re.search(r'script[^>]+language=["\']C#', text, re.I) is not None:
+            return 0.15
+    return analyse_text
+
+
+@_create
+def _Ca65Lexer():
+    def analyse_text(self, text):
+        # comments in GAS start with "#"
+        if re.match(r'^\s*;', text, re.MULTILINE):
+            return 0.9
+    return analyse_text
+
+
+@_create
+def _CbmBasicV2Lexer():
+    def analyse_text(self, text):
+        # if it starts with a line number, it shouldn't be a "modern" Basic
+        # like VB.net
+        if re.match(r'\d+', text):
+            return 0.2
+    return analyse_text
+
+
+@_create
+def _CoqLexer():
+    def analyse_text(text):
+        if text.startswith('(*'):
+            return True
+    return analyse_text
+
+
+@_create
+def _CppLexer():
+    def analyse_text(text):
+        if re.search('#include <[a-z]+>', text):
+            return 0.2
+        if re.search('using namespace ', text):
+            return 0.4
+    return analyse_text
+
+
+@_create
+def _CssDjangoLexer():
+    class DjangoLexer(object):
+        analyse_text = staticmethod(_analyser('DjangoLexer'))
+
+    def analyse_text(text):
+        return DjangoLexer.analyse_text(text) - 0.05
+    return analyse_text
+
+
+@_create
+def _CssErbLexer():
+    class ErbLexer(object):
+        analyse_text = staticmethod(_analyser('ErbLexer'))
+
+    def analyse_text(text):
+        return ErbLexer.analyse_text(text) - 0.05
+    return analyse_text
+
+
+@_create
+def _CssGenshiLexer():
+    class GenshiLexer(object):
+        analyse_text = staticmethod(_analyser('GenshiLexer'))
+
+    def analyse_text(text):
+        return GenshiLexer.analyse_text(text) - 0.05
+    return analyse_text
+
+
+@_create
+def _CssPhpLexer():
+    class PhpLexer(object):
+        analyse_text = staticmethod(_analyser('PhpLexer'))
+
+    def analyse_text(text):
+        return PhpLexer.analyse_text(text) - 0.05
+    return analyse_text
+
+
+@_create
+def _CssSmartyLexer():
+    class SmartyLexer(object):
+        analyse_text = staticmethod(_analyser('SmartyLexer'))
+
+    def analyse_text(text):
+        return SmartyLexer.analyse_text(text) - 0.05
+    return analyse_text
+
+
+@_create
+def _DiffLexer():
+    def analyse_text(text):
+        if text[:7] == 'Index: ':
+            return True
+        if text[:5] == 'diff ':
+            return True
+        if text[:4] == '--- ':
+            return 0.9
+    return analyse_text
+
+
+@_create
+def _DjangoLexer():
+    def analyse_text(text):
+        rv = 0.0
+        if re.search(r'\{%\s*(block|extends)', text) is not None:
+            rv += 0.4
+        if re.search(r'\{%\s*if\s*.*?%\}', text) is not None:
+            rv += 0.1
+        if re.search(r'\{\{.*?\}\}', text) is not None:
+            rv += 0.1
+        return rv
+    return analyse_text
+
+
+@_create
+def _DtdLexer():
+    def analyse_text(text):
+        if not looks_like_xml(text) and \
+           ('<!ELEMENT' in text or '<!ATTLIST' in text or '<!ENTITY' in text):
+            return 0.8
+    return analyse_text
+
+
+@_create
+def _ErbLexer():
+    def analyse_text(text):
+        if '<%' in text and '%>' in text:
+            return 0.4
+    return analyse_text
+
+
+@_create
+def _GasLexer():
+    def analyse_text(text):
+        if re.match(r'^\.(text|data|section)', text, re.M):
+            return True
+        elif re.match(r'^\.\w+', text, re.M):
+            return 0.1
+    return analyse_text
+
+
+@_create
+def _GenshiLexer():
+    class XmlLexer(object):
+        analyse_text = staticmethod(_analyser('XmlLexer'))
+
+    def analyse_text(text):
+        rv = 0.0
+        if re.search('\$\{.*?\}', text) is not None:
+            rv += 0.2
+        if re.search('py:(.*?)=["\']', text) is not None:
+            rv += 0.2
+        return rv + XmlLexer.analyse_text(text) - 0.01
+    return analyse_text
+
+
+@_create
+def _GroffLexer():
+    def analyse_text(text):
+        if text[:1] != '.':
+            return False
+        if text[:3] == '.\\"':
+            return True
+        if text[:4] == '.TH ':
+            return True
+        if text[1:3].isalnum() and text[3].isspace():
+            return 0.9
+    return analyse_text
+
+
+@_create
+def _GroovyLexer():
+    def analyse_text(text):
+        return shebang_matches(text, r'groovy')
+    return analyse_text
+
+
+@_create
+def _HaxeLexer():
+    def analyse_text(text):
+        if re.match(r'\w+\s*:\s*\w', text):
+            return 0.3
+    return analyse_text
+
+
+@_create
+def _HtmlDjangoLexer():
+    class DjangoLexer(object):
+        analyse_text = staticmethod(_analyser('DjangoLexer'))
+
+    def analyse_text(text):
+        rv = DjangoLexer.analyse_text(text) - 0.01
+        if html_doctype_matches(text):
+            rv += 0.5
+        return rv
+    return analyse_text
+
+
+@_create
+def _HtmlGenshiLexer():
+    class HtmlLexer(object):
+        analyse_text = staticmethod(_analyser('HtmlLexer'))
+
+    def analyse_text(text):
+        rv = 0.0
+        if re.search('\$\{.*?\}', text) is not None:
+            rv += 0.2
+        if re.search('py:(.*?)=["\']', text) is not None:
+            rv += 0.2
+        return rv + HtmlLexer.analyse_text(text) - 0.01
+    return analyse_text
+
+
+@_create
+def _HtmlLexer():
+    def analyse_text(text):
+        if html_doctype_matches(text):
+            return 0.5
+    return analyse_text
+
+
+@_create
+def _HtmlPhpLexer():
+    class PhpLexer(object):
+        analyse_text = staticmethod(_analyser('PhpLexer'))
+
+    def analyse_text(text):
+        rv = PhpLexer.analyse_text(text) - 0.01
+        if html_doctype_matches(text):
+            rv += 0.5
+        return rv
+    return analyse_text
+
+
+@_create
+def _HtmlSmartyLexer():
+    class SmartyLexer(object):
+        analyse_text = staticmethod(_analyser('SmartyLexer'))
+
+    def analyse_text(text):
+        rv = SmartyLexer.analyse_text(text) - 0.01
+        if html_doctype_matches(text):
+            rv += 0.5
+        return rv
+    return analyse_text
+
+
+@_create
+def _HttpLexer():
+    def analyse_text(text):
+        return text.startswith(('GET /', 'POST /', 'PUT /', 'DELETE /', 'HEAD /',
+                                'OPTIONS /', 'TRACE /', 'PATCH /'))
+    return analyse_text
+
+
+@_create
+def _HyLexer():
+    def analyse_text(text):
+        if '(import ' in text or '(defn ' in text:
+            return 0.9
+    return analyse_text
+
+
+@_create
+def _IniLexer():
+    def analyse_text(text):
+        npos = text.find('\n')
+        if npos < 3:
+            return False
+        return text[0] == '[' and text[npos-1] == ']'
+    return analyse_text
+
+
+@_create
+def _JagsLexer():
+    def analyse_text(text):
+        if re.search(r'^\s*model\s*\{', text, re.M):
+            if re.search(r'^\s*data\s*\{', text, re.M):
+                return 0.9
+            elif re.search(r'^\s*var', text, re.M):
+                return 0.9
+            else:
+                return 0.3
+        else:
+            return 0
+    return analyse_text
+
+
+@_create
+def _JasminLexer():
+    def analyse_text(text):
+        score = 0
+        if re.search(r'^\s*\.class\s', text, re.MULTILINE):
+            score += 0.5
+            if re.search(r'^\s*[a-z]+_[a-z]+\b', text, re.MULTILINE):
+                score += 0.3
+        if re.search(r'^\s*\.(attribute|bytecode|debug|deprecated|enclosing|'
+                     r'inner|interface|limit|set|signature|stack)\b', text,
+                     re.MULTILINE):
+            score += 0.6
+        return score
+    return analyse_text
+
+
+@_create
+def _JavascriptPhpLexer():
+    class PhpLexer(object):
+        analyse_text = staticmethod(_analyser('PhpLexer'))
+
+    def analyse_text(text):
+        return PhpLexer.analyse_text(text)
+    return analyse_text
+
+
+@_create
+def _JspLexer():
+    class JavaLexer(object):
+        analyse_text = staticmethod(_analyser('JavaLexer'))
+
+    def analyse_text(text):
+        rv = JavaLexer.analyse_text(text) - 0.01
+        if looks_like_xml(text):
+            rv += 0.4
+        if '<%' in text and '%>' in text:
+            rv += 0.1
+        return rv
+    return analyse_text
+
+
+@_create
+def _JuliaLexer():
+    def analyse_text(text):
+        return shebang_matches(text, r'julia')
+    return analyse_text
+
+
+@_create
+def _LassoCssLexer():
+    class LassoLexer(object):
+        analyse_text = staticmethod(_analyser('LassoLexer'))
+
+    def analyse_text(text):
+        rv = LassoLexer.analyse_text(text) - 0.05
+        if re.search(r'\w+:.+?;', text):
+            rv += 0.1
+        if 'padding:' in text:
+            rv += 0.1
+        return rv
+    return analyse_text
+
+
+@_create
+def _LassoHtmlLexer():
+    class LassoLexer(object):
+        analyse_text = staticmethod(_analyser('LassoLexer'))
+
+    def analyse_text(text):
+        rv = LassoLexer.analyse_text(text) - 0.01
+        if html_doctype_matches(text):  # same as HTML lexer
+            rv += 0.5
+        return rv
+    return analyse_text
+
+
+@_create
+def _LassoJavascriptLexer():
+    class LassoLexer(object):
+        analyse_text = staticmethod(_analyser('LassoLexer'))
+
+    def analyse_text(text):
+        rv = LassoLexer.analyse_text(text) - 0.05
+        if 'function' in text:
+            rv += 0.2
+        return rv
+    return analyse_text
+
+
+@_create
+def _LassoLexer():
+    def analyse_text(text):
+        rv = 0.0
+        if 'bin/lasso9' in text:
+            rv += 0.8
+        if re.search(r'<\?lasso', text, re.I):
+            rv += 0.4
+        if re.search(r'local\(', text, re.I):
+            rv += 0.4
+        return rv
+    return analyse_text
+
+
+@_create
+def _LassoXmlLexer():
+    class LassoLexer(object):
+        analyse_text = staticmethod(_analyser('LassoLexer'))
+
+    def analyse_text(text):
+        rv = LassoLexer.analyse_text(text) - 0.01
+        if looks_like_xml(text):
+            rv += 0.4
+        return rv
+    return analyse_text
+
+
+@_create
+def _LimboLexer():
+    def analyse_text(text):
+        # Any limbo module implements something
+        if re.search(r'^implement \w+;', text, re.MULTILINE):
+            return 0.7
+    return analyse_text
+
+
+@_create
+def _LogosLexer():
+    class LogosLexer(object):
+        _logos_keywords = re.compile('%(?:hook|ctor|init|c\\()', 0)
+
+    def analyse_text(text):
+        if LogosLexer._logos_keywords.search(text):
+            return 1.0
+        return 0
+    return analyse_text
+
+
+@_create
+def _LogtalkLexer():
+    def analyse_text(text):
+        if ':- object(' in text:
+            return 1.0
+        elif ':- protocol(' in text:
+            return 1.0
+        elif ':- category(' in text:
+            return 1.0
+        elif re.search('^:-\s[a-z]', text, re.M):
+            return 0.9
+        else:
+            return 0.0
+    return analyse_text
+
+
+@_create
+def _MakefileLexer():
+    def analyse_text(text):
+        # Many makefiles have $(BIG_CAPS) style variables
+        if re.search(r'\$\([A-Z_]+\)', text):
+            return 0.1
+    return analyse_text
+
+
+@_create
+def _MasonLexer():
+    def analyse_text(text):
+        rv = 0.0
+        if re.search('<&', text) is not None:
+            rv = 1.0
+        return rv
+    return analyse_text
+
+
+@_create
+def _MatlabLexer():
+    def analyse_text(text):
+        if re.match('^\s*%', text, re.M):  # comment
+            return 0.2
+        elif re.match('^!\w+', text, re.M):  # system cmd
+            return 0.2
+    return analyse_text
+
+
+@_create
+def _NixLexer():
+    def analyse_text(text):
+        rv = 0.0
+        # TODO: let/in
+        if re.search(r'import.+?<[^>]+>', text):
+            rv += 0.4
+        if re.search(r'mkDerivation\s+(\(|\{|rec)', text):
+            rv += 0.4
+        if re.search(r'=\s+mkIf\s+', text):
+            rv += 0.4
+        if re.search(r'\{[a-zA-Z,\s]+\}:', text):
+            rv += 0.1
+        return rv
+    return analyse_text
+
+
+@_create
+def _NumPyLexer():
+    def analyse_text(text):
+        return (shebang_matches(text, r'pythonw?(2(\.\d)?)?') or
+                'import ' in text[:1000]) \
+            and ('import numpy' in text or 'from numpy import' in text)
+    return analyse_text
+
+
+@_create
+def _ObjectiveCLexer():
+    _oc_keywords = re.compile('@(?:end|implementation|protocol)', 0)
+    _oc_message = re.compile('\\[\\s*[a-zA-Z_]\\w*\\s+(?:[a-zA-Z_]\\w*\\s*\\]|(?:[a-zA-Z_]\\w*)?:)', 0)
+    def analyse_text(text):
+        if _oc_keywords.search(text):
+            return 1.0
+        elif '@"' in text:  # strings
+            return 0.8
+        elif re.search('@[0-9]+', text):
+            return 0.7
+        elif _oc_message.search(text):
+            return 0.8
+        return 0
+    return analyse_text
+
+
+@_create
+def _ObjectiveJLexer():
+    def analyse_text(text):
+        if re.search('^\s*@import\s+[<"]', text, re.MULTILINE):
+            # special directive found in most Objective-J files
+            return True
+        return False
+    return analyse_text
+
+
+@_create
+def _Perl6Lexer():
+    class Perl6Lexer(object):
+        PERL6_IDENTIFIER_RANGE = "['\\w:-]"
+
+    def analyse_text(text):
+        def strip_pod(lines):
+            in_pod = False
+            stripped_lines = []
+
+            for line in lines:
+                if re.match(r'^=(?:end|cut)', line):
+                    in_pod = False
+                elif re.match(r'^=\w+', line):
+                    in_pod = True
+                elif not in_pod:
+                    stripped_lines.append(line)
+
+            return stripped_lines
+
+        # XXX handle block comments
+        lines = text.splitlines()
+        lines = strip_pod(lines)
+        text = '\n'.join(lines)
+
+        if shebang_matches(text, r'perl6|rakudo|niecza|pugs'):
+            return True
+
+        saw_perl_decl = False
+        rating = False
+
+        # check for my/our/has declarations
+        if re.search("(?:my|our|has)\s+(?:" + Perl6Lexer.PERL6_IDENTIFIER_RANGE +
+                     "+\s+)?[$@%&(]", text):
+            rating = 0.8
+            saw_perl_decl = True
+
+        for line in lines:
+            line = re.sub('#.*', '', line)
+            if re.match('^\s*$', line):
+                continue
+
+            # match v6; use v6; use v6.0; use v6.0.0;
+            if re.match('^\s*(?:use\s+)?v6(?:\.\d(?:\.\d)?)?;', line):
+                return True
+            # match class, module, role, enum, grammar declarations
+            class_decl = re.match('^\s*(?:(?P<scope>my|our)\s+)?(?:module|class|role|enum|grammar)', line)
+            if class_decl:
+                if saw_perl_decl or class_decl.group('scope') is not None:
+                    return True
+                rating = 0.05
+                continue
+            break
+
+        return rating
+    return analyse_text
+
+
+@_create
+def _PerlLexer():
+    def analyse_text(text):
+        if shebang_matches(text, r'perl'):
+            return True
+        if re.search('(?:my|our)\s+[$@%(]', text):
+            return 0.9
+    return analyse_text
+
+
+@_create
+def _PhpLexer():
+    def analyse_text(text):
+        rv = 0.0
+        if re.search(r'<\?(?!xml)', text):
+            rv += 0.3
+        return rv
+    return analyse_text
+
+
+@_create
+def _PrologLexer():
+    def analyse_text(text):
+        return ':-' in text
+    return analyse_text
+
+
+@_create
+def _Python3Lexer():
+    def analyse_text(text):
+        return shebang_matches(text, r'pythonw?3(\.\d)?')
+    return analyse_text
+
+
+@_create
+def _PythonLexer():
+    def analyse_text(text):
+        return shebang_matches(text, r'pythonw?(2(\.\d)?)?') or \
+            'import ' in text[:1000]
+    return analyse_text
+
+
+@_create
+def _QBasicLexer():
+    def analyse_text(text):
+        if '$DYNAMIC' in text or '$STATIC' in text:
+            return 0.9
+    return analyse_text
+
+
+@_create
+def _RagelCLexer():
+    def analyse_text(text):
+        return '@LANG: c' in text
+    return analyse_text
+
+
+@_create
+def _RagelCppLexer():
+    def analyse_text(text):
+        return '@LANG: c++' in text
+    return analyse_text
+
+
+@_create
+def _RagelDLexer():
+    def analyse_text(text):
+        return '@LANG: d' in text
+    return analyse_text
+
+
+@_create
+def _RagelEmbeddedLexer():
+    def analyse_text(text):
+        return '@LANG: indep' in text
+    return analyse_text
+
+
+@_create
+def _RagelJavaLexer():
+    def analyse_text(text):
+        return '@LANG: java' in text
+    return analyse_text
+
+
+@_create
+def _RagelObjectiveCLexer():
+    def analyse_text(text):
+        return '@LANG: objc' in text
+    return analyse_text
+
+
+@_create
+def _RagelRubyLexer():
+    def analyse_text(text):
+        return '@LANG: ruby' in text
+    return analyse_text
+
+
+@_create
+def _RebolLexer():
+    def analyse_text(text):
+        """
+        Check if code contains REBOL header and so it probably not R code
+        """
+        if re.match(r'^\s*REBOL\s*\[', text, re.IGNORECASE):
+            # The code starts with REBOL header
+            return 1.0
+        elif re.search(r'\s*REBOL\s*[', text, re.IGNORECASE):
+            # The code contains REBOL header but also some text before it
+            return 0.5
+    return analyse_text
+
+
+@_create
+def _RegeditLexer():
+    def analyse_text(text):
+        return text.startswith('Windows Registry Editor')
+    return analyse_text
+
+
+@_create
+def _ResourceLexer():
+    def analyse_text(text):
+        return text.startswith('root:table')
+    return analyse_text
+
+
+@_create
+def _RexxLexer():
+    class RexxLexer(object):
+        PATTERNS_AND_WEIGHTS = ((re.compile('^\\s*address\\s+command\\b', 8), 0.2), (re.compile('^\\s*address\\s+', 8), 0.05), (re.compile('^\\s*do\\s+while\\b', 8), 0.1), (re.compile('\\belse\\s+do\\s*$', 8), 0.1), (re.compile('^\\s*if\\b.+\\bthen\\s+do\\s*$', 8), 0.1), (re.compile('^\\s*([a-z_]\\w*)(\\s*)(:)(\\s*)(procedure)\\b', 8), 0.5), (re.compile('^\\s*parse\\s+(upper\\s+)?(arg|value)\\b', 8), 0.2))
+
+    def analyse_text(text):
+        """
+        Check for inital comment and patterns that distinguish Rexx from other
+        C-like languages.
+        """
+        if re.search(r'/\*\**\s*rexx', text, re.IGNORECASE):
+            # Header matches MVS Rexx requirements, this is certainly a Rexx
+            # script.
+            return 1.0
+        elif text.startswith('/*'):
+            # Header matches general Rexx requirements; the source code might
+            # still be any language using C comments such as C++, C# or Java.
+            lowerText = text.lower()
+            result = sum(weight
+                         for (pattern, weight) in RexxLexer.PATTERNS_AND_WEIGHTS
+                         if pattern.search(lowerText)) + 0.01
+            return min(result, 1.0)
+    return analyse_text
+
+
+@_create
+def _RhtmlLexer():
+    class ErbLexer(object):
+        analyse_text = staticmethod(_analyser('ErbLexer'))
+
+    def analyse_text(text):
+        rv = ErbLexer.analyse_text(text) - 0.01
+        if html_doctype_matches(text):
+            # one more than the XmlErbLexer returns
+            rv += 0.5
+        return rv
+    return analyse_text
+
+
+@_create
+def _RslLexer():
+    def analyse_text(text):
+        """
+        Check for the most common text in the beginning of a RSL file.
+        """
+        if re.search(r'scheme\s*.*?=\s*class\s*type', text, re.I) is not None:
+            return 1.0
+    return analyse_text
+
+
+@_create
+def _RstLexer():
+    def analyse_text(text):
+        if text[:2] == '..' and text[2:3] != '.':
+            return 0.3
+        p1 = text.find("\n")
+        p2 = text.find("\n", p1 + 1)
+        if (p2 > -1 and              # has two lines
+                p1 * 2 + 1 == p2 and     # they are the same length
+                text[p1+1] in '-=' and   # the next line both starts and ends with
+                text[p1+1] == text[p2-1]):  # ...a sufficiently high header
+            return 0.5
+    return analyse_text
+
+
+@_create
+def _RubyLexer():
+    def analyse_text(text):
+        return shebang_matches(text, r'ruby(1\.\d)?')
+    return analyse_text
+
+
+@_create
+def _SLexer():
+    def analyse_text(text):
+        if re.search(r'[a-z0-9_\])\s]<-(?!-)', text):
+            return 0.11
+    return analyse_text
+
+
+@_create
+def _SmaliLexer():
+    def analyse_text(text):
+        score = 0
+        if re.search(r'^\s*\.class\s', text, re.MULTILINE):
+            score += 0.5
+            if re.search(r'\b((check-cast|instance-of|throw-verification-error'
+                         r')\b|(-to|add|[ais]get|[ais]put|and|cmpl|const|div|'
+                         r'if|invoke|move|mul|neg|not|or|rem|return|rsub|shl|'
+                         r'shr|sub|ushr)[-/])|{|}', text, re.MULTILINE):
+                score += 0.3
+        if re.search(r'(\.(catchall|epilogue|restart local|prologue)|'
+                     r'\b(array-data|class-change-error|declared-synchronized|'
+                     r'(field|inline|vtable)@0x[0-9a-fA-F]|generic-error|'
+                     r'illegal-class-access|illegal-field-access|'
+                     r'illegal-method-access|instantiation-error|no-error|'
+                     r'no-such-class|no-such-field|no-such-method|'
+                     r'packed-switch|sparse-switch))\b', text, re.MULTILINE):
+            score += 0.6
+        return score
+    return analyse_text
+
+
+@_create
+def _SmartyLexer():
+    def analyse_text(text):
+        rv = 0.0
+        if re.search('\{if\s+.*?\}.*?\{/if\}', text):
+            rv += 0.15
+        if re.search('\{include\s+file=.*?\}', text):
+            rv += 0.15
+        if re.search('\{foreach\s+.*?\}.*?\{/foreach\}', text):
+            rv += 0.15
+        if re.search('\{\$.*?\}', text):
+            rv += 0.01
+        return rv
+    return analyse_text
+
+
+@_create
+def _SourcesListLexer():
+    def analyse_text(text):
+        for line in text.splitlines():
+            line = line.strip()
+            if line.startswith('deb ') or line.startswith('deb-src '):
+                return True
+    return analyse_text
+
+
+@_create
+def _SspLexer():
+    def analyse_text(text):
+        rv = 0.0
+        if re.search('val \w+\s*:', text):
+            rv += 0.6
+        if looks_like_xml(text):
+            rv += 0.2
+        if '<%' in text and '%>' in text:
+            rv += 0.1
+        return rv
+    return analyse_text
+
+
+@_create
+def _StanLexer():
+    def analyse_text(text):
+        if re.search(r'^\s*parameters\s*\{', text, re.M):
+            return 1.0
+        else:
+            return 0.0
+    return analyse_text
+
+
+@_create
+def _SwigLexer():
+    class SwigLexer(object):
+        swig_directives = set(['%apply', '%arg', '%attribute', '%bang', '%begin', '%callback', '%catches', '%clear', '%constant', '%copyctor', '%csconst', '%csconstvalue', '%csenum', '%csmethodmodifiers', '%csnothrowexception', '%default', '%defaultctor', '%defaultdtor', '%define', '%defined', '%delete', '%delobject', '%descriptor', '%director', '%enddef', '%exception', '%exceptionclass', '%exceptionvar', '%extend', '%extend_smart_pointer', '%feature', '%fragment', '%fragments', '%header', '%ifcplusplus', '%ignore', '%ignorewarn', '%immutable', '%implicit', '%implicitconv', '%import', '%include', '%init', '%inline', '%insert', '%javaconst', '%javaconstvalue', '%javaenum', '%javaexception', '%javamethodmodifiers', '%kwargs', '%luacode', '%module', '%mutable', '%naturalvar', '%nestedworkaround', '%newobject', '%nspace', '%perlcode', '%pragma', '%pythonabc', '%pythonappend', '%pythoncallback', '%pythoncode', '%pythondynamic', '%pythonmaybecall', '%pythonnondynamic', '%pythonprepend', '%refobject', '%rename', '%shadow', '%shared_ptr', '%sizeof', '%template', '%trackobjects', '%typecheck', '%typemap', '%types', '%unrefobject', '%varargs', '%warn', '%warnfilter'])
+
+    def analyse_text(text):
+        rv = 0
+        # Search for SWIG directives, which are conventionally at the beginning of
+        # a line. The probability of them being within a line is low, so let another
+        # lexer win in this case.
+        matches = re.findall(r'^\s*(%[a-z_][a-z0-9_]*)', text, re.M)
+        for m in matches:
+            if m in SwigLexer.swig_directives:
+                rv = 0.98
+                break
+            else:
+                rv = 0.91  # Fraction higher than MatlabLexer
+        return rv
+    return analyse_text
+
+
+@_create
+def _TclLexer():
+    def analyse_text(text):
+        return shebang_matches(text, r'(tcl)')
+    return analyse_text
+
+
+@_create
+def _TeaTemplateLexer():
+    class TeaLangLexer(object):
+        analyse_text = staticmethod(_analyser('TeaLangLexer'))
+
+    def analyse_text(text):
+        rv = TeaLangLexer.analyse_text(text) - 0.01
+        if looks_like_xml(text):
+            rv += 0.4
+        if '<%' in text and '%>' in text:
+            rv += 0.1
+        return rv
+    return analyse_text
+
+
+@_create
+def _TexLexer():
+    def analyse_text(text):
+        for start in ("\\documentclass", "\\input", "\\documentstyle",
+                      "\\relax"):
+            if text[:len(start)] == start:
+                return True
+    return analyse_text
+
+
+@_create
+def _VbNetAspxLexer():
+    def analyse_text(text):
+        if re.search(r'Page\s*Language="Vb"', text, re.I) is not None:
+            return 0.2
+        elif re.search(r'script[^>]+language=["\']vb', text, re.I) is not None:
+            return 0.15
+    return analyse_text
+
+
+@_create
+def _VbNetLexer():
+    def analyse_text(text):
+        if re.search(r'^\s*(#If|Module|Namespace)', text, re.MULTILINE):
+            return 0.5
+    return analyse_text
+
+
+@_create
+def _VelocityLexer():
+    def analyse_text(text):
+        rv = 0.0
+        if re.search(r'#\{?macro\}?\(.*?\).*?#\{?end\}?', text):
+            rv += 0.25
+        if re.search(r'#\{?if\}?\(.+?\).*?#\{?end\}?', text):
+            rv += 0.15
+        if re.search(r'#\{?foreach\}?\(.+?\).*?#\{?end\}?', text):
+            rv += 0.15
+        if re.search(r'\$\{?[a-zA-Z_]\w*(\([^)]*\))?'
+                     r'(\.\w+(\([^)]*\))?)*\}?', text):
+            rv += 0.01
+        return rv
+    return analyse_text
+
+
+@_create
+def _VelocityXmlLexer():
+    class VelocityLexer(object):
+        analyse_text = staticmethod(_analyser('VelocityLexer'))
+
+    def analyse_text(text):
+        rv = VelocityLexer.analyse_text(text) - 0.01
+        if looks_like_xml(text):
+            rv += 0.4
+        return rv
+    return analyse_text
+
+
+@_create
+def _XmlDjangoLexer():
+    class DjangoLexer(object):
+        analyse_text = staticmethod(_analyser('DjangoLexer'))
+
+    def analyse_text(text):
+        rv = DjangoLexer.analyse_text(text) - 0.01
+        if looks_like_xml(text):
+            rv += 0.4
+        return rv
+    return analyse_text
+
+
+@_create
+def _XmlErbLexer():
+    class ErbLexer(object):
+        analyse_text = staticmethod(_analyser('ErbLexer'))
+
+    def analyse_text(text):
+        rv = ErbLexer.analyse_text(text) - 0.01
+        if looks_like_xml(text):
+            rv += 0.4
+        return rv
+    return analyse_text
+
+
+@_create
+def _XmlLexer():
+    def analyse_text(text):
+        if looks_like_xml(text):
+            return 0.45  # less than HTML
+    return analyse_text
+
+
+@_create
+def _XmlPhpLexer():
+    class PhpLexer(object):
+        analyse_text = staticmethod(_analyser('PhpLexer'))
+
+    def analyse_text(text):
+        rv = PhpLexer.analyse_text(text) - 0.01
+        if looks_like_xml(text):
+            rv += 0.4
+        return rv
+    return analyse_text
+
+
+@_create
+def _XmlSmartyLexer():
+    class SmartyLexer(object):
+        analyse_text = staticmethod(_analyser('SmartyLexer'))
+
+    def analyse_text(text):
+        rv = SmartyLexer.analyse_text(text) - 0.01
+        if looks_like_xml(text):
+            rv += 0.4
+        return rv
+    return analyse_text
+
+
+@_create
+def _XsltLexer():
+    def analyse_text(text):
+        if looks_like_xml(text) and '<xsl' in text:
+            return 0.8
+    return analyse_text
+
+
+ANALYSE_TEXT = {
+    'ActionScript3Lexer': _ActionScript3Lexer,
+    'AntlrActionScriptLexer': _AntlrActionScriptLexer,
+    'AntlrCSharpLexer': _AntlrCSharpLexer,
+    'AntlrCppLexer': _AntlrCppLexer,
+    'AntlrJavaLexer': _AntlrJavaLexer,
+    'AntlrLexer': _AntlrLexer,
+    'AntlrObjectiveCLexer': _AntlrObjectiveCLexer,
+    'AntlrPerlLexer': _AntlrPerlLexer,
+    'AntlrPythonLexer': _AntlrPythonLexer,
+    'AntlrRubyLexer': _AntlrRubyLexer,
+    'BashLexer': _BashLexer,
+    'BugsLexer': _BugsLexer,
+    'CLexer': _CLexer,
+    'CMakeLexer': _CMakeLexer,
+    'CSharpAspxLexer': _CSharpAspxLexer,
+    'Ca65Lexer': _Ca65Lexer,
+    'CbmBasicV2Lexer': _CbmBasicV2Lexer,
+    'CoqLexer': _CoqLexer,
+    'CppLexer': _CppLexer,
+    'CssDjangoLexer': _CssDjangoLexer,
+    'CssErbLexer': _CssErbLexer,
+    'CssGenshiLexer': _CssGenshiLexer,
+    'CssPhpLexer': _CssPhpLexer,
+    'CssSmartyLexer': _CssSmartyLexer,
+    'CudaLexer': _CLexer,
+    'DiffLexer': _DiffLexer,
+    'DjangoLexer': _DjangoLexer,
+    'DtdLexer': _DtdLexer,
+    'ECLexer': _CLexer,
+    'ErbLexer': _ErbLexer,
+    'GasLexer': _GasLexer,
+    'GenshiLexer': _GenshiLexer,
+    'GroffLexer': _GroffLexer,
+    'GroovyLexer': _GroovyLexer,
+    'HaxeLexer': _HaxeLexer,
+    'HtmlDjangoLexer': _HtmlDjangoLexer,
+    'HtmlGenshiLexer': _HtmlGenshiLexer,
+    'HtmlLexer': _HtmlLexer,
+    'HtmlPhpLexer': _HtmlPhpLexer,
+    'HtmlSmartyLexer': _HtmlSmartyLexer,
+    'HttpLexer': _HttpLexer,
+    'HyLexer': _HyLexer,
+    'IniLexer': _IniLexer,
+    'JagsLexer': _JagsLexer,
+    'JasminLexer': _JasminLexer,
+    'JavascriptDjangoLexer': _CssDjangoLexer,
+    'JavascriptErbLexer': _CssErbLexer,
+    'JavascriptGenshiLexer': _CssGenshiLexer,
+    'JavascriptPhpLexer': _JavascriptPhpLexer,
+    'JavascriptSmartyLexer': _CssSmartyLexer,
+    'JspLexer': _JspLexer,
+    'JuliaLexer': _JuliaLexer,
+    'LassoCssLexer': _LassoCssLexer,
+    'LassoHtmlLexer': _LassoHtmlLexer,
+    'LassoJavascriptLexer': _LassoJavascriptLexer,
+    'LassoLexer': _LassoLexer,
+    'LassoXmlLexer': _LassoXmlLexer,
+    'LimboLexer': _LimboLexer,
+    'LogosLexer': _LogosLexer,
+    'LogtalkLexer': _LogtalkLexer,
+    'MakefileLexer': _MakefileLexer,
+    'MasonLexer': _MasonLexer,
+    'MatlabLexer': _MatlabLexer,
+    'MqlLexer': _CppLexer,
+    'NesCLexer': _CLexer,
+    'NixLexer': _NixLexer,
+    'NumPyLexer': _NumPyLexer,
+    'ObjectiveCLexer': _ObjectiveCLexer,
+    'ObjectiveCppLexer': _ObjectiveCLexer,
+    'ObjectiveJLexer': _ObjectiveJLexer,
+    'Perl6Lexer': _Perl6Lexer,
+    'PerlLexer': _PerlLexer,
+    'PhpLexer': _PhpLexer,
+    'PikeLexer': _CppLexer,
+    'PrologLexer': _PrologLexer,
+    'Python3Lexer': _Python3Lexer,
+    'PythonLexer': _PythonLexer,
+    'QBasicLexer': _QBasicLexer,
+    'RagelCLexer': _RagelCLexer,
+    'RagelCppLexer': _RagelCppLexer,
+    'RagelDLexer': _RagelDLexer,
+    'RagelEmbeddedLexer': _RagelEmbeddedLexer,
+    'RagelJavaLexer': _RagelJavaLexer,
+    'RagelObjectiveCLexer': _RagelObjectiveCLexer,
+    'RagelRubyLexer': _RagelRubyLexer,
+    'RebolLexer': _RebolLexer,
+    'RegeditLexer': _RegeditLexer,
+    'ResourceLexer': _ResourceLexer,
+    'RexxLexer': _RexxLexer,
+    'RhtmlLexer': _RhtmlLexer,
+    'RslLexer': _RslLexer,
+    'RstLexer': _RstLexer,
+    'RubyLexer': _RubyLexer,
+    'SLexer': _SLexer,
+    'SmaliLexer': _SmaliLexer,
+    'SmartyLexer': _SmartyLexer,
+    'SourcesListLexer': _SourcesListLexer,
+    'SspLexer': _SspLexer,
+    'StanLexer': _StanLexer,
+    'SwigLexer': _SwigLexer,
+    'TclLexer': _TclLexer,
+    'TeaTemplateLexer': _TeaTemplateLexer,
+    'TexLexer': _TexLexer,
+    'VbNetAspxLexer': _VbNetAspxLexer,
+    'VbNetLexer': _VbNetLexer,
+    'VelocityLexer': _VelocityLexer,
+    'VelocityXmlLexer': _VelocityXmlLexer,
+    'XmlDjangoLexer': _XmlDjangoLexer,
+    'XmlErbLexer': _XmlErbLexer,
+    'XmlLexer': _XmlLexer,
+    'XmlPhpLexer': _XmlPhpLexer,
+    'XmlSmartyLexer': _XmlSmartyLexer,
+    'XsltLexer': _XsltLexer,
+}
+
+ALIAS_FILENAMES = {
+    'CssDjangoLexer': ('*.css',),
+    'CssErbLexer': ('*.css',),
+    'CssGenshiLexer': ('*.css',),
+    'CssPhpLexer': ('*.css',),
+    'CssSmartyLexer': ('*.css', '*.tpl'),
+    'GenshiLexer': ('*.xml',),
+    'HtmlDjangoLexer': ('*.html', '*.htm', '*.xhtml'),
+    'HtmlGenshiLexer': ('*.html', '*.htm', '*.xhtml'),
+    'HtmlPhpLexer': ('*.php', '*.html', '*.htm', '*.xhtml', '*.php[345]'),
+    'HtmlSmartyLexer': ('*.html', '*.htm', '*.xhtml', '*.tpl'),
+    'JavascriptDjangoLexer': ('*.js',),
+    'JavascriptErbLexer': ('*.js',),
+    'JavascriptGenshiLexer': ('*.js',),
+    'JavascriptPhpLexer': ('*.js',),
+    'JavascriptSmartyLexer': ('*.js', '*.tpl'),
+    'LassoCssLexer': ('*.css',),
+    'LassoHtmlLexer': ('*.html', '*.htm', '*.xhtml', '*.lasso', '*.lasso[89]', '*.incl', '*.inc', '*.las'),
+    'LassoJavascriptLexer': ('*.js',),
+    'LassoLexer': ('*.incl', '*.inc', '*.las'),
+    'LassoXmlLexer': ('*.xml', '*.lasso', '*.lasso[89]', '*.incl', '*.inc', '*.las'),
+    'RhtmlLexer': ('*.html', '*.htm', '*.xhtml'),
+    'VelocityHtmlLexer': ('*.html', '*.fhtml'),
+    'VelocityXmlLexer': ('*.xml', '*.vm'),
+    'XmlDjangoLexer': ('*.xml',),
+    'XmlErbLexer': ('*.xml',),
+    'XmlPhpLexer': ('*.xml', '*.php', '*.php[345]'),
+    'XmlSmartyLexer': ('*.xml', '*.tpl'),
+}
+
+PRIORITIES = {
+    'CLexer': 0.1,
+    'CppLexer': 0.1,
+    'CudaLexer': 0.1,
+    'ECLexer': 0.1,
+    'LogosLexer': 0.25,
+    'MqlLexer': 0.1,
+    'NesCLexer': 0.1,
+    'ObjectiveCLexer': 0.05,
+    'ObjectiveCppLexer': 0.05,
+    'PikeLexer': 0.1,
+    'SwigLexer': 0.04,
+}
@@ -9,7 +9,7 @@
     :license: BSD, see LICENSE for details.
 """
 
-BUILTIN_FUNCTIONS = set((  # 638 functions
+BUILTIN_FUNCTIONS = frozenset((  # 638 functions
     '<', '<=', '=', '>', '>=', '-', '/', '/=', '*', '+', '1-', '1+',
     'abort', 'abs', 'acons', 'acos', 'acosh', 'add-method', 'adjoin',
     'adjustable-array-p', 'adjust-array', 'allocate-instance',
@@ -159,7 +159,7 @@ BUILTIN_FUNCTIONS = set((  # 638 functions
     'y-or-n-p', 'zerop',
 ))
 
-SPECIAL_FORMS = set((
+SPECIAL_FORMS = frozenset((
     'block', 'catch', 'declare', 'eval-when', 'flet', 'function', 'go', 'if',
     'labels', 'lambda', 'let', 'let*', 'load-time-value', 'locally', 'macrolet',
     'multiple-value-call', 'multiple-value-prog1', 'progn', 'progv', 'quote',
@@ -167,7 +167,7 @@ SPECIAL_FORMS = set((
     'unwind-protect',
 ))
 
-MACROS = set((
+MACROS = frozenset((
     'and', 'assert', 'call-method', 'case', 'ccase', 'check-type', 'cond',
     'ctypecase', 'decf', 'declaim', 'defclass', 'defconstant', 'defgeneric',
     'define-compiler-macro', 'define-condition', 'define-method-combination',
@@ -190,17 +190,17 @@ MACROS = set((
     'with-slots', 'with-standard-io-syntax',
 ))
 
-LAMBDA_LIST_KEYWORDS = set((
+LAMBDA_LIST_KEYWORDS = frozenset((
     '&allow-other-keys', '&aux', '&body', '&environment', '&key', '&optional',
     '&rest', '&whole',
 ))
 
-DECLARATIONS = set((
+DECLARATIONS = frozenset((
     'dynamic-extent', 'ignore', 'optimize', 'ftype', 'inline', 'special',
     'ignorable', 'notinline', 'type',
 ))
 
-BUILTIN_TYPES = set((
+BUILTIN_TYPES = frozenset((
     'atom', 'boolean', 'base-char', 'base-string', 'bignum', 'bit',
     'compiled-function', 'extended-char', 'fixnum', 'keyword', 'nil',
     'signed-byte', 'short-float', 'single-float', 'double-float', 'long-float',
@@ -219,7 +219,7 @@ BUILTIN_TYPES = set((
     'undefined-function', 'warning',
 ))
 
-BUILTIN_CLASSES = set((
+BUILTIN_CLASSES = frozenset((
     'array', 'broadcast-stream', 'bit-vector', 'built-in-class', 'character',
     'class', 'complex', 'concatenated-stream', 'cons', 'echo-stream',
     'file-stream', 'float', 'function', 'generic-function', 'hash-table',
@@ -7,7 +7,7 @@
     you change something on a builtin lexer definition, run this script from
     the lexers folder to update it.
 
-    Do not alter the LEXERS dictionary by hand.
+    Do not alter the LEXERS and ANALYSERS dictionaries by hand.
 
     :copyright: Copyright 2006-2014 by the Pygments team, see AUTHORS.
     :license: BSD, see LICENSE for details.
@@ -372,12 +372,369 @@ LEXERS = {
     'ZephirLexer': ('pygments.lexers.php', 'Zephir', ('zephir',), ('*.zep',), ()),
 }
 
+# Lexers with an analyse_text() method, and the hints for the prefilter of
+# guess_lexer() found in it.
+ANALYSERS = {
+    'ActionScript3Lexer': (),
+    'AntlrActionScriptLexer': (),
+    'AntlrCSharpLexer': (),
+    'AntlrCppLexer': (),
+    'AntlrJavaLexer': (),
+    'AntlrLexer': (),
+    'AntlrObjectiveCLexer': (),
+    'AntlrPerlLexer': (),
+    'AntlrPythonLexer': (),
+    'AntlrRubyLexer': (),
+    'BashLexer': (('prefix', '$ '), ('shebang', '(ba|z|)sh')),
+    'BugsLexer': (),
+    'CLexer': (),
+    'CMakeLexer': (),
+    'CSharpAspxLexer': (),
+    'Ca65Lexer': (),
+    'CbmBasicV2Lexer': (),
+    'CoqLexer': (('prefix', '(*'),),
+    'CppLexer': (),
+    'CssDjangoLexer': (),
+    'CssErbLexer': (),
+    'CssGenshiLexer': (),
+    'CssPhpLexer': (),
+    'CssSmartyLexer': (),
+    'CudaLexer': (),
+    'DiffLexer': (('prefix', '--- '), ('prefix', 'Index: '), ('prefix', 'diff ')),
+    'DjangoLexer': (),
+    'DtdLexer': (('xml', ''),),
+    'ECLexer': (),
+    'ErbLexer': (),
+    'GasLexer': (),
+    'GenshiLexer': (),
+    'GroffLexer': (('prefix', '.TH '), ('prefix', '.\\"')),
+    'GroovyLexer': (('shebang', 'groovy'),),
+    'HaxeLexer': (),
+    'HtmlDjangoLexer': (('doctype', 'html'),),
+    'HtmlGenshiLexer': (),
+    'HtmlLexer': (('doctype', 'html'),),
+    'HtmlPhpLexer': (('doctype', 'html'),),
+    'HtmlSmartyLexer': (('doctype', 'html'),),
+    'HttpLexer': (('prefix', 'DELETE /'), ('prefix', 'GET /'), ('prefix', 'HEAD /'), ('prefix', 'OPTIONS /'), ('prefix', 'PATCH /'), ('prefix', 'POST /'), ('prefix', 'PUT /'), ('prefix', 'TRACE /')),
+    'HyLexer': (),
+    'IniLexer': (('prefix', '['),),
+    'JagsLexer': (),
+    'JasminLexer': (),
+    'JavascriptDjangoLexer': (),
+    'JavascriptErbLexer': (),
+    'JavascriptGenshiLexer': (),
+    'JavascriptPhpLexer': (),
+    'JavascriptSmartyLexer': (),
+    'JspLexer': (('xml', ''),),
+    'JuliaLexer': (('shebang', 'julia'),),
+    'LassoCssLexer': (),
+    'LassoHtmlLexer': (('doctype', 'html'),),
+    'LassoJavascriptLexer': (),
+    'LassoLexer': (),
+    'LassoXmlLexer': (('xml', ''),),
+    'LimboLexer': (),
+    'LogosLexer': (),
+    'LogtalkLexer': (),
+    'MakefileLexer': (),
+    'MasonLexer': (),
+    'MatlabLexer': (),
+    'MqlLexer': (),
+    'NesCLexer': (),
+    'NixLexer': (),
+    'NumPyLexer': (('shebang', 'pythonw?(2(\\.\\d)?)?'),),
+    'ObjectiveCLexer': (),
+    'ObjectiveCppLexer': (),
+    'ObjectiveJLexer': (),
+    'Perl6Lexer': (('shebang', 'perl6|rakudo|niecza|pugs'),),
+    'PerlLexer': (('shebang', 'perl'),),
+    'PhpLexer': (),
+    'PikeLexer': (),
+    'PrologLexer': (),
+    'Python3Lexer': (('shebang', 'pythonw?3(\\.\\d)?'),),
+    'PythonLexer': (('shebang', 'pythonw?(2(\\.\\d)?)?'),),
+    'QBasicLexer': (),
+    'RagelCLexer': (),
+    'RagelCppLexer': (),
+    'RagelDLexer': (),
+    'RagelEmbeddedLexer': (),
+    'RagelJavaLexer': (),
+    'RagelObjectiveCLexer': (),
+    'RagelRubyLexer': (),
+    'RebolLexer': (),
+    'RegeditLexer': (('prefix', 'Windows Registry Editor'),),
+    'ResourceLexer': (('prefix', 'root:table'),),
+    'RexxLexer': (('prefix', '/*'),),
+    'RhtmlLexer': (('doctype', 'html'),),
+    'RslLexer': (),
+    'RstLexer': (('prefix', '..'),),
+    'RubyLexer': (('shebang', 'ruby(1\\.\\d)?'),),
+    'SLexer': (),
+    'SmaliLexer': (),
+    'SmartyLexer': (),
+    'SourcesListLexer': (),
+    'SspLexer': (('xml', ''),),
+    'StanLexer': (),
+    'SwigLexer': (),
+    'TclLexer': (('shebang', '(tcl)'),),
+    'TeaTemplateLexer': (('xml', ''),),
+    'TexLexer': (),
+    'VbNetAspxLexer': (),
+    'VbNetLexer': (),
+    'VelocityLexer': (),
+    'VelocityXmlLexer': (('xml', ''),),
+    'XmlDjangoLexer': (('xml', ''),),
+    'XmlErbLexer': (('xml', ''),),
+    'XmlLexer': (('xml', ''),),
+    'XmlPhpLexer': (('xml', ''),),
+    'XmlSmartyLexer': (('xml', ''),),
+    'XsltLexer': (('xml', ''),),
+}
+
 if __name__ == '__main__':  # pragma: no cover
     import sys
     import os
+    import io
+    import re
+    import ast
+    import types
+    import inspect
+    import textwrap
+
+    def find_analyser(lexer):
+        """Return the original ``analyse_text()`` function of `lexer`, or
+        None if it doesn't override it."""
+        for base in lexer.__mro__:
+            if 'analyse_text' in base.__dict__:
+                break
+        if base.__module__ == 'pygments.lexer':
+            return None
+        # the function is wrapped by make_analysator()
+        wrapper = base.__dict__['analyse_text'].__get__(None, base)
+        return wrapper.__closure__[0].cell_contents
+
+    def parse_function(func):
+        """Return the source and the AST of `func`."""
+        source = textwrap.dedent(inspect.getsource(func))
+        return source, ast.parse(source).body[0]
+
+    def find_hints(lexer):
+        """Return the hints for the prefilter of `guess_lexer()` found in
+        the ``analyse_text()`` of `lexer`, or None if it has none."""
+        analyser = find_analyser(lexer)
+        if analyser is None:
+            return None
+        func = parse_function(analyser)[1]
+        arg = func.args.args[0]
+        text = getattr(arg, 'arg', None) or getattr(arg, 'id', None)
+
+        def strings(node):
+            if isinstance(node, ast.Tuple):
+                return [s for elt in node.elts for s in strings(elt)]
+            value = getattr(node, 's', getattr(node, 'value', None))
+            if isinstance(value, (str, type(u''))):
+                return [value]
+            return []
+
+        def is_text(node):
+            return isinstance(node, ast.Name) and node.id == text
+
+        def is_head(node):
+            if isinstance(node, ast.Slice):
+                return node.lower is None
+            if type(node).__name__ == 'Index':
+                node = node.value
+            return getattr(node, 'n', getattr(node, 'value', None)) == 0
+
+        hints = []
+        for node in ast.walk(func):
+            if isinstance(node, ast.Call) and node.args and \
+               is_text(node.args[0]):
+                name = getattr(node.func, 'id', None)
+                if name in ('shebang_matches', 'doctype_matches'):
+                    for regex in strings(node.args[1]):
+                        hints.append((name[:-8], regex))
+                elif name == 'html_doctype_matches':
+                    hints.append(('doctype', 'html'))
+                elif name == 'looks_like_xml':
+                    hints.append(('xml', ''))
+            elif isinstance(node, ast.Call) and \
+                    isinstance(node.func, ast.Attribute) and \
+                    node.func.attr == 'startswith' and \
+                    is_text(node.func.value) and node.args:
+                for prefix in strings(node.args[0]):
+                    hints.append(('prefix', prefix))
+            elif isinstance(node, ast.Compare) and \
+                    isinstance(node.left, ast.Subscript) and \
+                    is_text(node.left.value) and is_head(node.left.slice) \
+                    and isinstance(node.ops[0], ast.Eq):
+                # text[:n] == 'prefix' or text[0] == 'c'
+                for prefix in strings(node.comparators[0]):
+                    hints.append(('prefix', prefix))
+        return tuple(sorted(set(hints)))
+
+    def copy_value(value, imports):
+        """Return the source of a value used by an analyser."""
+        if isinstance(value, type(re.compile(''))):
+            # str patterns get re.UNICODE implicitly on Python 3
+            return 're.compile(%s, %d)' % (copy_value(value.pattern, imports),
+                                           value.flags & ~re.UNICODE)
+        if isinstance(value, (set, frozenset)):
+            return '%s([%s])' % (type(value).__name__, ', '.join(
+                copy_value(item, imports) for item in sorted(value)))
+        if isinstance(value, list):
+            return '[%s]' % ', '.join(copy_value(item, imports)
+                                      for item in value)
+        if isinstance(value, tuple):
+            items = [copy_value(item, imports) for item in value]
+            return '(%s%s)' % (', '.join(items), len(items) == 1 and ',' or '')
+        if isinstance(value, dict):
+            return '{%s}' % ', '.join(
+                '%s: %s' % (copy_value(key, imports),
+                            copy_value(value[key], imports))
+                for key in sorted(value))
+        if isinstance(value, type(u'')) and \
+                any(ord(char) > 127 for char in value):
+            return 'u' + repr(value).lstrip('u')
+        if value is None or isinstance(value, (bool, int, float, str,
+                                               type(u''))):
+            return repr(value)
+        raise ValueError('cannot copy %r for an analyser' % (value,))
+
+    def copy_analyser(lexer, analyser, imports):
+        """Return the source of a function that creates a copy of the
+        `analyser` of `lexer` that doesn't need the lexer module."""
+        source, tree = parse_function(analyser)
+        if tree.decorator_list or not source.startswith('def analyse_text('):
+            raise ValueError('cannot copy the analyser of %s' % lexer)
+        names = set()
+
+        def collect_names(code):
+            names.update(code.co_names)
+            for const in code.co_consts:
+                if isinstance(const, types.CodeType):
+                    collect_names(const)
+
+        collect_names(analyser.__code__)
+        env = dict((name, analyser.__globals__[name]) for name in names
+                   if name in analyser.__globals__)
+        if analyser.__closure__:
+            env.update(zip(analyser.__code__.co_freevars,
+                           [cell.cell_contents
+                            for cell in analyser.__closure__]))
+        lines = []
+        for name in sorted(env):
+            value = env[name]
+            if isinstance(value, types.ModuleType):
+                imports.add('import %s' % value.__name__)
+            elif isinstance(value, types.FunctionType) and \
+                    not value.__module__.startswith('pygments.lexers'):
+                imports.add('from %s import %s' % (value.__module__, name))
+            elif isinstance(value, type) and hasattr(value, 'analyse_text'):
+                # other lexer classes: copy the attributes used
+                lines.append('class %s(object):' % name)
+                attrs = set(node.attr for node in ast.walk(tree)
+                            if isinstance(node, ast.Attribute) and
+                            getattr(node.value, 'id', None) == name)
+                for attr in sorted(attrs):
+                    if attr == 'analyse_text':
+                        lines.append('    analyse_text = staticmethod('
+                                     '_analyser(%r))' % value.__name__)
+                    else:
+                        lines.append('    %s = %s' % (attr, copy_value(
+                            getattr(value, attr), imports)))
+                lines.append('')
+            else:
+                lines.append('%s = %s' % (name, copy_value(value, imports)))
+        lines.extend(source.rstrip().splitlines())
+        lines.append('return analyse_text')
+        return '\n'.join(line and '    ' + line for line in lines)
+
+    ANALYSERS_HEADER = u'''\
+# -*- coding: utf-8 -*-
+"""
+    pygments.lexers._analysers
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Copies of the ``analyse_text()`` methods of the builtin lexers, and of
+    the other class attributes used for guessing, so that lexers can be
+    guessed without importing their modules.  This file is generated by
+    ``_mapping.py``; do not edit it by hand.
+
+    :copyright: Copyright 2006-2014 by the Pygments team, see AUTHORS.
+    :license: BSD, see LICENSE for details.
+"""
+
+'''
+
+    ANALYSERS_HELPERS = u'''
+
+def _create(factory):
+    \"\"\"Return the analyser created by `factory`, returning floats.\"\"\"
+    return float_analyser(factory())
+
+
+def _analyser(name):
+    \"\"\"Return a function calling the analyser of the lexer `name`.\"\"\"
+    return lambda text: ANALYSE_TEXT[name](text) \\
+        if name in ANALYSE_TEXT else 0.0
+
+
+'''
+
+    def write_analysers(lexers):
+        """Write the ``_analysers.py`` module for the lexer classes in
+        `lexers`."""
+        imports = set(['from pygments.util import float_analyser'])
+        functions = {}   # source -> function name
+        found = []
+        alias_filenames = []
+        priorities = []
+        for lexer in sorted(lexers, key=lambda cls: cls.__name__):
+            name = lexer.__name__
+            if lexer.alias_filenames:
+                alias_filenames.append('%r: %r' % (
+                    name, tuple(lexer.alias_filenames)))
+            if lexer.priority:
+                priorities.append('%r: %r' % (name, lexer.priority))
+            analyser = find_analyser(lexer)
+            if analyser is None:
+                continue
+            source = copy_analyser(lexer, analyser, imports)
+            if source not in functions:
+                functions[source] = '_' + name
+            found.append('%r: %s' % (name, functions[source]))
+        with io.open(__file__.replace('_mapping.py', '_analysers.py'),
+                     'w', encoding='utf-8') as fp:
+            fp.write(ANALYSERS_HEADER)
+            from_imports = {}
+            for line in sorted(imports):
+                if line.startswith('import '):
+                    fp.write(u'%s\n' % line)
+                else:
+                    module, name = line[5:].split(' import ')
+                    from_imports.setdefault(module, []).append(name)
+            fp.write(u'\n')
+            for module in sorted(from_imports):
+                line = 'from %s import %s' % (
+                    module, ', '.join(from_imports[module]))
+                fp.write(u'%s\n' % ' \\\n    '.join(
+                    textwrap.wrap(line, 76, break_on_hyphens=False)))
+            fp.write(ANALYSERS_HELPERS)
+            for source, func_name in sorted(functions.items(),
+                                            key=lambda item: item[1]):
+                fp.write(u'@_create\ndef %s():\n%s\n\n\n' %
+                         (func_name, source))
+            for var, items in [('ANALYSE_TEXT', found),
+                               ('ALIAS_FILENAMES', alias_filenames),
+                               ('PRIORITIES', priorities)]:
+                fp.write(u'%s = {\n    %s,\n}\n' % (var, ',\n    '.join(items)))
+                if var != 'PRIORITIES':
+                    fp.write(u'\n')
 
     # lookup lexers
     found_lexers = []
+    lexer_classes = []
+    found_analysers = []
     sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', '..'))
     for root, dirs, files in os.walk('.'):
         for filename in files:
@@ -388,6 +745,7 @@ if __name__ == '__main__':  # pragma: no cover
                 module = __import__(module_name, None, None, [''])
                 for lexer_name in module.__all__:
                     lexer = getattr(module, lexer_name)
+                    lexer_classes.append(lexer)
                     found_lexers.append(
                         '%r: %r' % (lexer_name,
                                     (module_name,
@@ -395,8 +753,12 @@ if __name__ == '__main__':  # pragma: no cover
                                      tuple(lexer.aliases),
                                      tuple(lexer.filenames),
                                      tuple(lexer.mimetypes))))
+                    hints = find_hints(lexer)
+                    if hints is not None:
+                        found_analysers.append('%r: %r' % (lexer_name, hints))
     # sort them to make the diff minimal
     found_lexers.sort()
+    found_analysers.sort()
 
     # extract useful sourcecode from this file
     with open(__file__) as fp:
@@ -408,6 +770,11 @@ if __name__ == '__main__':  # pragma: no cover
     with open(__file__, 'w') as fp:
         fp.write(header)
         fp.write('LEXERS = {\n    %s,\n}\n\n' % ',\n    '.join(found_lexers))
+        fp.write('# Lexers with an analyse_text() method, and the hints for the '
+                 'prefilter of\n# guess_lexer() found in it.\n')
+        fp.write('ANALYSERS = {\n    %s,\n}\n\n' %
+                 ',\n    '.join(found_analysers))
         fp.write(footer)
+    write_analysers(lexer_classes)
 
     print ('=== %d lexers processed.' % len(found_lexers))
@@ -11,7 +11,7 @@
 
 import re
 
-from pygments.lexer import RegexLexer, include, words, bygroups
+from pygments.lexer import RegexLexer, include, words, wordset, bygroups
 from pygments.token import Text, Comment, Operator, Keyword, Name, String, \
     Number, Punctuation, Error
 
@@ -445,9 +445,9 @@ class OpenEdgeLexer(RegexLexer):
              r'INT64|INTEGER|INT|INTE|INTEG|INTEGE|'
              r'LOGICAL|LONGCHAR|MEMPTR|RAW|RECID|ROWID)\s*($|(?=[^0-9a-z_\-]))')
 
-    keywords = words(OPENEDGEKEYWORDS,
-                     prefix=r'(?i)(^|(?<=[^0-9a-z_\-]))',
-                     suffix=r'\s*($|(?=[^0-9a-z_\-]))')
+    keywords = wordset(OPENEDGEKEYWORDS, pattern=r'[0-9a-z_\-]+',
+                       prefix=r'(^|(?<=[^0-9a-z_\-]))',
+                       suffix=r'\s*($|(?=[^0-9a-z_\-]))', ignorecase=True)
 
     tokens = {
         'root': [
@@ -150,18 +150,26 @@ class CFamilyLexer(RegexLexer):
                  'uint_fast64_t', 'intptr_t', 'uintptr_t', 'intmax_t',
                  'uintmax_t']
 
+    # sets made from the lists above, by lexer class
+    _builtin_sets = {}
+
     def __init__(self, **options):
         self.stdlibhighlighting = get_bool_opt(options, 'stdlibhighlighting', True)
         self.c99highlighting = get_bool_opt(options, 'c99highlighting', True)
+        cls = self.__class__
+        if cls not in self._builtin_sets:
+            self._builtin_sets[cls] = (frozenset(cls.stdlib_types),
+                                       frozenset(cls.c99_types))
+        self._stdlib_types, self._c99_types = self._builtin_sets[cls]
         RegexLexer.__init__(self, **options)
 
     def get_tokens_unprocessed(self, text):
         for index, token, value in \
                 RegexLexer.get_tokens_unprocessed(self, text):
             if token is Name:
-                if self.stdlibhighlighting and value in self.stdlib_types:
+                if self.stdlibhighlighting and value in self._stdlib_types:
                     token = Keyword.Type
-                elif self.c99highlighting and value in self.c99_types:
+                elif self.c99highlighting and value in self._c99_types:
                     token = Keyword.Type
             yield index, token, value
 
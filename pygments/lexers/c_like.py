@@ -12,7 +12,7 @@
 import re
 
 from pygments.lexer import RegexLexer, include, bygroups, inherit, words, \
-    default
+    wordset, default
 from pygments.token import Text, Comment, Operator, Keyword, Name, String, \
     Number, Punctuation
 
@@ -402,10 +402,10 @@ class MqlLexer(CppLexer):
 
     tokens = {
         'statements': [
-            (words(_mql_builtins.keywords, suffix=r'\b'), Keyword),
-            (words(_mql_builtins.c_types, suffix=r'\b'), Keyword.Type),
-            (words(_mql_builtins.types, suffix=r'\b'), Name.Function),
-            (words(_mql_builtins.constants, suffix=r'\b'), Name.Constant),
+            (wordset(_mql_builtins.keywords, suffix=r'\b'), Keyword),
+            (wordset(_mql_builtins.c_types, suffix=r'\b'), Keyword.Type),
+            (wordset(_mql_builtins.types, suffix=r'\b'), Name.Function),
+            (wordset(_mql_builtins.constants, suffix=r'\b'), Name.Constant),
             (words(_mql_builtins.colors, prefix='(clr)?', suffix=r'\b'),
              Name.Constant),
             inherit,
@@ -55,6 +55,10 @@ class HaxeLexer(ExtendedRegexLexer):
     flags = re.DOTALL | re.MULTILINE
 
     preproc_stack = []
+    # the stack above is not part of the checkpoints, and is shared by all
+    # texts being lexed
+    resumable = False
+    reentrant = False
 
     def preproc_callback(self, match, ctx):
         proc = match.group(2)
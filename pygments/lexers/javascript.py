@@ -14,7 +14,7 @@ import re
 from pygments.lexer import RegexLexer, include, bygroups, default, using, this
 from pygments.token import Text, Comment, Operator, Keyword, Name, String, \
     Number, Punctuation, Other
-from pygments.util import get_bool_opt, iteritems
+from pygments.util import get_bool_opt, itervalues
 import pygments.unistring as uni
 
 __all__ = ['JavascriptLexer', 'KalLexer', 'LiveScriptLexer', 'DartLexer',
@@ -713,20 +713,28 @@ class LassoLexer(RegexLexer):
         ],
     }
 
+    # the sets of builtins and members, built on first use
+    _builtin_sets = {}
+
     def __init__(self, **options):
         self.builtinshighlighting = get_bool_opt(
             options, 'builtinshighlighting', True)
         self.requiredelimiters = get_bool_opt(
             options, 'requiredelimiters', False)
 
-        self._builtins = set()
-        self._members = set()
+        self._builtins = self._members = frozenset()
         if self.builtinshighlighting:
-            from pygments.lexers._lasso_builtins import BUILTINS, MEMBERS
-            for key, value in iteritems(BUILTINS):
-                self._builtins.update(value)
-            for key, value in iteritems(MEMBERS):
-                self._members.update(value)
+            sets = self._builtin_sets.get('names')
+            if sets is None:
+                from pygments.lexers._lasso_builtins import BUILTINS, MEMBERS
+                # both sets are stored at once, so other threads see
+                # either none or both
+                sets = self._builtin_sets['names'] = (
+                    frozenset(name for names in itervalues(BUILTINS)
+                              for name in names),
+                    frozenset(name for names in itervalues(MEMBERS)
+                              for name in names))
+            self._builtins, self._members = sets
         RegexLexer.__init__(self, **options)
 
     def get_tokens_unprocessed(self, text):
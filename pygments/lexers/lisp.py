@@ -11,7 +11,8 @@
 
 import re
 
-from pygments.lexer import RegexLexer, include, bygroups, words, default
+from pygments.lexer import RegexLexer, include, bygroups, words, wordset, \
+    default
 from pygments.token import Text, Comment, Operator, Keyword, Name, String, \
     Number, Punctuation, Literal, Error
 
@@ -1303,10 +1304,10 @@ class RacketLexer(RegexLexer):
             (r'quasiquote(?=[%s])' % _delimiters, Keyword,
              ('#pop', 'quasiquoted-datum')),
             (_opening_parenthesis, Punctuation, ('#pop', 'unquoted-list')),
-            (words(_keywords, prefix='(?u)', suffix='(?=[%s])' % _delimiters),
-             Keyword, '#pop'),
-            (words(_builtins, prefix='(?u)', suffix='(?=[%s])' % _delimiters),
-             Name.Builtin, '#pop'),
+            (wordset(_keywords, pattern='[^%s]+' % _delimiters, prefix='(?u)',
+                     suffix='(?=[%s])' % _delimiters), Keyword, '#pop'),
+            (wordset(_builtins, pattern='[^%s]+' % _delimiters, prefix='(?u)',
+                     suffix='(?=[%s])' % _delimiters), Name.Builtin, '#pop'),
             (_symbol, Name, '#pop'),
             include('datum*')
         ],
@@ -11,7 +11,8 @@
 
 import re
 
-from pygments.lexer import Lexer, RegexLexer, bygroups, words, do_insertions
+from pygments.lexer import Lexer, RegexLexer, bygroups, words, wordset, \
+    do_insertions
 from pygments.token import Text, Comment, Operator, Keyword, Name, String, \
     Number, Punctuation, Generic, Whitespace
 
@@ -548,8 +549,8 @@ class OctaveLexer(RegexLexer):
                 'until', 'unwind_protect', 'unwind_protect_cleanup', 'while'), suffix=r'\b'),
              Keyword),
 
-            (words(builtin_kw + command_kw + function_kw + loadable_kw + mapping_kw,
-                   suffix=r'\b'),  Name.Builtin),
+            (wordset(builtin_kw + command_kw + function_kw + loadable_kw +
+                     mapping_kw, suffix=r'\b'),  Name.Builtin),
 
             (words(builtin_consts, suffix=r'\b'), Name.Constant),
 
@@ -620,9 +621,10 @@ class ScilabLexer(RegexLexer):
                 'until', 'unwind_protect', 'unwind_protect_cleanup', 'while'), suffix=r'\b'),
              Keyword),
 
-            (words(_scilab_builtins.functions_kw +
-                   _scilab_builtins.commands_kw +
-                   _scilab_builtins.macros_kw, suffix=r'\b'), Name.Builtin),
+            (wordset(_scilab_builtins.functions_kw +
+                     _scilab_builtins.commands_kw +
+                     _scilab_builtins.macros_kw,
+                     pattern=r'[%!]*\w+', suffix=r'\b'), Name.Builtin),
 
             (words(_scilab_builtins.variables_kw, suffix=r'\b'), Name.Constant),
 
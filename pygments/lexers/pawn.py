@@ -106,14 +106,19 @@ class SourcePawnLexer(RegexLexer):
                     'TFResourceType', 'Timer', 'TopMenuAction', 'TopMenuObjectType',
                     'TopMenuPosition', 'TopMenuObject', 'UserMsg'))
 
+    # the set of builtin functions, built on first use
+    _builtin_sets = {}
+
     def __init__(self, **options):
         self.smhighlighting = get_bool_opt(options,
                                            'sourcemod', True)
 
-        self._functions = set()
+        self._functions = frozenset()
         if self.smhighlighting:
-            from pygments.lexers._sourcemod_builtins import FUNCTIONS
-            self._functions.update(FUNCTIONS)
+            if not self._builtin_sets:
+                from pygments.lexers._sourcemod_builtins import FUNCTIONS
+                self._builtin_sets['functions'] = frozenset(FUNCTIONS)
+            self._functions = self._builtin_sets['functions']
         RegexLexer.__init__(self, **options)
 
     def get_tokens_unprocessed(self, text):
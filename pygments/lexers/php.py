@@ -206,6 +206,9 @@ class PhpLexer(RegexLexer):
         ],
     }
 
+    # sets of the activated functions, by the disabled modules
+    _builtin_sets = {}
+
     def __init__(self, **options):
         self.funcnamehighlighting = get_bool_opt(
             options, 'funcnamehighlighting', True)
@@ -217,13 +220,17 @@ class PhpLexer(RegexLexer):
         if '_startinline' in options:
             self.startinline = options.pop('_startinline')
 
-        # collect activated functions in a set
-        self._functions = set()
+        # collect activated functions in a set, shared by all lexers with
+        # the same disabled modules
+        self._functions = frozenset()
         if self.funcnamehighlighting:
-            from pygments.lexers._php_builtins import MODULES
-            for key, value in iteritems(MODULES):
-                if key not in self.disabledmodules:
-                    self._functions.update(value)
+            key = frozenset(self.disabledmodules)
+            self._functions = self._builtin_sets.get(key)
+            if self._functions is None:
+                from pygments.lexers._php_builtins import MODULES
+                self._functions = self._builtin_sets[key] = frozenset(
+                    function for module, functions in iteritems(MODULES)
+                    if module not in key for function in functions)
         RegexLexer.__init__(self, **options)
 
     def get_tokens_unprocessed(self, text):
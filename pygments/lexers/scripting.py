@@ -115,17 +115,23 @@ class LuaLexer(RegexLexer):
         ]
     }
 
+    # sets of the activated functions, by the disabled modules
+    _builtin_sets = {}
+
     def __init__(self, **options):
         self.func_name_highlighting = get_bool_opt(
             options, 'func_name_highlighting', True)
         self.disabled_modules = get_list_opt(options, 'disabled_modules', [])
 
-        self._functions = set()
+        self._functions = frozenset()
         if self.func_name_highlighting:
-            from pygments.lexers._lua_builtins import MODULES
-            for mod, func in iteritems(MODULES):
-                if mod not in self.disabled_modules:
-                    self._functions.update(func)
+            key = frozenset(self.disabled_modules)
+            self._functions = self._builtin_sets.get(key)
+            if self._functions is None:
+                from pygments.lexers._lua_builtins import MODULES
+                self._functions = self._builtin_sets[key] = frozenset(
+                    func for mod, funcs in iteritems(MODULES)
+                    if mod not in key for func in funcs)
         RegexLexer.__init__(self, **options)
 
     def get_tokens_unprocessed(self, text):
@@ -92,6 +92,9 @@ class PostgresBase(object):
     other classes, resulting e.g. in PL/pgSQL parsed as SQL. This shortcoming
     seem to suggest that regexp lexers are not really subclassable.
     """
+    # `text` is kept on the lexer while lexing
+    reentrant = False
+
     def get_tokens_unprocessed(self, text, *args):
         # Have a copy of the entire text to be used by `language_callback`.
         self.text = text
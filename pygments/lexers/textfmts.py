@@ -122,6 +122,11 @@ class HttpLexer(RegexLexer):
 
     flags = re.DOTALL
 
+    # `content_type` is kept on the lexer while lexing, outside of the
+    # checkpoints
+    resumable = False
+    reentrant = False
+
     def header_callback(self, match):
         if match.group(1).lower() == 'content-type':
             content_type = match.group(5).strip()
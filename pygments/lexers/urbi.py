@@ -31,6 +31,8 @@ class UrbiscriptLexer(ExtendedRegexLexer):
     mimetypes = ['application/x-urbiscript']
 
     flags = re.DOTALL
+    # blob_callback reads the blob that follows its match
+    streamable = False
 
     # TODO
     # - handle Experimental and deprecated tags with specific tokens
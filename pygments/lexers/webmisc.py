@@ -71,6 +71,10 @@ class XQueryLexer(ExtendedRegexLexer):
     mimetypes = ['text/xquery', 'application/xquery']
 
     xquery_parse_state = []
+    # the parse state above is not part of the checkpoints, and is shared
+    # by all texts being lexed
+    resumable = False
+    reentrant = False
 
     # FIX UNICODE LATER
     # ncnamestartchar = (
@@ -35,40 +35,117 @@
     :copyright: Copyright 2006-2014 by the Pygments team, see AUTHORS.
     :license: BSD, see LICENSE for details.
 """
-try:
-    import pkg_resources
-except ImportError:
-    pkg_resources = None
-
 LEXER_ENTRY_POINT = 'pygments.lexers'
 FORMATTER_ENTRY_POINT = 'pygments.formatters'
 STYLE_ENTRY_POINT = 'pygments.styles'
 FILTER_ENTRY_POINT = 'pygments.filters'
 
+# maps the groups to lists of `Plugin` objects, once they are looked up
+_entry_points = None
+
+
+class Plugin(object):
+    """
+    An entry point in one of the groups above.  The object it names is only
+    imported when `load()` is first called.
+
+    .. versionadded:: 2.1
+    """
+
+    def __init__(self, entrypoint):
+        self.name = entrypoint.name
+        self.entrypoint = entrypoint
+        self._loaded = False
+        self._obj = None
+
+    def load(self):
+        """Return the object that the entry point names."""
+        if not self._loaded:
+            self._obj = self.entrypoint.load()
+            self._loaded = True
+        return self._obj
+
+
+def _discover_entry_points():
+    """Return a dict mapping the groups of entry points to lists of their
+    entry points, as found by `importlib.metadata` or `pkg_resources`."""
+    groups = (LEXER_ENTRY_POINT, FORMATTER_ENTRY_POINT, STYLE_ENTRY_POINT,
+              FILTER_ENTRY_POINT)
+    try:
+        from importlib import metadata
+    except ImportError:
+        metadata = None
+    if metadata is not None:
+        # much faster than importing pkg_resources
+        all_entry_points = metadata.entry_points()
+        found = {}
+        for group in groups:
+            if hasattr(all_entry_points, 'select'):
+                entry_points = all_entry_points.select(group=group)
+            else:
+                entry_points = all_entry_points.get(group, ())
+            # a distribution can be found more than once on sys.path
+            seen = set()
+            found[group] = []
+            for entrypoint in entry_points:
+                if (entrypoint.name, entrypoint.value) not in seen:
+                    seen.add((entrypoint.name, entrypoint.value))
+                    found[group].append(entrypoint)
+        return found
+    try:
+        import pkg_resources
+    except ImportError:
+        return dict((group, []) for group in groups)
+    return dict((group, list(pkg_resources.iter_entry_points(group)))
+                for group in groups)
+
+
+def get_plugins(group_name):
+    """
+    Return a list of `Plugin` objects for the entry points in the group.
+    The entry points are only looked up once per process, or after
+    `refresh_plugins()`.
+
+    .. versionadded:: 2.1
+    """
+    global _entry_points
+    found = _entry_points
+    if found is None:
+        # only publish the complete mapping, other threads may be looking
+        found = dict((group, [Plugin(entrypoint)
+                              for entrypoint in entry_points])
+                     for group, entry_points in
+                     _discover_entry_points().items())
+        _entry_points = found
+    return found.get(group_name, [])
+
+
+def refresh_plugins():
+    """
+    Look up the entry points again on the next use, e.g. after plugins were
+    installed in a running process.
+
+    .. versionadded:: 2.1
+    """
+    global _entry_points
+    _entry_points = None
+
 
 def find_plugin_lexers():
-    if pkg_resources is None:
-        return
-    for entrypoint in pkg_resources.iter_entry_points(LEXER_ENTRY_POINT):
-        yield entrypoint.load()
+    for plugin in get_plugins(LEXER_ENTRY_POINT):
+        yield plugin.load()
 
 
 def find_plugin_formatters():
-    if pkg_resources is None:
-        return
-    for entrypoint in pkg_resources.iter_entry_points(FORMATTER_ENTRY_POINT):
-        yield entrypoint.name, entrypoint.load()
+    for plugin in get_plugins(FORMATTER_ENTRY_POINT):
+        yield plugin.name, plugin.load()
 
 
 def find_plugin_styles():
-    if pkg_resources is None:
-        return
-    for entrypoint in pkg_resources.iter_entry_points(STYLE_ENTRY_POINT):
-        yield entrypoint.name, entrypoint.load()
+    for plugin in get_plugins(STYLE_ENTRY_POINT):
+        yield plugin.name, plugin.load()
 
 
 def find_plugin_filters():
-    if pkg_resources is None:
-        return
-    for entrypoint in pkg_resources.iter_entry_points(FILTER_ENTRY_POINT):
-        yield entrypoint.name, entrypoint.load()
+    for plugin in get_plugins(FILTER_ENTRY_POINT):
+        yield plugin.name, plugin.load()
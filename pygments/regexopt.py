@@ -12,8 +12,6 @@
 
 import re
 from re import escape
-from os.path import commonprefix
-from itertools import groupby
 from operator import itemgetter
 
 CS_ESCAPE = re.compile(r'[\^\\\-\]]')
@@ -24,60 +22,55 @@ def make_charset(letters):
     return '[' + CS_ESCAPE.sub(lambda m: '\\' + m.group(), ''.join(letters)) + ']'
 
 
-def regex_opt_inner(strings, open_paren):
-    """Return a regex that matches any string in the sorted list of strings."""
-    close_paren = open_paren and ')' or ''
-    # print strings, repr(open_paren)
-    if not strings:
-        # print '-> nothing left'
+def make_trie(strings):
+    """
+    Return a trie of the strings: nested dicts that map a character to the
+    node of the strings continuing with it.  An empty string key marks the
+    end of a string.
+    """
+    root = {}
+    for s in strings:
+        node = root
+        for char in s:
+            node = node.setdefault(char, {})
+        node[''] = None
+    return root
+
+
+def regex_opt_inner(node):
+    """
+    Return a regex that matches any string in the trie `node`, preferring
+    longer strings.  Characters that continue with the same regex are
+    combined into a charset.
+    """
+    groups = {}
+    order = []
+    for char in sorted(node):
+        if char:
+            sub = regex_opt_inner(node[char])
+            if sub not in groups:
+                groups[sub] = []
+                order.append(sub)
+            groups[sub].append(char)
+    branches = []
+    for sub in order:
+        chars = groups[sub]
+        if len(chars) == 1:
+            branches.append(escape(chars[0]) + sub)
+        else:
+            branches.append(make_charset(chars) + sub)
+    if not branches:
         return ''
-    first = strings[0]
-    if len(strings) == 1:
-        # print '-> only 1 string'
-        return open_paren + escape(first) + close_paren
-    if not first:
-        # print '-> first string empty'
-        return open_paren + regex_opt_inner(strings[1:], '(?:') \
-            + '?' + close_paren
-    if len(first) == 1:
-        # multiple one-char strings? make a charset
-        oneletter = []
-        rest = []
-        for s in strings:
-            if len(s) == 1:
-                oneletter.append(s)
-            else:
-                rest.append(s)
-        if len(oneletter) > 1:  # do we have more than one oneletter string?
-            if rest:
-                # print '-> 1-character + rest'
-                return open_paren + regex_opt_inner(rest, '') + '|' \
-                    + make_charset(oneletter) + close_paren
-            # print '-> only 1-character'
-            return make_charset(oneletter)
-    prefix = commonprefix(strings)
-    if prefix:
-        plen = len(prefix)
-        # we have a prefix for all strings
-        # print '-> prefix:', prefix
-        return open_paren + escape(prefix) \
-            + regex_opt_inner([s[plen:] for s in strings], '(?:') \
-            + close_paren
-    # is there a suffix?
-    strings_rev = [s[::-1] for s in strings]
-    suffix = commonprefix(strings_rev)
-    if suffix:
-        slen = len(suffix)
-        # print '-> suffix:', suffix[::-1]
-        return open_paren \
-            + regex_opt_inner(sorted(s[:-slen] for s in strings), '(?:') \
-            + escape(suffix[::-1]) + close_paren
-    # recurse on common 1-string prefixes
-    # print '-> last resort'
-    return open_paren + \
-        '|'.join(regex_opt_inner(list(group[1]), '')
-                 for group in groupby(strings, lambda s: s[0] == first[0])) \
-        + close_paren
+    if len(branches) > 1:
+        body = '(?:' + '|'.join(branches) + ')'
+    else:
+        body = branches[0]
+    if '' not in node:
+        return body
+    # the string can end here
+    if len(branches) > 1 or not order[0]:
+        return body + '?'
+    return '(?:' + body + ')?'
 
 
 def regex_opt(strings, prefix='', suffix=''):
@@ -87,6 +80,25 @@ def regex_opt(strings, prefix='', suffix=''):
     regex-escaped.
 
     *prefix* and *suffix* are pre- and appended to the final regex.
+
+    Results are memoized, so optimizing the same list again is cheap.
     """
-    strings = sorted(strings)
-    return prefix + regex_opt_inner(strings, '(') + suffix
+    strings = tuple(strings)
+    key = strings, prefix, suffix
+    try:
+        return _cache[key]
+    except KeyError:
+        pass
+    if not strings:
+        regex = ''
+    elif len(strings) > 1 and all(len(s) == 1 for s in strings):
+        # a plain charset, without a group
+        regex = regex_opt_inner(make_trie(strings))
+    else:
+        regex = '(' + regex_opt_inner(make_trie(strings)) + ')'
+    _cache[key] = result = prefix + regex + suffix
+    return result
+
+
+# memo of regex_opt() results, keyed by (strings, prefix, suffix)
+_cache = {}
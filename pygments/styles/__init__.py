@@ -9,7 +9,8 @@
     :license: BSD, see LICENSE for details.
 """
 
-from pygments.plugin import find_plugin_styles
+from pygments.plugin import find_plugin_styles, get_plugins, \
+    STYLE_ENTRY_POINT
 from pygments.util import ClassNotFound
 
 
@@ -70,5 +71,5 @@ def get_all_styles():
     both builtin and plugin."""
     for name in STYLE_MAP:
         yield name
-    for name, _ in find_plugin_styles():
-        yield name
+    for plugin in get_plugins(STYLE_ENTRY_POINT):
+        yield plugin.name
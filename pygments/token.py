@@ -9,6 +9,21 @@
     :license: BSD, see LICENSE for details.
 """
 
+import itertools
+import threading
+from array import array
+
+from pygments.util import izip, count_lines
+
+
+#: All token types created so far, indexed by their `id`.
+TOKEN_TYPES = []
+
+# held while a token type is created, so that each gets a unique id and
+# each name is only created once
+_lock = threading.RLock()
+
+
 class _TokenType(tuple):
     parent = None
 
@@ -24,25 +39,44 @@ class _TokenType(tuple):
     def __init__(self, *args):
         # no need to call super.__init__
         self.subtypes = set()
+        with _lock:
+            self.id = len(TOKEN_TYPES)
+            TOKEN_TYPES.append(self)
+        # ids of this type and its parents, nearest first
+        self.ancestor_ids = (self.id,)
+        self._ancestors = frozenset(self.ancestor_ids)
 
     def __contains__(self, val):
-        return self is val or (
-            type(val) is self.__class__ and
-            val[:len(self)] == self
-        )
+        try:
+            return self.id in val._ancestors
+        except AttributeError:
+            # not a token type
+            return False
 
     def __getattr__(self, val):
         if not val or not val[0].isupper():
             return tuple.__getattribute__(self, val)
-        new = _TokenType(self + (val,))
-        setattr(self, val, new)
-        self.subtypes.add(new)
-        new.parent = self
+        with _lock:
+            # another thread may have created it meanwhile
+            new = self.__dict__.get(val)
+            if new is not None:
+                return new
+            new = _TokenType(self + (val,))
+            new.parent = self
+            new.ancestor_ids += self.ancestor_ids
+            new._ancestors = frozenset(new.ancestor_ids)
+            self.subtypes.add(new)
+            # only make the new type visible when it is complete
+            setattr(self, val, new)
         return new
 
     def __repr__(self):
         return 'Token' + (self and '.' or '') + '.'.join(self)
 
+    def __reduce__(self):
+        # unpickle to the singleton, whose ids are valid in this process
+        return string_to_tokentype, (repr(self),)
+
 
 Token       = _TokenType()
 
@@ -109,6 +143,126 @@ def string_to_tokentype(s):
     return node
 
 
+class TokenTypeTable(object):
+    """
+    Maps every token type to the value that `mapping` has for it or for its
+    nearest parent (or to `default`).
+
+    The values are kept in the list `values`, indexed by the `id` of the
+    token types, so that formatters can look them up quickly::
+
+        values = table.values
+        try:
+            value = values[ttype.id]
+        except IndexError:
+            value = table[ttype]
+
+    Token types created after the table are added on the first lookup with
+    ``table[ttype]``.
+
+    .. versionadded:: 2.1
+    """
+
+    def __init__(self, mapping, default=None):
+        self.mapping = mapping
+        self.default = default
+        self.values = []
+        self.update()
+
+    def update(self):
+        """Add the values for all token types created so far."""
+        values = self.values
+        mapping = self.mapping
+        # the table may be shared by threads that create token types, so
+        # the values are appended in the order of the ids
+        with _lock:
+            for ttype in TOKEN_TYPES[len(values):]:
+                if ttype in mapping:
+                    values.append(mapping[ttype])
+                elif ttype.parent is not None:
+                    # parents are always created before their subtypes
+                    values.append(values[ttype.parent.id])
+                else:
+                    values.append(self.default)
+
+    def __getitem__(self, ttype):
+        try:
+            return self.values[ttype.id]
+        except IndexError:
+            self.update()
+            return self.values[ttype.id]
+
+
+class TokenArray(object):
+    """
+    A compact representation of a stream of ``(tokentype, value)`` pairs.
+
+    The values are kept joined as one string, `text`, together with arrays of
+    the start offsets and of the `id` of the token types.  Iteration gives
+    the ``(tokentype, value)`` pairs again, so a `TokenArray` can be passed
+    to any formatter.  Pickling it only stores the text, the arrays and the
+    names of the token types that occur.
+
+    .. versionadded:: 2.1
+    """
+
+    def __init__(self, tokens=()):
+        self.starts = array('I')
+        self.type_ids = array('I')
+        parts = []
+        joined = []
+        pos = 0
+        for ttype, value in tokens:
+            self.starts.append(pos)
+            self.type_ids.append(ttype.id)
+            pos += len(value)
+            parts.append(value)
+            if len(parts) >= 1024:
+                # don't keep all the value objects around
+                joined.append(u''.join(parts))
+                del parts[:]
+        joined.append(u''.join(parts))
+        self.text = u''.join(joined)
+
+    def __len__(self):
+        return len(self.starts)
+
+    @property
+    def line_count(self):
+        """The number of lines of the text, see `Lexer.get_tokens`."""
+        return count_lines(self.text)
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self.starts)
+        start = self.starts[index]
+        if index + 1 < len(self.starts):
+            end = self.starts[index + 1]
+        else:
+            end = len(self.text)
+        return TOKEN_TYPES[self.type_ids[index]], self.text[start:end]
+
+    def __iter__(self):
+        text = self.text
+        types = TOKEN_TYPES
+        ends = itertools.chain(itertools.islice(self.starts, 1, None),
+                               (len(text),))
+        for start, end, type_id in izip(self.starts, ends, self.type_ids):
+            yield types[type_id], text[start:end]
+
+    def __getstate__(self):
+        # ids are only valid in this process, so store the names
+        ids = sorted(set(self.type_ids))
+        return (self.text, self.starts, self.type_ids, ids,
+                [str(TOKEN_TYPES[type_id]) for type_id in ids])
+
+    def __setstate__(self, state):
+        self.text, self.starts, type_ids, ids, names = state
+        new_ids = dict((old, string_to_tokentype(name).id)
+                       for old, name in zip(ids, names))
+        self.type_ids = array('I', [new_ids[type_id] for type_id in type_ids])
+
+
 # Map standard token types to short names, used in CSS class naming.
 # If you add a new item, please be sure to run this file to perform
 # a consistency check for duplicate values.
@@ -9,6 +9,7 @@
     :license: BSD, see LICENSE for details.
 """
 
+import os
 import re
 import sys
 
@@ -106,6 +107,12 @@ def docstring_headline(obj):
 
 def make_analysator(f):
     """Return a static text analyser function that returns float values."""
+    return staticmethod(float_analyser(f))
+
+
+def float_analyser(f):
+    """Return a text analyser function that calls `f` and returns float
+    values."""
     def text_analyse(text):
         try:
             rv = f(text)
@@ -118,7 +125,7 @@ def make_analysator(f):
         except (ValueError, TypeError):
             return 0.0
     text_analyse.__doc__ = f.__doc__
-    return staticmethod(text_analyse)
+    return text_analyse
 
 
 def shebang_matches(text, regex):
@@ -288,6 +295,56 @@ def duplicates_removed(it, already_seen=()):
     return lst
 
 
+def count_lines(text):
+    """
+    Return the number of lines of `text`, counting a last line without a
+    newline as well.
+
+    .. versionadded:: 2.1
+    """
+    lines = text.count('\n')
+    if text and text[-1] != '\n':
+        lines += 1
+    return lines
+
+
+def write_file_atomically(filename, data):
+    """
+    Write the bytes `data` to `filename` through a temporary file in the same
+    directory that then replaces it, so that other processes never read a
+    partly written file.  Missing directories are created.
+
+    .. versionadded:: 2.1
+    """
+    # imported here since it imports "math" (through "random"), which is
+    # shadowed by pygments.lexers.math when running _mapping.py
+    import tempfile
+    dirname = os.path.dirname(filename)
+    if not os.path.isdir(dirname):
+        os.makedirs(dirname)
+    fd, tmpname = tempfile.mkstemp(dir=dirname)
+    try:
+        with os.fdopen(fd, 'wb') as fp:
+            fp.write(data)
+        if hasattr(os, 'replace'):
+            os.replace(tmpname, filename)
+        else:
+            try:
+                os.rename(tmpname, filename)
+            except OSError:
+                # the target exists on Windows
+                if not os.path.exists(filename):
+                    raise
+                os.remove(filename)
+                os.rename(tmpname, filename)
+    except BaseException:
+        try:
+            os.remove(tmpname)
+        except OSError:
+            pass
+        raise
+
+
 class Future(object):
     """Generic class to defer some work.
 
@@ -354,6 +411,7 @@ if sys.version_info < (3, 0):
     u_prefix = 'u'
     iteritems = dict.iteritems
     itervalues = dict.itervalues
+    from itertools import izip
     import StringIO
     import cStringIO
     # unfortunately, io.StringIO in Python 2 doesn't accept str at all
@@ -367,6 +425,7 @@ else:
     u_prefix = ''
     iteritems = dict.items
     itervalues = dict.values
+    izip = zip
     from io import StringIO, BytesIO, TextIOWrapper
 
     class UnclosingTextIOWrapper(TextIOWrapper):
@@ -0,0 +1,72 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    Lexer guessing benchmark
+    ~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Compare the time and peak memory of a first `guess_lexer()` call in a
+    fresh interpreter with a scan that imports every lexer module to run
+    its ``analyse_text()``, as guessing did before ``_analysers.py``.
+
+    Usage: bench_guess_lexer.py [file ...]
+
+    :copyright: Copyright 2006-2014 by the Pygments team, see AUTHORS.
+    :license: BSD, see LICENSE for details.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import subprocess
+
+srcpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+CHILD = r'''
+import sys, time, resource
+sys.path.insert(0, %(srcpath)r)
+text = open(%(filename)r, 'rb').read().decode('utf-8', 'replace')
+start = time.time()
+from pygments import lexers
+if %(legacy)r:
+    best, best_rv = None, 0.0
+    for lexer in lexers._iter_lexerclasses():
+        rv = lexer.analyse_text(text)
+        if rv > best_rv:
+            best, best_rv = lexer.__name__, rv
+else:
+    best = lexers.guess_lexer(text).__class__.__name__
+elapsed = time.time() - start
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print('%%s %%f %%d %%d' %% (best, elapsed, rss, len(sys.modules)))
+'''
+
+SAMPLES = [
+    'tests/examplefiles/example.rb',
+    'tests/examplefiles/test.html',
+    'tests/examplefiles/example.c',
+]
+
+
+def run(filename, legacy):
+    code = CHILD % dict(srcpath=srcpath, filename=filename, legacy=legacy)
+    out = subprocess.check_output([sys.executable, '-c', code])
+    best, elapsed, rss, modules = out.decode().split()
+    return best, float(elapsed), int(rss), int(modules)
+
+
+def main(args):
+    filenames = args or [os.path.join(srcpath, fn) for fn in SAMPLES]
+    print('%-24s %-28s %9s %9s %8s' %
+          ('file', 'guess', 'time', 'maxrss', 'modules'))
+    for filename in filenames:
+        for legacy in (True, False):
+            best, elapsed, rss, modules = run(filename, legacy)
+            print('%-24s %-28s %8.1fms %7dkB %8d' %
+                  (os.path.basename(filename) + (legacy and ' (all)' or ''),
+                   best, elapsed * 1000, rss, modules))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,78 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    HTML line numbers benchmark
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Measure the time until the first output is written, the total time and
+    the peak memory of `HtmlFormatter` with line numbers on a large input
+    (an example file repeated to the given number of lines).  The tokens
+    come from `Lexer.get_tokens()` either directly, which tells the formatter
+    the number of lines, or through a generator that hides it, so that the
+    line numbers cannot be streamed.
+
+    Usage: bench_html_linenos.py [lines]
+
+    :copyright: Copyright 2006-2014 by the Pygments team, see AUTHORS.
+    :license: BSD, see LICENSE for details.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import subprocess
+
+srcpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+CHILD = r'''
+import sys, time, resource
+sys.path.insert(0, %(srcpath)r)
+from pygments.lexers import CppLexer
+from pygments.formatters import HtmlFormatter
+sample = open(%(filename)r, 'rb').read().decode('latin1')
+text = sample * (%(lines)d // sample.count('\n') + 1)
+
+class Outfile(object):
+    first = None
+    def write(self, data):
+        if self.first is None:
+            self.first = time.time()
+
+outfile = Outfile()
+start = time.time()
+tokens = CppLexer().get_tokens(text)
+if not %(counted)r:
+    tokens = (token for token in tokens)
+HtmlFormatter(linenos=%(linenos)r).format(tokens, outfile)
+end = time.time()
+rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print('%%f %%f %%d' %% (outfile.first - start, end - start, rss))
+'''
+
+FILENAME = os.path.join(srcpath, 'tests', 'examplefiles', 'example.cpp')
+
+
+def run(lines, linenos, counted):
+    code = CHILD % dict(srcpath=srcpath, filename=FILENAME, lines=lines,
+                        linenos=linenos, counted=counted)
+    out = subprocess.check_output([sys.executable, '-c', code])
+    first, total, rss = out.decode().split()
+    return float(first), float(total), int(rss)
+
+
+def main(args):
+    lines = args and int(args[0]) or 100000
+    print('%-8s %-10s %12s %12s %10s' % ('linenos', 'lines', 'first write',
+                                         'total', 'maxrss'))
+    for linenos in ('table', 'inline'):
+        for counted in (False, True):
+            first, total, rss = run(lines, linenos, counted)
+            print('%-8s %-10s %10.2fs %10.2fs %8dkB' %
+                  (linenos, counted and 'counted' or 'unknown', first, total,
+                   rss))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
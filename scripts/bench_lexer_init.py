@@ -0,0 +1,77 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    Lexer instantiation benchmark
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Measure the time and memory per instance of lexers that use sets of
+    builtin names, with the sets shared between instances and with the
+    sets built for each instance (by emptying `_builtin_sets` first), as
+    they were before.  Memory is only measured with `tracemalloc`.
+
+    :copyright: Copyright 2006-2014 by the Pygments team, see AUTHORS.
+    :license: BSD, see LICENSE for details.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import time
+
+# always prefer Pygments from source if exists
+srcpath = os.path.join(os.path.dirname(__file__), '..')
+if os.path.isdir(os.path.join(srcpath, 'pygments')):
+    sys.path.insert(0, srcpath)
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from pygments.lexers import PhpLexer, LassoLexer, LuaLexer, \
+    SourcePawnLexer, CLexer
+
+LEXERS = [PhpLexer, LassoLexer, LuaLexer, SourcePawnLexer, CLexer]
+
+
+def make(cls, number, shared):
+    """Return `number` instances of `cls` and the seconds it took."""
+    cls()
+    lexers = []
+    start = time.time()
+    for i in range(number):
+        if not shared:
+            cls._builtin_sets.clear()
+        lexers.append(cls())
+    return lexers, time.time() - start
+
+
+def measure(cls, number, shared):
+    if tracemalloc is None:
+        return make(cls, number, shared)[1] / number, None
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    lexers, seconds = make(cls, number, shared)
+    size = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    return seconds / number, size / number
+
+
+def main(args):
+    number = args and int(args[0]) or 100
+    print('%-18s %12s %12s %12s %12s' % ('lexer', 'time', 'memory',
+                                         'shared time', 'memory'))
+    for cls in LEXERS:
+        row = []
+        for shared in (False, True):
+            seconds, size = measure(cls, number, shared)
+            row.append('%10.1fus' % (seconds * 1e6))
+            row.append(size is None and '%12s' % '-' or
+                       '%10.1fkB' % (size / 1024.0))
+        print('%-18s %s' % (cls.__name__, ' '.join(row)))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,91 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    Keyword regex benchmark
+    ~~~~~~~~~~~~~~~~~~~~~~~
+
+    For every use of `words()` in the lexers, report the number of words,
+    the length of the regex `regex_opt()` makes of them, the time to build
+    and to compile it, and how many matches per second it runs over a text
+    made of the words.  Lists used by more than one lexer are listed once.
+
+    Usage: bench_regexopt.py [number of rows]
+
+    :copyright: Copyright 2006-2014 by the Pygments team, see AUTHORS.
+    :license: BSD, see LICENSE for details.
+"""
+
+from __future__ import print_function
+
+import os
+import re
+import sys
+import time
+
+# always prefer Pygments from source if exists
+srcpath = os.path.join(os.path.dirname(__file__), '..')
+if os.path.isdir(os.path.join(srcpath, 'pygments')):
+    sys.path.insert(0, srcpath)
+
+from pygments import regexopt
+from pygments.lexer import RegexLexer, words
+from pygments.lexers import _iter_lexerclasses
+
+
+def find_words():
+    """Yield ``(lexer class, state, words, flags)`` for each `words()`."""
+    seen = set()
+    for cls in _iter_lexerclasses(plugins=False):
+        if not issubclass(cls, RegexLexer):
+            continue
+        for base in cls.__mro__:
+            for state, rules in sorted(base.__dict__.get('tokens', {}).items()):
+                for rule in rules:
+                    if isinstance(rule, tuple) and \
+                            isinstance(rule[0], words) and \
+                            id(rule[0]) not in seen:
+                        seen.add(id(rule[0]))
+                        yield base, state, rule[0], cls.flags
+
+
+def measure(wordsdef, flags):
+    key = tuple(wordsdef.words), wordsdef.prefix, wordsdef.suffix
+    regexopt._cache.pop(key, None)
+    start = time.time()
+    regex = wordsdef.get()
+    built = time.time() - start
+    start = time.time()
+    # bypass the cache of the re module
+    rex = re.compile(regex + '(?#%f)' % start, flags)
+    compiled = time.time() - start
+    text = u' '.join(wordsdef.words) + u' '
+    positions = range(len(text))
+    start = time.time()
+    match = rex.match
+    for pos in positions:
+        match(text, pos)
+    elapsed = time.time() - start
+    return len(regex), built, compiled, len(text) / max(elapsed, 1e-9)
+
+
+def main(args):
+    rows = []
+    for cls, state, wordsdef, flags in find_words():
+        rows.append(('%s:%s' % (cls.__name__, state), len(wordsdef.words)) +
+                    measure(wordsdef, flags))
+    rows.sort(key=lambda row: -row[4])
+    number = args and int(args[0]) or len(rows)
+    print('%-36s %6s %7s %9s %9s %11s' % ('words', 'count', 'length',
+                                           'build', 'compile', 'matches/s'))
+    for name, count, length, built, compiled, rate in rows[:number]:
+        print('%-36s %6d %7d %7.2fms %7.2fms %11.0f' %
+              (name[:36], count, length, built * 1000, compiled * 1000, rate))
+    print('%-36s %6d %7d %7.2fms %7.2fms' %
+          ('total (%d lists)' % len(rows), sum(row[1] for row in rows),
+           sum(row[2] for row in rows), sum(row[3] for row in rows) * 1000,
+           sum(row[4] for row in rows) * 1000))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
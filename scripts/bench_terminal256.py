@@ -0,0 +1,105 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    Terminal256 formatter benchmark
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Measure the time to create a `Terminal256Formatter` for every builtin
+    style (which maps the colors of the style to the 256 terminal colors)
+    and the throughput of formatting the largest example files.  The tokens
+    are lexed beforehand, so only the formatting is timed.
+
+    To compare with another version, pass the path of its source tree (for
+    example a ``git worktree`` of an older commit); the same measurements
+    are then made with it as well.
+
+    Usage: bench_terminal256.py [-n files] [source tree ...]
+
+    :copyright: Copyright 2006-2014 by the Pygments team, see AUTHORS.
+    :license: BSD, see LICENSE for details.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import getopt
+import subprocess
+
+srcpath = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+
+CHILD = r'''
+import sys, time
+sys.path.insert(0, %(srcpath)r)
+from pygments.lexers import get_lexer_for_filename
+from pygments.formatters import Terminal256Formatter
+from pygments.styles import get_all_styles, get_style_by_name
+from pygments.util import StringIO
+styles = [get_style_by_name(name) for name in get_all_styles()]
+start = time.time()
+for style in styles:
+    Terminal256Formatter(style=style)
+print('%%d %%f' %% (len(styles), time.time() - start))
+formatter = Terminal256Formatter()
+for filename in %(filenames)r:
+    text = open(filename, 'rb').read().decode('utf-8', 'replace')
+    tokens = list(get_lexer_for_filename(filename).get_tokens(text))
+    best = None
+    for i in range(%(repeat)d):
+        start = time.time()
+        formatter.format(tokens, StringIO())
+        elapsed = time.time() - start
+        best = best is None and elapsed or min(best, elapsed)
+    print('%%d %%f' %% (len(text), best))
+'''
+
+
+def largest_files(number):
+    """Return the `number` largest example files that have a lexer."""
+    sys.path.insert(0, srcpath)
+    from pygments.lexers import find_lexer_class_for_filename
+    dirname = os.path.join(srcpath, 'tests', 'examplefiles')
+    filenames = [os.path.join(dirname, fn) for fn in os.listdir(dirname)]
+    filenames.sort(key=os.path.getsize, reverse=True)
+    return [fn for fn in filenames
+            if find_lexer_class_for_filename(fn)][:number]
+
+
+def run(tree, filenames, repeat):
+    code = CHILD % dict(srcpath=tree, filenames=filenames, repeat=repeat)
+    out = subprocess.check_output([sys.executable, '-c', code])
+    lines = out.decode().splitlines()
+    count, setup = lines[0].split()
+    results = []
+    for line in lines[1:]:
+        size, elapsed = line.split()
+        results.append((int(size), float(elapsed)))
+    return int(count), float(setup), results
+
+
+def main(args):
+    opts, trees = getopt.getopt(args, 'n:')
+    number = 5
+    for opt, val in opts:
+        if opt == '-n':
+            number = int(val)
+    trees = [srcpath] + [os.path.abspath(tree) for tree in trees]
+    filenames = largest_files(number)
+    results = [run(tree, filenames, 7) for tree in trees]
+    print('%-28s %-24s %12s' % ('setup', 'tree', 'per style'))
+    for tree, (count, setup, _) in zip(trees, results):
+        print('%-28s %-24s %10.2fms' % ('%d styles' % count,
+                                        os.path.basename(tree)[:24],
+                                        setup / count * 1000))
+    print('%-28s %-24s %12s' % ('file', 'tree', 'throughput'))
+    for i, filename in enumerate(filenames):
+        for tree, (_, _, result) in zip(trees, results):
+            size, elapsed = result[i]
+            print('%-28s %-24s %9.2fMB/s' %
+                  (os.path.basename(filename)[:28],
+                   os.path.basename(tree)[:24], size / elapsed / 1e6))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,68 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    Token type subtype check benchmark
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    Compare ``ttype in Token.Xxx`` tests using the precomputed ancestor
+    sets with the former slice-and-compare implementation.
+
+    :copyright: Copyright 2006-2014 by the Pygments team, see AUTHORS.
+    :license: BSD, see LICENSE for details.
+"""
+
+from __future__ import print_function
+
+import os
+import sys
+import timeit
+
+# always prefer Pygments from source if exists
+srcpath = os.path.join(os.path.dirname(__file__), '..')
+if os.path.isdir(os.path.join(srcpath, 'pygments')):
+    sys.path.insert(0, srcpath)
+
+from pygments.token import string_to_tokentype
+
+
+class SliceTokenType(tuple):
+    # the implementation before the ancestor sets
+
+    def __contains__(self, val):
+        return self is val or (
+            type(val) is self.__class__ and
+            val[:len(self)] == self
+        )
+
+
+CASES = [
+    ('Comment.Single', 'Comment'),
+    ('Name.Builtin.Pseudo', 'Name'),
+    ('Keyword.Constant', 'Comment'),
+    ('Text', 'Token'),
+    ('Name.Builtin.Pseudo', 'Name.Builtin.Type'),
+]
+
+# the operands of the timed statements
+ttype = other = None
+
+
+def main(args):
+    global ttype, other
+    number = args and int(args[0]) or 1000000
+    setup = 'from __main__ import ttype, other'
+    print('%-54s %8s %8s' % ('test', 'slice', 'set'))
+    for tname, oname in CASES:
+        ttype = SliceTokenType(string_to_tokentype(tname))
+        other = SliceTokenType(string_to_tokentype(oname))
+        old = min(timeit.Timer('ttype in other', setup).repeat(3, number))
+        ttype = string_to_tokentype(tname)
+        other = string_to_tokentype(oname)
+        new = min(timeit.Timer('ttype in other', setup).repeat(3, number))
+        print('%-54s %7.3fs %7.3fs' %
+              ('%r in %r' % (ttype, other), old, new))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
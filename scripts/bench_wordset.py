@@ -0,0 +1,97 @@
+#!/usr/bin/python
+# -*- coding: utf-8 -*-
+"""
+    Keyword set benchmark
+    ~~~~~~~~~~~~~~~~~~~~~
+
+    Compare the time to process the token definitions and the lexing
+    throughput of lexers whose long keyword lists use `wordset` with copies
+    of them that use `words` for these lists, as they did before.
+
+    Usage: bench_wordset.py [repetitions]
+
+    :copyright: Copyright 2006-2014 by the Pygments team, see AUTHORS.
+    :license: BSD, see LICENSE for details.
+"""
+
+from __future__ import print_function
+
+import io
+import os
+import sys
+import time
+
+# always prefer Pygments from source if exists
+srcpath = os.path.join(os.path.dirname(__file__), '..')
+if os.path.isdir(os.path.join(srcpath, 'pygments')):
+    sys.path.insert(0, srcpath)
+
+from pygments.lexer import words, wordset
+from pygments.lexers import ScilabLexer, OctaveLexer, OpenEdgeLexer, \
+    RacketLexer, SLexer, MqlLexer
+
+SAMPLES = [
+    (ScilabLexer, 'scilab.sci'),
+    (OctaveLexer, 'matlab_sample'),
+    (OpenEdgeLexer, 'openedge_example'),
+    (RacketLexer, 'example.rkt'),
+    (SLexer, 'test.R'),
+    (MqlLexer, 'example.mq4'),
+]
+
+
+def as_words(regex):
+    """Return the `words` equivalent of a `wordset`."""
+    if not isinstance(regex, wordset):
+        return regex
+    prefix = regex.prefix
+    if regex.ignorecase:
+        prefix = '(?i)' + prefix
+    return words(regex.words, prefix=prefix, suffix=regex.suffix)
+
+
+def copy_lexer(cls, use_words):
+    """Return a subclass of `cls` with its own processed token definitions."""
+    tokendefs = {}
+    for state, rules in cls.get_tokendefs().items():
+        if use_words:
+            rules = [isinstance(rule, tuple) and
+                     (as_words(rule[0]),) + rule[1:] or rule
+                     for rule in rules]
+        tokendefs[state] = rules
+    return type(cls)(cls.__name__, (cls,), {'tokens': tokendefs,
+                                            'lazy_states': False,
+                                            'cache_dir': None})
+
+
+def measure(cls, text, repetitions, use_words):
+    """Return the seconds to process the token definitions and to lex."""
+    lexer_class = copy_lexer(cls, use_words)
+    start = time.time()
+    lexer = lexer_class()
+    compiled = time.time() - start
+    start = time.time()
+    for i in range(repetitions):
+        for tok in lexer.get_tokens_unprocessed(text):
+            pass
+    return compiled, (time.time() - start) / repetitions
+
+
+def main(args):
+    repetitions = args and int(args[0]) or 20
+    print('%-14s %11s %11s %11s %11s' % ('lexer', 'compile', 'wordset',
+                                         'lex', 'wordset'))
+    for cls, filename in SAMPLES:
+        with io.open(os.path.join(srcpath, 'tests', 'examplefiles',
+                                  filename), encoding='utf-8') as fp:
+            text = fp.read()
+        old = measure(cls, text, repetitions, True)
+        new = measure(cls, text, repetitions, False)
+        print('%-14s %9.1fms %9.1fms %9.1fms %9.1fms' %
+              (cls.__name__, old[0] * 1000, new[0] * 1000,
+               old[1] * 1000, new[1] * 1000))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
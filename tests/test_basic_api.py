@@ -9,12 +9,20 @@
 
 from __future__ import print_function
 
+import os
+import sys
 import random
+import shutil
+import fnmatch
+import tempfile
+import threading
 import unittest
 
-from pygments import lexers, formatters, lex, format
+from pygments import lexers, formatters, styles, plugin, lex, format
 from pygments.token import _TokenType, Text
-from pygments.lexer import RegexLexer
+from pygments.lexer import Lexer, RegexLexer
+from pygments.lexers._analysers import ANALYSE_TEXT, ALIAS_FILENAMES, \
+    PRIORITIES
 from pygments.formatters.img import FontNotFound
 from pygments.util import text_type, StringIO, BytesIO, xrange, ClassNotFound
 
@@ -35,6 +43,15 @@ def test_lexer_instantiate_all():
         yield verify, x
 
 
+analyser_texts = [
+    'abc', '#!/usr/bin/env perl6\nmy $x;', '<?xml version="1.0"?>\n<a/>',
+    '<!DOCTYPE html>\n<html>{% block x %}</html>', 'diff -r a b\n',
+    ':- module(m, []).\n', '/* Rexx */\nsay "hi"\n',
+    '#include <stdio.h>\nusing namespace std;\n',
+    '@implementation Foo\n@end\n', '%module example\n%{\n%}\n',
+]
+
+
 def test_lexer_classes():
     # test that every lexer class has the correct public API
     def verify(cls):
@@ -50,6 +67,19 @@ def test_lexer_classes():
 
         assert all(al.lower() == al for al in cls.aliases)
 
+        # the mapping must list the lexers with an analyser, and
+        # _analysers.py must have copies of them
+        assert (cls.analyse_text is not Lexer.analyse_text) == \
+            (cls.__name__ in lexers.ANALYSERS), \
+            '%s: ANALYSERS in _mapping.py is out of date' % cls
+        copy = ANALYSE_TEXT.get(cls.__name__, lambda text: 0.0)
+        for text in analyser_texts:
+            assert copy(text) == cls.analyse_text(text), \
+                '%s: _analysers.py is out of date' % cls
+        assert ALIAS_FILENAMES.get(cls.__name__, ()) == \
+            tuple(cls.alias_filenames)
+        assert PRIORITIES.get(cls.__name__, 0) == cls.priority
+
         inst = cls(opt1="val1", opt2="val2")
         if issubclass(cls, RegexLexer):
             if not hasattr(cls, '_tokens'):
@@ -117,6 +147,21 @@ def test_lexer_options():
         yield verify, lexer
 
 
+def test_get_tokens_line_count():
+    from pygments.token import TokenArray
+    lx = lexers.PythonLexer()
+    tokens = lx.get_tokens(u'a\r\nb')
+    assert tokens.line_count == 2
+    assert u''.join(value for ttype, value in tokens) == u'a\nb\n'
+    assert lexers.PythonLexer(ensurenl=False).get_tokens(
+        u'a\n\nb').line_count == 3
+    assert lx.get_tokens(u'').line_count == 1
+    assert TokenArray(lx.get_tokens(u'a\nb')).line_count == 2
+    # filters may change the text
+    lx = lexers.PythonLexer(filters=['whitespace'])
+    assert not hasattr(lx.get_tokens(u'a\nb'), 'line_count')
+
+
 def test_get_lexers():
     # test that the lexers functions work
     def verify(func, args):
@@ -149,6 +194,338 @@ def test_get_lexers():
         raise Exception
 
 
+def test_lexer_filename_index():
+    # the index must find the same patterns as matching each of them
+    index = lexers._get_index()
+    filenames = ['Makefile', 'Makefile.am', '.bashrc', 'a.tar.gz', 'x.h',
+                 'foo.Config.in', 'external.in.x', 'a.php5', 'a.lasso9',
+                 'prog.1', 'CMakeLists.txt', '.py', 'a.b.c', 'noext']
+    for _, _, _, globs, _ in lexers.LEXERS.values():
+        filenames.extend(glob.replace('*', 'x') for glob in globs)
+    for fn in filenames:
+        expected = [(key, glob)
+                    for key, (_, _, _, globs, _) in lexers.LEXERS.items()
+                    for glob in globs if fnmatch.fnmatchcase(fn, glob)]
+        assert index.match_filename(fn) == expected, fn
+
+
+def test_guess_candidates():
+    assert lexers._guess_candidates('#!/usr/bin/python2.7\nimport sys') == \
+        set(['PythonLexer', 'NumPyLexer'])
+    assert 'BashLexer' in lexers._guess_candidates('#!/bin/sh\necho')
+    assert 'DiffLexer' in lexers._guess_candidates('diff -r a b\n')
+    assert 'HtmlLexer' in lexers._guess_candidates('<!DOCTYPE html>\n<html>')
+    assert 'XmlLexer' in lexers._guess_candidates('<?xml version="1.0"?>')
+    assert lexers._guess_candidates('print 1') == set()
+    lx = lexers.guess_lexer('#!/usr/bin/env ruby1.9\nputs 1\n')
+    assert isinstance(lx, lexers.RubyLexer)
+
+
+class GuessCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.old_cache = lexers.set_guess_cache(None)
+
+    def tearDown(self):
+        lexers.set_guess_cache(self.old_cache)
+        shutil.rmtree(self.cache_dir)
+
+    def test_lru(self):
+        cache = lexers.GuessCache(maxsize=2)
+        for key in 'abc':
+            cache[key] = key.upper()
+        self.assertEqual(len(cache), 2)
+        self.assertRaises(KeyError, cache.__getitem__, 'a')
+        self.assertEqual(cache['b'], 'B')
+        cache['d'] = None
+        self.assertRaises(KeyError, cache.__getitem__, 'c')
+        self.assertEqual(cache['b'], 'B')
+        self.assertEqual(cache['d'], None)
+        self.assertEqual((cache.hits, cache.misses), (3, 2))
+        cache.clear()
+        self.assertEqual(len(cache), 0)
+
+    def test_threads(self):
+        cache = lexers.GuessCache(maxsize=10)
+        keys = [str(i) for i in range(20)]
+
+        def run():
+            for i in range(2000):
+                key = keys[i * 7 % len(keys)]
+                try:
+                    cache[key]
+                except KeyError:
+                    cache[key] = key
+        threads = [threading.Thread(target=run) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # the list holds each entry once, and nothing else
+        link, listed = cache._root[1], []
+        while link is not cache._root:
+            self.assertTrue(link[1][0] is link)
+            listed.append(link[2])
+            link = link[1]
+        self.assertEqual(sorted(listed), sorted(cache._entries))
+        self.assertEqual(len(cache), 10)
+        self.assertEqual(cache.hits + cache.misses, 4 * 2000)
+
+    def test_unicode_name(self):
+        name = u'L\xe4xer'
+        if sys.version_info < (3,):
+            name = 'Lexer'
+        key = lexers.GuessCache.make_key('guess', None, u'code')
+        cache = lexers.GuessCache(directory=self.cache_dir)
+        cache[key] = name
+        self.assertEqual(lexers.GuessCache(directory=self.cache_dir)[key],
+                         name)
+
+    def test_guess(self):
+        cache = lexers.GuessCache(directory=self.cache_dir)
+        lexers.set_guess_cache(cache)
+        code = '#!/usr/bin/env ruby1.9\nputs 1\n'
+        for i in range(2):
+            lx = lexers.guess_lexer(code)
+            self.assertTrue(isinstance(lx, lexers.RubyLexer))
+            self.assertRaises(ClassNotFound, lexers.guess_lexer, 'xyz')
+            lx = lexers.guess_lexer_for_filename('a.html', '<%= @foo %>')
+            self.assertTrue(isinstance(lx, lexers.RhtmlLexer))
+            lx = lexers.get_lexer_for_filename('a.h', '@interface A\n@end')
+            self.assertTrue(isinstance(lx, lexers.ObjectiveCLexer))
+        self.assertEqual((cache.hits, cache.misses), (4, 4))
+        self.assertEqual(len(os.listdir(self.cache_dir)), 4)
+        # another process finds the results in the directory
+        cache = lexers.GuessCache(directory=self.cache_dir)
+        lexers.set_guess_cache(cache)
+        lx = lexers.guess_lexer(code)
+        self.assertTrue(isinstance(lx, lexers.RubyLexer))
+        self.assertEqual((cache.hits, cache.misses), (1, 0))
+        cache.clear()
+        self.assertEqual(os.listdir(self.cache_dir), [])
+
+    def test_bytes_code(self):
+        lexers.set_guess_cache(lexers.GuessCache())
+        for i in range(2):
+            cls = lexers.find_lexer_class_for_filename(
+                'a.h', b'@interface A\n@end')
+            self.assertTrue(cls is lexers.ObjectiveCLexer)
+        self.assertRaises(TypeError, lexers.GuessCache.make_key,
+                          'filename', 'a.h', (u'code', 'utf-8'))
+
+
+class LazyFuture(object):
+    def __init__(self, fn, args):
+        self.fn = fn
+        self.args = args
+        self.done = False
+
+    def result(self):
+        self.done = True
+        return self.fn(*self.args)
+
+    def cancel(self):
+        return not self.done
+
+
+class LazyExecutor(object):
+    """Runs the submitted calls when their results are needed."""
+
+    def __init__(self):
+        self.futures = []
+
+    def submit(self, fn, *args):
+        future = LazyFuture(fn, args)
+        self.futures.append(future)
+        return future
+
+
+class GuessExecutorTest(unittest.TestCase):
+    def setUp(self):
+        self.executor = LazyExecutor()
+        self.old_executor = lexers.set_guess_executor(self.executor)
+
+    def tearDown(self):
+        lexers.set_guess_executor(self.old_executor)
+
+    def test_same_result(self):
+        for code in ['#include <stdio.h>\nint x;', ':- module(m, []).',
+                     'zz\n@implementation A', '[section]\nkey = value\n']:
+            lexers.set_guess_executor(None)
+            expected = lexers.guess_lexer(code).__class__
+            lexers.set_guess_executor(self.executor)
+            self.assertEqual(lexers.guess_lexer(code).__class__, expected)
+        lx = lexers.guess_lexer_for_filename('a.html', '<%= @foo %>')
+        self.assertTrue(isinstance(lx, lexers.RhtmlLexer))
+        self.assertTrue(self.executor.futures)
+
+    def test_early_exit(self):
+        # GasLexer has no hint, but is sure
+        lx = lexers.guess_lexer('.text\n  movl $1, %eax\n')
+        self.assertTrue(isinstance(lx, lexers.GasLexer))
+        done = [future.done for future in self.executor.futures]
+        self.assertTrue(True in done and False in done)
+        self.assertEqual(done, sorted(done, reverse=True))
+
+    def test_min_length(self):
+        lexers.set_guess_executor(self.executor, min_length=100)
+        lexers.guess_lexer(':- module(m, []).')
+        self.assertEqual(self.executor.futures, [])
+
+
+class FakeEntryPoint(object):
+    def __init__(self, name, obj):
+        self.name = name
+        self.obj = obj
+        self.loads = 0
+
+    def load(self):
+        self.loads += 1
+        return self.obj
+
+
+class PluginLexer(RegexLexer):
+    name = 'Plugin'
+    aliases = ['plugin-test']
+    filenames = ['*.plugin-test']
+    tokens = {'root': [(r'.+', Text)]}
+
+
+class PluginTest(unittest.TestCase):
+    def setUp(self):
+        self.old_discover = plugin._discover_entry_points
+        self.entry_points = {plugin.LEXER_ENTRY_POINT: [],
+                             plugin.STYLE_ENTRY_POINT: []}
+        plugin._discover_entry_points = lambda: self.entry_points
+        plugin.refresh_plugins()
+
+    def tearDown(self):
+        plugin._discover_entry_points = self.old_discover
+        plugin.refresh_plugins()
+
+    def test_refresh(self):
+        self.assertRaises(ClassNotFound, lexers.get_lexer_by_name,
+                          'plugin-test')
+        lexer_ep = FakeEntryPoint('plugin-test', PluginLexer)
+        style_ep = FakeEntryPoint('plugin-test', None)
+        self.entry_points[plugin.LEXER_ENTRY_POINT].append(lexer_ep)
+        self.entry_points[plugin.STYLE_ENTRY_POINT].append(style_ep)
+        # the entry points are only looked up again after a refresh
+        self.assertRaises(ClassNotFound, lexers.get_lexer_by_name,
+                          'plugin-test')
+        plugin.refresh_plugins()
+        for i in range(2):
+            lx = lexers.get_lexer_by_name('plugin-test')
+            self.assertTrue(isinstance(lx, PluginLexer))
+            lx = lexers.get_lexer_for_filename('a.plugin-test')
+            self.assertTrue(isinstance(lx, PluginLexer))
+        self.assertEqual(lexer_ep.loads, 1)
+        # listing the names doesn't load the plugins
+        self.assertTrue('plugin-test' in list(styles.get_all_styles()))
+        self.assertEqual(style_ep.loads, 0)
+
+    def test_concurrent_lookup(self):
+        style_ep = FakeEntryPoint('plugin-test', None)
+        self.entry_points[plugin.STYLE_ENTRY_POINT].append(style_ep)
+        found = []
+        entry_points = self.entry_points
+
+        class Groups(dict):
+            def items(self):
+                for group in (plugin.LEXER_ENTRY_POINT,
+                              plugin.STYLE_ENTRY_POINT):
+                    if group == plugin.STYLE_ENTRY_POINT and not found:
+                        # another caller while the groups are collected
+                        found.append(None)
+                        found[0] = plugin.get_plugins(
+                            plugin.STYLE_ENTRY_POINT)
+                    yield group, entry_points[group]
+        plugin._discover_entry_points = lambda: Groups()
+        plugins = plugin.get_plugins(plugin.STYLE_ENTRY_POINT)
+        self.assertEqual([p.name for p in plugins], ['plugin-test'])
+        self.assertEqual([p.name for p in found[0]], ['plugin-test'])
+
+
+class LexerPoolTest(unittest.TestCase):
+    def test_shared(self):
+        pool = lexers.LexerPool()
+        lx = pool.get_lexer_by_name('python')
+        self.assertTrue(isinstance(lx, lexers.PythonLexer))
+        self.assertTrue(pool.get_lexer_by_name('py') is lx)
+        self.assertTrue(pool.get_lexer_for_filename('a.py') is lx)
+        self.assertTrue(pool.get_lexer_for_mimetype('text/x-python') is lx)
+        lx2 = pool.get_lexer_by_name('python', stripnl=False)
+        self.assertFalse(lx2 is lx)
+        self.assertTrue(pool.get_lexer_by_name('python', stripnl=False) is lx2)
+        # unhashable option values are compared by value
+        lx = pool.get_lexer_by_name('python', filters=['whitespace'])
+        self.assertTrue(pool.get_lexer_by_name(
+            'python', filters=['whitespace']) is lx)
+        self.assertEqual(len(pool), 3)
+        pool.clear()
+        self.assertEqual(len(pool), 0)
+        self.assertRaises(ClassNotFound, pool.get_lexer_by_name, 'xyzzy')
+
+    def test_not_reentrant(self):
+        pool = lexers.LexerPool()
+        lx = pool.get_lexer_by_name('http')
+        self.assertFalse(pool.get_lexer_by_name('http') is lx)
+        self.assertEqual(len(pool), 0)
+
+    def test_threads(self):
+        import threading
+        lx = lexers.LexerPool().get_lexer_by_name('python')
+        code = open(TESTFILE, 'rb').read().decode('utf-8')
+        expected = list(lx.get_tokens(code))
+        results = []
+
+        def run():
+            results.append(list(lx.get_tokens(code)) == expected)
+        threads = [threading.Thread(target=run) for i in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(results, [True] * 4)
+
+
+def test_shared_builtin_sets():
+    lx1 = lexers.PhpLexer()
+    assert lexers.PhpLexer()._functions is lx1._functions
+    assert 'strlen' in lx1._functions
+    lx2 = lexers.PhpLexer(disabledmodules=['String', 'unknown'])
+    assert 'strlen' not in lx2._functions
+    assert lexers.PhpLexer(disabledmodules='unknown String')._functions \
+        is lx2._functions
+    assert not lexers.PhpLexer(funcnamehighlighting=False)._functions
+    assert lexers.LassoLexer()._builtins is lexers.LassoLexer()._builtins
+    assert lexers.LassoLexer()._members is lexers.LassoLexer()._members
+    assert lexers.LuaLexer()._functions is lexers.LuaLexer()._functions
+
+
+def test_shared_builtin_sets_publish():
+    # a lexer created while the shared sets are being stored, e.g. by
+    # another thread, gets them complete
+    cls = lexers.LassoLexer
+    nested = []
+
+    class Sets(dict):
+        def __setitem__(self, key, value):
+            dict.__setitem__(self, key, value)
+            if not nested:
+                nested.append(cls())
+
+    old_sets = cls._builtin_sets
+    cls._builtin_sets = Sets()
+    try:
+        lx = cls()
+    finally:
+        cls._builtin_sets = old_sets
+    assert nested[0]._builtins is lx._builtins
+    assert nested[0]._members is lx._members
+    assert lx._builtins and lx._members
+
+
 def test_formatter_public_api():
     # test that every formatter class has the correct public API
     ts = list(lexers.PythonLexer().get_tokens("def f(): pass"))
@@ -237,6 +614,68 @@ def test_formatter_unicode_handling():
         yield verify, fmter
 
 
+class RecordingFile(object):
+    def __init__(self):
+        self.writes = []
+        self.flushed = 0
+
+    def write(self, data):
+        self.writes.append(data)
+
+    def flush(self):
+        self.flushed += 1
+
+
+def test_formatter_output_buffer():
+    from pygments.formatter import OutputBuffer
+    from pygments.formatters import NullFormatter, RawTokenFormatter
+
+    out = RecordingFile()
+    buf = OutputBuffer(out, size=120)
+    for i in range(100):
+        buf.write(u'\xe4bc')
+    assert out.writes == [u'\xe4bc' * 40, u'\xe4bc' * 40]
+    buf.flush()
+    assert out.writes[2:] == [u'\xe4bc' * 20]
+    assert out.flushed == 1
+
+    # the encoder keeps its state between the blocks
+    out = RecordingFile()
+    buf = OutputBuffer(out, 'utf-16', size=120)
+    buf.writelines([u'\xe4bc'] * 2000)
+    buf.finish()
+    assert len(out.writes) > 1
+    assert b''.join(out.writes).decode('utf-16') == u'\xe4bc' * 2000
+    assert out.flushed == 0
+
+    tokens = [(Text, u'\xe4bc')] * 100
+    out = RecordingFile()
+    NullFormatter(encoding='utf-16').format(tokens, out)
+    assert b''.join(out.writes).decode('utf-16') == u'\xe4bc' * 100
+    # like before the buffer, the caller's file is not flushed
+    assert out.flushed == 0
+
+    # what was formatted before an error is still written
+    def failing_tokens():
+        for token in tokens:
+            yield token
+        raise ValueError
+    out = RecordingFile()
+    try:
+        NullFormatter().format(failing_tokens(), out)
+    except ValueError:
+        pass
+    else:
+        assert False, 'ValueError not raised'
+    assert u''.join(out.writes) == u'\xe4bc' * 100
+
+    out = RecordingFile()
+    RawTokenFormatter(buffersize=1000).format(tokens, out)
+    assert 1 < len(out.writes) < 100
+    assert len(b''.join(out.writes).splitlines()) == 100
+    assert out.flushed == 1
+
+
 def test_get_formatters():
     # test that the formatters functions work
     x = formatters.get_formatter_by_name("html", opt="val")
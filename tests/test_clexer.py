@@ -31,6 +31,16 @@ class CLexerTest(unittest.TestCase):
         wanted = wanted[:-1] + [(Text, '\n')]
         self.assertEqual(list(self.lexer.get_tokens(code)), wanted)
 
+    def testTypes(self):
+        code = 'FILE _Bool'
+        self.assertEqual(list(self.lexer.get_tokens(code)),
+                         [(Token.Keyword.Type, 'FILE'), (Text, ' '),
+                          (Token.Keyword.Type, '_Bool'), (Text, '\n')])
+        lexer = CLexer(stdlibhighlighting=False, c99highlighting=False)
+        self.assertEqual(list(lexer.get_tokens(code)),
+                         [(Token.Name, 'FILE'), (Text, ' '),
+                          (Token.Name, '_Bool'), (Text, '\n')])
+
     def testSwitch(self):
         fragment = u'''\
         int main()
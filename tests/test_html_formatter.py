@@ -27,6 +27,7 @@ TESTFILE, TESTDIR = support.location(__file__)
 
 with io.open(TESTFILE, encoding='utf-8') as fp:
     tokensource = list(PythonLexer().get_tokens(fp.read()))
+tokensource_lines = u''.join(value for _, value in tokensource).count('\n')
 
 
 class HtmlFormatterTest(unittest.TestCase):
@@ -110,6 +111,75 @@ class HtmlFormatterTest(unittest.TestCase):
         html = outfile.getvalue()
         self.assertTrue(re.search("<pre>\s+5\s+6\s+7", html))
 
+    def test_linenos_streaming(self):
+        # with the number of lines known up front, the output starts before
+        # all tokens are consumed, and is the same as otherwise
+        class Source(object):
+            line_count = tokensource_lines
+            done = False
+
+            def __iter__(self):
+                for token in tokensource:
+                    yield token
+                self.done = True
+
+        class Outfile(object):
+            def __init__(self):
+                self.pieces = []
+
+            def write(self, piece):
+                if not self.pieces:
+                    self.early = not source.done
+                self.pieces.append(piece)
+
+        for linenos in ('table', 'inline'):
+            fmt = HtmlFormatter(linenos=linenos, linenospecial=3)
+            source = Source()
+            outfile = Outfile()
+            fmt.format_unencoded(source, outfile)
+            self.assertTrue(outfile.early)
+            expected = StringIO()
+            fmt.format_unencoded(tokensource, expected)
+            self.assertEqual(''.join(outfile.pieces), expected.getvalue())
+
+    def test_linenos_wrap_override(self):
+        # a wrap() that adds lines makes the count of the tokens wrong
+        class Source(object):
+            line_count = tokensource_lines
+
+            def __iter__(self):
+                return iter(tokensource)
+
+        class WrappingFormatter(HtmlFormatter):
+            def wrap(self, source, outfile):
+                yield 1, 'header\n'
+                for item in HtmlFormatter.wrap(self, source, outfile):
+                    yield item
+
+        for linenos in ('table', 'inline'):
+            fmt = WrappingFormatter(linenos=linenos)
+            outfile = StringIO()
+            fmt.format_unencoded(Source(), outfile)
+            expected = StringIO()
+            fmt.format_unencoded(iter(tokensource), expected)
+            self.assertEqual(outfile.getvalue(), expected.getvalue())
+
+        class FormatLinesFormatter(HtmlFormatter):
+            def _format_lines(self, tokensource):
+                yield 1, 'first\n'
+                for item in HtmlFormatter._format_lines(self, tokensource):
+                    yield item
+
+        # start so that the extra line needs one more digit
+        fmt = FormatLinesFormatter(
+            linenos='inline',
+            linenostart=10 ** len(str(tokensource_lines)) - tokensource_lines)
+        outfile = StringIO()
+        fmt.format_unencoded(Source(), outfile)
+        expected = StringIO()
+        fmt.format_unencoded(iter(tokensource), expected)
+        self.assertEqual(outfile.getvalue(), expected.getvalue())
+
     def test_lineanchors(self):
         optdict = dict(lineanchors="foo")
         outfile = StringIO()
@@ -192,3 +262,25 @@ class HtmlFormatterTest(unittest.TestCase):
             fmt.format(tokensource, outfile)
             self.assertTrue('<a href="test_html_formatter.py#L-165">test_ctags</a>'
                             in outfile.getvalue())
+
+    def test_spans(self):
+        from pygments.token import Token, Name, Text
+        custom = Name.Function.Magic.Extra
+        tokens = [(custom, u'a'), (Text, u' '), (custom, u'b\n')]
+        fmt = HtmlFormatter(nowrap=True)
+        outfile = StringIO()
+        fmt.format(tokens, outfile)
+        self.assertEqual(outfile.getvalue(),
+                         '<span class="nf-Magic-Extra">a</span> '
+                         '<span class="nf-Magic-Extra">b</span>\n')
+        self.assertEqual(fmt._spans[custom],
+                         ('<span class="nf-Magic-Extra">', '</span>'))
+        self.assertEqual(fmt._spans[Text], ('', ''))
+
+        fmt = HtmlFormatter(nowrap=True, noclasses=True)
+        outfile = StringIO()
+        fmt.format(tokens, outfile)
+        style = fmt.class2style[fmt.ttype2class[Name.Function]][0]
+        self.assertEqual(fmt._spans[custom],
+                         ('<span style="%s">' % style, '</span>'))
+        self.assertFalse(Token in fmt._spans)
@@ -7,12 +7,21 @@
     :license: BSD, see LICENSE for details.
 """
 
+import os
+import shutil
+import tempfile
+import threading
 import unittest
 
 from pygments.token import Text
-from pygments.lexer import RegexLexer
+from pygments.lexer import RegexLexer, ExtendedRegexLexer
 from pygments.lexer import bygroups
 from pygments.lexer import default
+from pygments.lexer import include, combined, words, wordset
+from pygments.lexer import _processing_digests
+from pygments.lexers import RstLexer, HaxeLexer, HttpLexer, XQueryLexer, \
+    UrbiscriptLexer
+from pygments.util import BytesIO, StringIO
 
 
 class TestLexer(RegexLexer):
@@ -52,3 +61,430 @@ class TupleTransTest(unittest.TestCase):
         lx = TestLexer()
         toks = list(lx.get_tokens_unprocessed('d'))
         self.assertEqual(toks, [(0, Text.Beer, 'd')])
+
+
+class FusedLexer(RegexLexer):
+    """Test lexer mixing fusable and unfusable rules."""
+    fuse_rules = True
+    tokens = {
+        'root': [
+            (r'(\w+)(=)(\d+)', bygroups(Text.Name, Text.Op, Text.Number)),
+            (r'(["\'])(.*?)\1', Text.String),
+            (r'\w+', Text.Word),
+            (r'(?P<sp>\s+)', Text),
+            (r'\(', Text.Paren, 'paren'),
+        ],
+        'paren': [
+            (r'\)', Text.Paren, '#pop'),
+            (r'[^()]+', Text.Inner),
+            default('#pop'),
+        ],
+    }
+
+
+class UnfusedLexer(FusedLexer):
+    fuse_rules = False
+
+
+class FusedRulesTest(unittest.TestCase):
+    text = 'a=1 "x" \'y\' word (in (side)) b=2\n'
+
+    def test_same_tokens(self):
+        self.assertEqual(list(FusedLexer().get_tokens_unprocessed(self.text)),
+                         list(UnfusedLexer().get_tokens_unprocessed(self.text)))
+
+    def test_fusing(self):
+        FusedLexer()
+        root = FusedLexer._tokens['root']
+        # the backreference and the named group rule are left alone
+        self.assertEqual(len(root), 5)
+        self.assertEqual(len(FusedLexer._tokens['paren']), 1)
+
+
+class FirstCharLexer(RegexLexer):
+    tokens = {
+        'root': [
+            (r'"[^"]*"', Text.String),
+            (r'(?i)select\b', Text.Keyword),
+            (r'\d+|[a-f]x', Text.Number),
+            (r'\w+', Text.Word),
+            (r'(?=#)', Text, 'comment'),
+            (r'\s+', Text),
+        ],
+        'comment': [
+            (r'#.*', Text.Comment, '#pop'),
+        ],
+    }
+
+
+class FirstCharDispatchTest(unittest.TestCase):
+    def test_candidates(self):
+        FirstCharLexer()
+        table = FirstCharLexer._tokens['root'].by_first_char
+
+        def types(char):
+            return [rule[1] for rule in table[char]]
+        self.assertEqual(types('"'), [Text.String, Text])
+        self.assertEqual(types('S'), [Text.Keyword, Text.Word, Text])
+        self.assertEqual(types('5'), [Text.Number, Text.Word, Text])
+        self.assertEqual(types('b'), [Text.Number, Text.Word, Text])
+        self.assertEqual(types(' '), [Text, Text])
+        self.assertEqual(types('+'), [Text])
+        # nullable rules are candidates at the end of the text as well
+        self.assertEqual(types(''), [Text])
+
+    def test_tokens(self):
+        toks = list(FirstCharLexer().get_tokens_unprocessed('SeLect "a" #x'))
+        self.assertEqual(toks,
+           [(0, Text.Keyword, 'SeLect'), (6, Text, ' '),
+            (7, Text.String, '"a"'), (10, Text, ' '), (11, Text, ''),
+            (11, Text.Comment, '#x')])
+
+
+class WordSetLexer(RegexLexer):
+    tokens = {
+        'root': [
+            (wordset(('if', 'else', 'is.na'), pattern=r'[\w.]+',
+                     suffix=r'(?![\w.])'), Text.Keyword),
+            (wordset(('select', 'from'), prefix=r'\b', suffix=r'\s*\b',
+                     ignorecase=True), Text.Builtin),
+            (r'[\w.]+', Text.Word),
+            (r'\s+', Text),
+        ],
+    }
+
+
+class WordSetTest(unittest.TestCase):
+    def test_tokens(self):
+        toks = list(WordSetLexer().get_tokens_unprocessed(
+            u'if is.na elsewhere is SeLeCT x'))
+        self.assertEqual(toks,
+           [(0, Text.Keyword, u'if'), (2, Text, u' '),
+            (3, Text.Keyword, u'is.na'), (8, Text, u' '),
+            (9, Text.Word, u'elsewhere'), (18, Text, u' '),
+            (19, Text.Word, u'is'), (21, Text, u' '),
+            (22, Text.Builtin, u'SeLeCT '), (29, Text.Word, u'x')])
+
+    def test_same_as_words(self):
+        kws = ('if', 'else', 'elif', 'is.na', 'is')
+
+        class WordsLexer(RegexLexer):
+            tokens = {
+                'root': [
+                    (words(kws, suffix=r'(?![\w.])'), Text.Keyword),
+                    (r'[\w.]+', Text.Word),
+                    (r'\s+', Text),
+                ],
+            }
+
+        class SetLexer(WordsLexer):
+            tokens = {
+                'root': [
+                    (wordset(kws, pattern=r'[\w.]+', suffix=r'(?![\w.])'),
+                     Text.Keyword),
+                    (r'[\w.]+', Text.Word),
+                    (r'\s+', Text),
+                ],
+            }
+
+        text = u'if iff elif is is.n is.na.x else.if else'
+        self.assertEqual(list(SetLexer().get_tokens(text)),
+                         list(WordsLexer().get_tokens(text)))
+
+    def test_invalid_word(self):
+        class BadLexer(RegexLexer):
+            tokens = {
+                'root': [
+                    (wordset(('a', 'a-b')), Text.Keyword),
+                ],
+            }
+        self.assertRaises(ValueError, BadLexer)
+
+
+class CommentLexer(RegexLexer):
+    tokens = {
+        'root': [
+            (r'/\*', Text.Comment, 'comment'),
+            (r'[^/\n]+', Text),
+            (r'/', Text),
+        ],
+        'comment': [
+            (r'\*/', Text.Comment, '#pop'),
+            (r'[^*\n]+', Text.Comment),
+            (r'\*|\n', Text.Comment),
+        ],
+    }
+
+
+class ExtendedCommentLexer(ExtendedRegexLexer):
+    tokens = CommentLexer.tokens
+
+
+class UpdateTokensTest(unittest.TestCase):
+    text = u'a\n/* b\nc */\nd\ne\n'
+
+    def check_edit(self, lexer, start, end, replacement):
+        tokens, checkpoints = lexer.get_tokens_with_checkpoints(self.text)
+        newtext, newtokens, newcheckpoints = lexer.update_tokens(
+            self.text, tokens, checkpoints, start, end, replacement)
+        self.assertEqual(newtext, self.text[:start] + replacement +
+                         self.text[end:])
+        self.assertEqual((newtokens, newcheckpoints),
+                         lexer.get_tokens_with_checkpoints(newtext))
+        return newtokens
+
+    def test_checkpoints(self):
+        for lexer in CommentLexer(), ExtendedCommentLexer():
+            tokens, checkpoints = lexer.get_tokens_with_checkpoints(self.text)
+            self.assertEqual(tokens,
+                             list(lexer.get_tokens_unprocessed(self.text)))
+            self.assertEqual(checkpoints,
+                [(2, ('root',), 2), (7, ('root', 'comment'), 5),
+                 (12, ('root',), 8), (14, ('root',), 10), (16, ('root',), 12)])
+
+    def test_edits(self):
+        for lexer in CommentLexer(), ExtendedCommentLexer():
+            for start, end, replacement in [
+                    (0, 0, u'x'), (0, 1, u''), (2, 4, u''), (8, 10, u'*/'),
+                    (13, 13, u'/*'), (15, 16, u'\n\n'), (16, 16, u'f\n'),
+                    (0, 16, u'')]:
+                self.check_edit(lexer, start, end, replacement)
+
+    def test_reuse(self):
+        # tokens after the edit are shifted, not lexed again
+        lexer = CommentLexer()
+        tokens, checkpoints = lexer.get_tokens_with_checkpoints(self.text)
+        tokens[-2] = (14, Text.Old, u'e')
+        tokens = lexer.update_tokens(self.text, tokens, checkpoints,
+                                     0, 1, u'xyz')[1]
+        self.assertEqual(tokens[-2:],
+                         [(16, Text.Old, u'e'), (17, Text, u'\n')])
+
+    def test_not_resumable(self):
+        # these lexers keep state outside of the state stack
+        text = u'class A {\n#if x\nvar a;\n#else\nvar b;\n#end\n}\n'
+        for lexer in HaxeLexer(), HttpLexer(), XQueryLexer():
+            self.assertFalse(lexer._resumable())
+            tokens, checkpoints = lexer.get_tokens_with_checkpoints(text)
+            self.assertEqual(checkpoints, [])
+            self.assertEqual(
+                lexer.update_tokens(text, tokens, checkpoints, 22, 22, u'x'),
+                (text[:22] + u'x' + text[22:],) +
+                lexer.get_tokens_with_checkpoints(text[:22] + u'x' + text[22:]))
+
+    def test_unordered_indices(self):
+        # the tokens of the code block have indices relative to the code
+        lexer = RstLexer()
+        text = (u'Title\n=====\n\nSome *text*.\n\n'
+                u'.. sourcecode:: python\n\n    def f(x):\n        return x\n\n'
+                u'More text, ``code``.\n\nSection\n-------\n\nEnd.\n')
+        tokens, checkpoints = lexer.get_tokens_with_checkpoints(text)
+        self.assertTrue(any(a[0] > b[0] for a, b in zip(tokens, tokens[1:])))
+        for start, end, replacement in [
+                (0, 1, u't'), (14, 18, u'Any'), (53, 54, u'g'),
+                (70, 70, u'\n'), (80, 84, u'**'), (len(text), len(text), u'x')]:
+            newtext, newtokens, newcheckpoints = lexer.update_tokens(
+                text, tokens, checkpoints, start, end, replacement)
+            fulltokens, fullcheckpoints = \
+                lexer.get_tokens_with_checkpoints(newtext)
+            self.assertEqual([token[1:] for token in newtokens],
+                             [token[1:] for token in fulltokens])
+            self.assertEqual(newcheckpoints, fullcheckpoints)
+
+
+class TokensStreamTest(unittest.TestCase):
+    texts = [u'', u'\n\n', u'a\n/* b\nc */\nd\n', u'\r\n a\t/*\r\nb\r\r*/\t\n\n',
+             u'\ufeff  /*\t*/ x  \n \n', u'a\n' * 50 + u'/*\n' * 50 + u'*/']
+
+    def check(self, lexer, data, **kwargs):
+        for chunksize in 1, 2, 7, 100:
+            stream = lexer.get_tokens_stream(BytesIO(data), chunksize=chunksize,
+                                             lookahead=5, **kwargs)
+            self.assertEqual(list(stream), list(lexer.get_tokens(data)))
+
+    def test_options(self):
+        for options in [{}, {'stripall': True}, {'stripnl': False},
+                        {'tabsize': 4}, {'ensurenl': False},
+                        {'stripnl': False, 'ensurenl': False}]:
+            for lexer in (CommentLexer(**options),
+                          ExtendedCommentLexer(**options)):
+                for text in self.texts:
+                    self.check(lexer, text.encode('utf-8'))
+
+    def test_encodings(self):
+        text = self.texts[3] + u'\xe4\u20ac'
+        for encoding in 'utf-8', 'utf-8-sig', 'utf-16', 'utf-32':
+            self.check(CommentLexer(), text.encode(encoding))
+            self.check(CommentLexer(encoding=encoding), text.encode(encoding))
+        self.check(CommentLexer(encoding='latin1'), text[:-1].encode('latin1'))
+
+    def test_bom(self):
+        # like get_tokens(), only guessing keeps the byte order mark
+        data = u'\ufeffa\n'.encode('utf-8')
+        for encoding, text in [('guess', u'\ufeffa\n'), ('utf-8', u'a\n')]:
+            lexer = CommentLexer(encoding=encoding)
+            self.check(lexer, data)
+            stream = lexer.get_tokens_stream(BytesIO(data))
+            self.assertEqual(u''.join(v for t, v in stream), text)
+
+    def test_guessed_encoding(self):
+        # the first chunks are ASCII, so the encoding is only known later
+        lexer = CommentLexer(encoding='guess')
+        for text in (u'a\n' * 20 + u'/* \xe4\xf6 */\n',
+                     u'a\n' * 20 + u'/* \u20ac */\n'):
+            for encoding in 'utf-8', 'latin1':
+                try:
+                    data = text.encode(encoding)
+                except UnicodeEncodeError:
+                    continue
+                self.check(lexer, data)
+        # non-ASCII text before the failing chunk stays decoded as UTF-8
+        data = u'\xe4\n'.encode('utf-8') + b'a\n' * 20 + b'\xe4\n'
+        stream = lexer.get_tokens_stream(BytesIO(data), chunksize=4,
+                                         lookahead=5)
+        self.assertEqual(u''.join(v for t, v in stream),
+                         u'\xe4\n' + u'a\n' * 20 + u'\xe4\n')
+
+    def test_not_streamable(self):
+        # the callback for blobs reads the text after its match
+        lexer = UrbiscriptLexer()
+        text = u'var a = 1;\n' * 20 + u'"\\B(60)(' + u'b\n' * 30 + u')";\n'
+        for chunksize in 7, 97:
+            stream = lexer.get_tokens_stream(StringIO(text),
+                                             chunksize=chunksize, lookahead=5)
+            self.assertEqual(list(stream), list(lexer.get_tokens(text)))
+
+    def test_unicode_input(self):
+        lexer = CommentLexer()
+        for text in self.texts:
+            stream = lexer.get_tokens_stream(StringIO(text), chunksize=3)
+            self.assertEqual(list(stream), list(lexer.get_tokens(text)))
+
+
+class LazyLexer(RegexLexer):
+    lazy_states = True
+    tokens = {
+        'root': [
+            ('a', Text.Root, 'rag'),
+            ('b', Text.Root, 'broken'),
+            include('other'),
+        ],
+        'other': [
+            ('c', Text.Other),
+        ],
+        'rag': [
+            ('b', Text.Rag, combined('root', 'other')),
+            ('d', Text.Rag, '#pop'),
+        ],
+        'broken': [
+            ('(', Text),
+        ],
+    }
+
+
+class LazyStatesTest(unittest.TestCase):
+    def test(self):
+        lx = LazyLexer()
+        self.assertEqual(sorted(LazyLexer._tokens), [])
+        self.assertTrue('broken' in LazyLexer._tokens)
+        toks = list(lx.get_tokens_unprocessed('cadc'))
+        self.assertEqual(toks,
+           [(0, Text.Other, 'c'), (1, Text.Root, 'a'), (2, Text.Rag, 'd'),
+            (3, Text.Other, 'c')])
+        self.assertEqual(sorted(LazyLexer._tokens), ['rag', 'root'])
+        toks = list(lx.get_tokens_unprocessed('abc'))
+        self.assertEqual(toks[-1], (2, Text.Other, 'c'))
+        self.assertRaises(ValueError, list, lx.get_tokens_unprocessed('b'))
+
+
+    def test_threads(self):
+        # threads entering the same states for the first time must all see
+        # complete rules
+        states = dict(('s%d' % i, [(r'x%d\b' % j, Text) for j in range(200)] +
+                                  [(r'\n', Text, '#pop')])
+                      for i in range(20))
+        states['root'] = [(r'%s\n' % state, Text, state) for state in states]
+        states['root'].append((r'\s+', Text))
+        text = u''.join(u's%d\nx199\n' % i for i in range(20))
+        expected = list(RegexLexer.__class__(
+            'Lexer', (RegexLexer,), {'tokens': states})().get_tokens(text))
+        for attempt in range(5):
+            cls = RegexLexer.__class__('Lexer', (RegexLexer,),
+                                       {'tokens': states, 'lazy_states': True})
+            lexer = cls()
+            start = threading.Event()
+            results = []
+
+            def run():
+                start.wait()
+                results.append(list(lexer.get_tokens(text)))
+            threads = [threading.Thread(target=run) for i in range(8)]
+            for thread in threads:
+                thread.start()
+            start.set()
+            for thread in threads:
+                thread.join()
+            self.assertEqual(results, [expected] * len(threads))
+
+
+def make_cached_lexer(cache_dir, keyword):
+    class CachedLexer(RegexLexer):
+        tokens = {
+            'root': [
+                (words((keyword, 'else'), suffix=r'\b'), Text.Keyword),
+                (r'\(', Text, combined('inner', 'other')),
+                include('inner'),
+                default('other'),
+            ],
+            'inner': [
+                (r'\)', Text, '#pop'),
+                (r'(\w+)', bygroups(Text.Word)),
+                (r'\s+', Text),
+            ],
+            'other': [
+                (r'.', Text.Other, '#pop'),
+            ],
+        }
+    CachedLexer.cache_dir = cache_dir
+    return CachedLexer
+
+
+class TokendefCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_dir)
+
+    def check(self, lexer, keyword):
+        toks = list(lexer.get_tokens_unprocessed(u'%s (x else) !' % keyword))
+        self.assertEqual(toks,
+           [(0, Text.Keyword, keyword), (len(keyword), Text, u' '),
+            (len(keyword) + 1, Text, u'('), (len(keyword) + 2, Text.Word, u'x'),
+            (len(keyword) + 3, Text, u' '),
+            (len(keyword) + 4, Text.Word, u'else'),
+            (len(keyword) + 8, Text, u')'), (len(keyword) + 9, Text, u' '),
+            (len(keyword) + 10, Text.Other, u'!')])
+
+    def test_cache(self):
+        cls = make_cached_lexer(self.cache_dir, 'if')
+        self.check(cls(), 'if')
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+        cls = make_cached_lexer(self.cache_dir, 'if')
+        key = cls._cache_key(cls.get_tokendefs())
+        self.assertTrue(cls._load_cached('', cls.get_tokendefs(), key))
+        self.check(cls(), 'if')
+        # a change in the definitions invalidates the file
+        cls = make_cached_lexer(self.cache_dir, 'unless')
+        key = cls._cache_key(cls.get_tokendefs())
+        self.assertFalse(cls._load_cached('', cls.get_tokendefs(), key))
+        self.check(cls(), 'unless')
+        self.assertTrue(cls._load_cached('', cls.get_tokendefs(), key))
+        # so does a change in the code that processes them
+        old_digests = _processing_digests[:]
+        _processing_digests[:] = ['changed']
+        try:
+            key = cls._cache_key(cls.get_tokendefs())
+            self.assertFalse(cls._load_cached('', cls.get_tokendefs(), key))
+        finally:
+            _processing_digests[:] = old_digests
@@ -74,3 +74,28 @@ class RegexOptTestCase(unittest.TestCase):
         rex = re.compile(opt)
         m = rex.match('abfoo')
         self.assertEqual(5, m.end())
+
+    def test_longest_first(self):
+        # a longer string is preferred, but a shorter one is still
+        # found if the rest of the regex does not match after the longer one
+        opt = regex_opt(('in', 'int', 'integer', 'i'), suffix=r'\b')
+        rex = re.compile(opt)
+        self.assertEqual(rex.match('int x').group(), 'int')
+        self.assertEqual(rex.match('integer').group(), 'integer')
+        self.assertEqual(rex.match('i').group(), 'i')
+        self.assertFalse(rex.match('inte'))
+        self.assertEqual(re.compile(regex_opt(('a', 'ab'))).match('ab').end(),
+                         2)
+
+    def test_groups(self):
+        # one group around the alternatives, except for a plain charset
+        self.assertEqual(re.compile(regex_opt(('ab', 'cd'))).groups, 1)
+        self.assertEqual(re.compile(regex_opt(('a',))).groups, 1)
+        self.assertEqual(re.compile(regex_opt(('a', 'b'))).groups, 0)
+        self.assertEqual(regex_opt(()), '')
+
+    def test_memo(self):
+        strings = ['foo', 'bar', 'baz', 'barfoo']
+        opt = regex_opt(strings, suffix=r'\b')
+        self.assertTrue(regex_opt(tuple(strings), suffix=r'\b') is opt)
+        self.assertFalse(regex_opt(strings) is opt)
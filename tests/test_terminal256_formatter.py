@@ -0,0 +1,73 @@
+# -*- coding: utf-8 -*-
+"""
+    Pygments Terminal256 formatter tests
+    ~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~~
+
+    :copyright: Copyright 2006-2014 by the Pygments team, see AUTHORS.
+    :license: BSD, see LICENSE for details.
+"""
+
+import random
+import unittest
+
+from pygments.util import StringIO
+from pygments.token import Token
+from pygments.style import Style
+from pygments.formatters import Terminal256Formatter
+
+
+class TestStyle(Style):
+    styles = {
+        Token.Keyword: 'bold #00ff00',
+        Token.Name: 'bg:#0000ff',
+    }
+
+
+def closest_color(formatter, r, g, b):
+    # search the whole table, like the formatter did before
+    distance = 257*257*3
+    match = 0
+    for i in range(0, 254):
+        values = formatter.xterm_colors[i]
+        d = sum((x - y) ** 2 for x, y in zip((r, g, b), values))
+        if d < distance:
+            match = i
+            distance = d
+    return match
+
+
+class Terminal256FormatterTest(unittest.TestCase):
+
+    def format(self, tokens, **options):
+        out = StringIO()
+        Terminal256Formatter(style=TestStyle, **options).format(tokens, out)
+        return out.getvalue()
+
+    def test_escapes(self):
+        self.assertEqual(
+            self.format([(Token.Keyword, u'if'), (Token.Text, u' '),
+                         (Token.Name, u'a\nb\n')]),
+            u'\x1b[38;5;10;01mif\x1b[39;00m \x1b[48;5;21ma\x1b[49m\n'
+            u'\x1b[48;5;21mb\x1b[49m\n')
+        self.assertEqual(self.format([(Token.Keyword, u'if')], nobold=True),
+                         u'\x1b[38;5;10mif\x1b[39m')
+
+    def test_subtypes(self):
+        # token types without a style of their own, even ones created after
+        # the formatter, get the style of their nearest parent
+        formatter = Terminal256Formatter(style=TestStyle)
+        ttype = Token.Keyword.Terminal256Test
+        out = StringIO()
+        formatter.format([(ttype, u'if'), (Token.Text.Terminal256Test, u'x')],
+                         out)
+        self.assertEqual(out.getvalue(), u'\x1b[38;5;10;01mif\x1b[39;00mx')
+
+    def test_closest_color(self):
+        formatter = Terminal256Formatter()
+        rnd = random.Random(42)
+        colors = [(v, v, v) for v in range(256)]
+        colors += [tuple(rnd.randrange(256) for i in range(3))
+                   for j in range(2000)]
+        for r, g, b in colors:
+            self.assertEqual(formatter._closest_color(r, g, b),
+                             closest_color(formatter, r, g, b))
@@ -7,9 +7,15 @@
     :license: BSD, see LICENSE for details.
 """
 
+import sys
+import pickle
+import threading
 import unittest
 
 from pygments import token
+from pygments.formatters import HtmlFormatter
+from pygments.lexers import PythonLexer
+from pygments import format
 
 
 class TokenTest(unittest.TestCase):
@@ -32,6 +38,102 @@ class TokenTest(unittest.TestCase):
         self.assertTrue(token.string_to_tokentype('') is token.Token)
         self.assertTrue(token.string_to_tokentype('String') is token.String)
 
+    def test_contains(self):
+        self.assertTrue(token.String in token.String)
+        self.assertTrue(token.String.Double in token.Literal)
+        self.assertTrue(token.Text in token.Token)
+        self.assertFalse(token.Literal in token.String)
+        self.assertFalse(token.Name.Builtin in token.Name.Function)
+        # plain tuples and other objects are no token types
+        self.assertFalse(('Literal', 'String') in token.Literal)
+        self.assertFalse(None in token.Token)
+
+    def test_pickle(self):
+        for proto in range(pickle.HIGHEST_PROTOCOL + 1):
+            t = pickle.loads(pickle.dumps(token.String.Double, proto))
+            self.assertTrue(t is token.String.Double)
+        self.assertTrue(pickle.loads(pickle.dumps(token.Token)) is token.Token)
+
+    def test_ids(self):
+        self.assertTrue(token.TOKEN_TYPES[token.Token.id] is token.Token)
+        self.assertTrue(token.TOKEN_TYPES[token.String.id] is token.String)
+        self.assertEqual(token.String.ancestor_ids,
+                         (token.String.id, token.Literal.id, token.Token.id))
+        new = token.Token.Literal.Test_Ids
+        self.assertTrue(token.TOKEN_TYPES[new.id] is new)
+        self.assertEqual(new.ancestor_ids[1:], token.Literal.ancestor_ids)
+
+    def test_ids_threads(self):
+        names = ['Test_Threads%d' % i for i in range(200)]
+        start = threading.Event()
+        created = []
+
+        def run():
+            start.wait()
+            created.append([token.string_to_tokentype('Name.' + name)
+                            for name in names])
+        threads = [threading.Thread(target=run) for i in range(8)]
+        # switch threads as often as possible
+        if hasattr(sys, 'setswitchinterval'):
+            interval = sys.getswitchinterval()
+            sys.setswitchinterval(1e-6)
+        else:
+            interval = sys.getcheckinterval()
+            sys.setcheckinterval(1)
+        try:
+            for thread in threads:
+                thread.start()
+            start.set()
+            for thread in threads:
+                thread.join()
+        finally:
+            if hasattr(sys, 'setswitchinterval'):
+                sys.setswitchinterval(interval)
+            else:
+                sys.setcheckinterval(interval)
+        for types in created:
+            self.assertEqual(types, [getattr(token.Name, name)
+                                     for name in names])
+            for ttype in types:
+                self.assertTrue(ttype is getattr(token.Name, ttype[-1]))
+                self.assertTrue(token.TOKEN_TYPES[ttype.id] is ttype)
+                self.assertTrue(ttype in token.Name)
+        ids = [ttype.id for ttype in token.TOKEN_TYPES]
+        self.assertEqual(ids, list(range(len(ids))))
+
+    def test_tokentype_table(self):
+        table = token.TokenTypeTable({token.Token: 0, token.Name: 1,
+                                      token.Name.Builtin: 2})
+        self.assertEqual(table[token.Text], 0)
+        self.assertEqual(table[token.Name], 1)
+        self.assertEqual(table[token.Name.Function], 1)
+        self.assertEqual(table[token.Name.Builtin.Pseudo], 2)
+        # token types created after the table
+        self.assertEqual(table[token.Name.Builtin.Test_Table], 2)
+        self.assertEqual(table.values[token.Keyword.id], 0)
+        self.assertEqual(token.TokenTypeTable({})[token.Name], None)
+
+    def test_tokentype_table_threads(self):
+        # another thread updates the table while it is being updated
+        others = []
+
+        class Mapping(dict):
+            def __contains__(self, ttype):
+                if others == [None]:
+                    others[0] = threading.Thread(target=table.update)
+                    others[0].start()
+                    others[0].join(0.1)
+                return dict.__contains__(self, ttype)
+        table = token.TokenTypeTable(Mapping({token.Token: 0,
+                                              token.Name.Builtin: 1}))
+        new = [token.Name.Builtin.Test_Table_Threads,
+               token.String.Test_Table_Threads]
+        others.append(None)
+        self.assertEqual([table[ttype] for ttype in new], [1, 0])
+        others[0].join()
+        self.assertEqual(len(table.values), len(token.TOKEN_TYPES))
+        self.assertEqual([table[ttype] for ttype in new], [1, 0])
+
     def test_sanity_check(self):
         stp = token.STANDARD_TYPES.copy()
         stp[token.Token] = '---' # Token and Text do conflict, that is okay
@@ -44,3 +146,32 @@ class TokenTest(unittest.TestCase):
         for k, v in t.items():
             if len(v) > 1:
                 self.fail("%r has more than one key: %r" % (k, v))
+
+
+class TokenArrayTest(unittest.TestCase):
+
+    code = u'def f(x):\n    return x + 1\n\n# end\n'
+
+    def test_roundtrip(self):
+        tokens = list(PythonLexer().get_tokens(self.code))
+        arr = PythonLexer().get_token_array(self.code)
+        self.assertEqual(len(arr), len(tokens))
+        self.assertEqual(list(arr), tokens)
+        self.assertEqual(arr.text, self.code)
+        self.assertEqual(arr[0], tokens[0])
+        self.assertEqual(arr[-1], tokens[-1])
+        self.assertEqual(list(token.TokenArray()), [])
+
+    def test_pickle(self):
+        arr = PythonLexer().get_token_array(self.code)
+        for proto in range(pickle.HIGHEST_PROTOCOL + 1):
+            copy = pickle.loads(pickle.dumps(arr, proto))
+            self.assertEqual(list(copy), list(arr))
+            for (t1, _), (t2, _) in zip(copy, arr):
+                self.assertTrue(t1 is t2)
+
+    def test_format(self):
+        fmt = HtmlFormatter()
+        arr = PythonLexer().get_token_array(self.code)
+        self.assertEqual(format(arr, fmt),
+                         format(PythonLexer().get_tokens(self.code), fmt))
@@ -38,3 +38,42 @@ class UsingStateTest(unittest.TestCase):
         def gen():
             return list(TestLexer().get_tokens('#a'))
         self.assertRaises(KeyError, gen)
+
+
+class CountingLexer(RegexLexer):
+    instances = 0
+
+    def __init__(self, **options):
+        CountingLexer.instances += 1
+        RegexLexer.__init__(self, **options)
+
+    tokens = {
+        'root': [
+            (r'\w+', Keyword),
+            (r'\s+', Text),
+        ],
+    }
+
+
+class OuterLexer(RegexLexer):
+    tokens = {
+        'root': [
+            (r'<.*?>', using(CountingLexer, stripnl=False)),
+            (r'[^<]+', Text),
+        ],
+    }
+
+
+class SublexerCacheTest(unittest.TestCase):
+    def test_cache(self):
+        CountingLexer.instances = 0
+        lx = OuterLexer()
+        list(lx.get_tokens('<a> <b c>\n<d>'))
+        list(lx.get_tokens('<e>'))
+        self.assertEqual(CountingLexer.instances, 1)
+        # other options of the calling lexer need a new instance
+        lx.options['tabsize'] = 4
+        list(lx.get_tokens('<f>'))
+        self.assertEqual(CountingLexer.instances, 2)
+        list(OuterLexer().get_tokens('<g>'))
+        self.assertEqual(CountingLexer.instances, 3)
@@ -7,7 +7,10 @@
     :license: BSD, see LICENSE for details.
 """
 
+import os
 import re
+import shutil
+import tempfile
 import unittest
 
 from pygments import util, console
@@ -195,6 +198,18 @@ class UtilTest(unittest.TestCase):
 
         self.assertEqual(type(Cls), Meta)
 
+    def test_write_file_atomically(self):
+        dirname = tempfile.mkdtemp()
+        try:
+            filename = os.path.join(dirname, 'sub', 'file')
+            util.write_file_atomically(filename, b'old')
+            util.write_file_atomically(filename, b'new')
+            with open(filename, 'rb') as fp:
+                self.assertEqual(fp.read(), b'new')
+            self.assertEqual(os.listdir(os.path.dirname(filename)), ['file'])
+        finally:
+            shutil.rmtree(dirname)
+
 
 class ConsoleTest(unittest.TestCase):
 